@@ -1,13 +1,16 @@
 # eda-backend/app/ai_chat/chat_handler.py
 
 import json
-from typing import List
+from typing import AsyncIterator, List, Optional
 from app.core.config import settings
 from app.aichat.models import ChatMessage, ChatResponse
+from app.services.rtl_index import RtlSnippet
+from app.services.ai_gateway import ai_gateway, AIUnavailableError
 import httpx # You need to install this library: pip install httpx
 
-# The base URL for the Gemini API
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent"
+# Gemini endpoints; point LLM_API_BASE_URL at scripts/mock_llm_server.py to work offline.
+GEMINI_API_URL = f"{settings.LLM_API_BASE_URL}/models/{settings.LLM_MODEL}:generateContent"
+GEMINI_STREAM_URL = f"{settings.LLM_API_BASE_URL}/models/{settings.LLM_MODEL}:streamGenerateContent"
 
 # The prompt that "trains" your AI assistant
 SYSTEM_PROMPT = """
@@ -24,58 +27,202 @@ When a user asks a question, please follow these rules:
 5.  Always stay within your defined persona. Do not reveal that you are a large language model or break character.
 """
 
-async def call_llm_api(chat_history: List[dict]) -> str:
+# Used to fold older turns into a running summary once a conversation outgrows its token budget.
+SUMMARY_PROMPT = """
+Summarize the following tutoring conversation between a user and Silicon AI, a chip and PCB design assistant.
+Keep every technical fact the assistant may need later: the user's design goals, module and signal names,
+parameters, decisions taken and open questions. Drop greetings and repetition. Write at most {max_words} words.
+"""
+
+class AIServiceError(Exception):
+    """Raised when the LLM API call fails. The message is safe to show to the user."""
+
+
+class AIServiceUnavailableError(AIServiceError):
+    """The call was rejected by the AI gateway (circuit open or saturated) without reaching the provider."""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _is_provider_failure(e: BaseException) -> bool:
+    # A 4xx other than 429 means our request was wrong, not that the provider is unhealthy.
+    if isinstance(e, httpx.HTTPStatusError):
+        code = e.response.status_code
+        return code == 429 or code >= 500
+    return True
+
+
+_llm_client: Optional[httpx.AsyncClient] = None
+
+
+def get_llm_client() -> httpx.AsyncClient:
     """
-    Makes a call to the LLM API (e.g., Gemini) with the chat history.
+    The app-wide LLM client. Connections are pooled and kept alive (HTTP/2 where the server
+    supports it), so only the first message pays for TCP and TLS setup.
     """
-    payload = {
+    global _llm_client
+    if _llm_client is None or _llm_client.is_closed:
+        _llm_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            headers={"Content-Type": "application/json"},
+            params={"key": settings.AI_SERVICE_API_KEY}
+        )
+    return _llm_client
+
+
+async def close_llm_client() -> None:
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
+
+
+def _build_payload(chat_history: List[dict], max_output_tokens: int = 2048) -> dict:
+    return {
         "contents": chat_history,
         "generationConfig": {
             "temperature": 0.5,
-            "maxOutputTokens": 2048,
+            "maxOutputTokens": max_output_tokens,
         },
     }
-    
-    headers = {
-        "Content-Type": "application/json",
-    }
-    
-    params = {
-        "key": settings.AI_SERVICE_API_KEY,
-    }
+
+
+def _extract_text(response_json: dict) -> str:
+    # Extract the text response from the API result
+    return response_json["candidates"][0]["content"]["parts"][0]["text"]
+
+
+async def call_llm_api(chat_history: List[dict], max_output_tokens: int = 2048, call_site: str = "chat") -> str:
+    """
+    Makes a call to the LLM API (e.g., Gemini) with the chat history, through the AI gateway:
+    identical concurrent requests share one call. Raises AIServiceError on failure so callers
+    can refund the user's quota (AIServiceUnavailableError when the gateway rejected it).
+    """
+    payload = _build_payload(chat_history, max_output_tokens)
+
+    async def _post() -> str:
+        response = await get_llm_client().post(GEMINI_API_URL, json=payload)
+        response.raise_for_status()
+        return _extract_text(response.json())
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(GEMINI_API_URL, json=payload, headers=headers, params=params, timeout=60)
-            response.raise_for_status()
-            
-            response_json = response.json()
-            # Extract the text response from the API result
-            return response_json["candidates"][0]["content"]["parts"][0]["text"]
+        return await ai_gateway.call(call_site, payload, _post, is_failure=_is_provider_failure)
 
+    except AIUnavailableError as e:
+        raise AIServiceUnavailableError(str(e), e.retry_after)
     except httpx.HTTPError as e:
         print(f"HTTP error during LLM API call: {e}")
-        return "An error occurred while connecting to the AI service. Please try again."
-    except KeyError:
+        raise AIServiceError("An error occurred while connecting to the AI service. Please try again.")
+    except (KeyError, IndexError):
         print("Invalid response format from LLM API.")
-        return "An error occurred while processing the AI response. Please try again later."
+        raise AIServiceError("An error occurred while processing the AI response. Please try again later.")
     except Exception as e:
         print(f"An unexpected error occurred during LLM API call: {e}")
-        return "An unexpected error occurred. Please check the server logs."
+        raise AIServiceError("An unexpected error occurred. Please check the server logs.")
 
 
-async def generate_chat_response(message: str, chat_history: List[ChatMessage]) -> ChatResponse:
+async def stream_llm_api(chat_history: List[dict]) -> AsyncIterator[str]:
     """
-    Generates an AI response by calling the LLM API.
+    Streams the completion from the LLM API as text chunks, as soon as the model produces them.
+    Uses Gemini's server-sent events mode (alt=sse). The stream holds an AI gateway slot until it
+    ends. Raises AIServiceError on failure.
     """
-    # Create the full chat history including the system prompt
-    full_chat_history_with_persona = [
-        {"role": "user", "parts": [{"text": SYSTEM_PROMPT}]},
+    try:
+        async with ai_gateway.slot("chatStream", is_failure=_is_provider_failure):
+            async with get_llm_client().stream(
+                "POST", GEMINI_STREAM_URL, json=_build_payload(chat_history), params={"alt": "sse"}
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    chunk = json.loads(line[len("data:"):])
+                    # The final chunk may carry only finishReason/usage metadata and no text.
+                    parts = chunk.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+                    text = "".join(part.get("text", "") for part in parts)
+                    if text:
+                        yield text
+
+    except AIUnavailableError as e:
+        raise AIServiceUnavailableError(str(e), e.retry_after)
+    except httpx.HTTPError as e:
+        print(f"HTTP error during LLM API stream: {e}")
+        raise AIServiceError("An error occurred while connecting to the AI service. Please try again.")
+    except (ValueError, IndexError):
+        print("Invalid stream format from LLM API.")
+        raise AIServiceError("An error occurred while processing the AI response. Please try again later.")
+
+
+def format_snippets(snippets: List[RtlSnippet]) -> str:
+    return "\n".join(
+        f"--- {snippet.source} (lines {snippet.start_line}-{snippet.end_line}) ---\n{snippet.text}" for snippet in snippets
+    )
+
+
+def _build_chat_history(
+    message: str,
+    chat_history: List[ChatMessage],
+    summary: Optional[str] = None,
+    snippets: Optional[List[RtlSnippet]] = None
+) -> List[dict]:
+    # Create the full chat history including the system prompt, the summary of turns that no longer
+    # fit the context budget, and the parts of the user's project code relevant to the question.
+    system_text = SYSTEM_PROMPT
+    if summary:
+        system_text += f"\nSummary of the earlier part of this conversation:\n{summary}\n"
+    if snippets:
+        system_text += f"\nRelevant code from the user's project:\n{format_snippets(snippets)}\n"
+    return [
+        {"role": "user", "parts": [{"text": system_text}]},
         *[{"role": msg.role, "parts": [{"text": msg.content}]} for msg in chat_history],
         {"role": "user", "parts": [{"text": message}]}
     ]
 
+
+async def generate_chat_response(
+    message: str,
+    chat_history: List[ChatMessage],
+    summary: Optional[str] = None,
+    snippets: Optional[List[RtlSnippet]] = None
+) -> ChatResponse:
+    """
+    Generates an AI response by calling the LLM API.
+    """
     # Call the LLM API with the full conversation context
-    ai_response_content = await call_llm_api(full_chat_history_with_persona)
-    
+    ai_response_content = await call_llm_api(_build_chat_history(message, chat_history, summary, snippets))
+
     return ChatResponse(response=ai_response_content)
+
+
+def stream_chat_response(
+    message: str,
+    chat_history: List[ChatMessage],
+    summary: Optional[str] = None,
+    snippets: Optional[List[RtlSnippet]] = None
+) -> AsyncIterator[str]:
+    """
+    Streams an AI response chunk by chunk. Same prompt as generate_chat_response.
+    """
+    return stream_llm_api(_build_chat_history(message, chat_history, summary, snippets))
+
+
+async def summarize_conversation(previous_summary: Optional[str], messages: List[ChatMessage], max_tokens: int) -> str:
+    """
+    Folds `messages` into `previous_summary` and returns the new summary. Only the turns being
+    evicted are sent, so each message is summarized once however long the conversation gets.
+    """
+    transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+    if previous_summary:
+        transcript = f"Summary so far:\n{previous_summary}\n\nNewer turns:\n{transcript}"
+    prompt = SUMMARY_PROMPT.format(max_words=int(max_tokens * 0.75))
+    return await call_llm_api(
+        [{"role": "user", "parts": [{"text": f"{prompt}\n{transcript}"}]}],
+        max_output_tokens=max_tokens,
+        call_site="summarize"
+    )
@@ -0,0 +1,159 @@
+# eda-backend/app/aichat/conversation_store.py
+# Server-side storage of AI chat conversations and the token-budgeted context sent with each message.
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from pymongo.database import Database as MongoDatabase
+from app.core.config import settings
+from app.aichat.chat_handler import summarize_conversation, AIServiceError
+from app.aichat.models import ChatMessage
+
+CONVERSATIONS_COLLECTION = "conversations"
+TITLE_LENGTH = 80
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English and code); no tokenizer needed."""
+    return len(text) // 4 + 1
+
+
+def trim_to_budget(messages: List[ChatMessage], budget: int) -> List[ChatMessage]:
+    """The most recent messages whose combined size fits `budget` tokens."""
+    kept: List[ChatMessage] = []
+    used = 0
+    for message in reversed(messages):
+        used += estimate_tokens(message.content)
+        if used > budget:
+            break
+        kept.append(message)
+    return kept[::-1]
+
+
+def _object_id(conversation_id: str) -> ObjectId:
+    try:
+        return ObjectId(conversation_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found.")
+
+
+async def load_conversation(mongo_db: MongoDatabase, firebase_uid: str, conversation_id: str) -> dict:
+    """
+    Fetches a conversation owned by the user with only its last CHAT_MAX_LOADED_MESSAGES messages,
+    so the read stays the same size however long the conversation is. 404 if missing or not owned.
+    """
+    conversation = await mongo_db[CONVERSATIONS_COLLECTION].find_one(
+        {"_id": _object_id(conversation_id), "userId": firebase_uid},
+        projection={"messages": {"$slice": -settings.CHAT_MAX_LOADED_MESSAGES}}
+    )
+    if not conversation:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found.")
+    return conversation
+
+
+async def build_context(
+    mongo_db: MongoDatabase, conversation: dict, summarize: bool = True
+) -> Tuple[Optional[str], List[ChatMessage]]:
+    """
+    Returns (summary, recent messages) to send with the next message.
+
+    Messages after 'summarizedUpTo' are sent verbatim while they fit CHAT_CONTEXT_TOKEN_BUDGET.
+    Once they don't, the oldest are folded into the stored summary until only CHAT_COMPACT_TO_TOKENS
+    remain. The summary is cached on the conversation, so it is only recomputed when more turns are
+    evicted, and the gap between the two limits means that happens once every few turns, not every turn.
+    If summarizing fails the evicted turns are just left out this time and retried on the next message.
+    With summarize=False the evicted turns are left out without calling the LLM: the cheap context
+    used before a use of the quota has been reserved.
+    """
+    summary = conversation.get("summary")
+    summarized_up_to = conversation.get("summarizedUpTo", 0)
+    loaded = [ChatMessage(**m) for m in conversation.get("messages", [])]
+    first_loaded_index = conversation.get("messageCount", len(loaded)) - len(loaded)
+    # Turns older than the loaded window and not yet summarized are beyond reach; start at the window.
+    start = max(summarized_up_to, first_loaded_index)
+    pending = loaded[start - first_loaded_index:]
+
+    tokens = [estimate_tokens(m.content) for m in pending]
+    remaining = sum(tokens)
+    if remaining <= settings.CHAT_CONTEXT_TOKEN_BUDGET:
+        return summary, pending
+
+    evict = 0
+    while evict < len(pending) and remaining > settings.CHAT_COMPACT_TO_TOKENS:
+        remaining -= tokens[evict]
+        evict += 1
+    kept = pending[evict:]
+    if not summarize:
+        return summary, kept
+
+    try:
+        new_summary = await summarize_conversation(summary, pending[:evict], settings.CHAT_SUMMARY_MAX_TOKENS)
+    except AIServiceError as e:
+        print(f"Failed to summarize conversation {conversation['_id']}, dropping older turns for now: {e}")
+        return summary, kept
+
+    # Conditional on the summary we started from, so a concurrent compaction is never overwritten.
+    await mongo_db[CONVERSATIONS_COLLECTION].update_one(
+        {"_id": conversation["_id"], "summarizedUpTo": summarized_up_to},
+        {"$set": {"summary": new_summary, "summarizedUpTo": start + evict}}
+    )
+    return new_summary, kept
+
+
+async def save_turn(
+    mongo_db: MongoDatabase,
+    firebase_uid: str,
+    conversation_id: Optional[str],
+    user_message: str,
+    model_reply: str
+) -> str:
+    """
+    Appends a user message and the model's reply to the conversation, creating the conversation
+    on its first turn. Returns the conversation ID.
+    """
+    now = datetime.utcnow()
+    messages = [
+        ChatMessage(role="user", content=user_message, timestamp=now).model_dump(),
+        ChatMessage(role="model", content=model_reply, timestamp=now).model_dump(),
+    ]
+    conversations = mongo_db[CONVERSATIONS_COLLECTION]
+    if conversation_id is None:
+        result = await conversations.insert_one({
+            "userId": firebase_uid,
+            "title": user_message.strip()[:TITLE_LENGTH],
+            "messages": messages,
+            "messageCount": len(messages),
+            "summary": None,
+            "summarizedUpTo": 0,
+            "createdAt": now,
+            "updatedAt": now,
+        })
+        return str(result.inserted_id)
+
+    await conversations.update_one(
+        {"_id": _object_id(conversation_id), "userId": firebase_uid},
+        {
+            "$push": {"messages": {"$each": messages}},
+            "$inc": {"messageCount": len(messages)},
+            "$set": {"updatedAt": now},
+        }
+    )
+    return conversation_id
+
+
+async def list_conversations(mongo_db: MongoDatabase, firebase_uid: str, limit: int) -> List[dict]:
+    """The user's conversations, most recently active first, without their messages."""
+    cursor = mongo_db[CONVERSATIONS_COLLECTION].find(
+        {"userId": firebase_uid}, projection={"messages": False}
+    ).sort("updatedAt", -1).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+async def delete_conversation(mongo_db: MongoDatabase, firebase_uid: str, conversation_id: str) -> None:
+    result = await mongo_db[CONVERSATIONS_COLLECTION].delete_one(
+        {"_id": _object_id(conversation_id), "userId": firebase_uid}
+    )
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found.")
@@ -13,9 +13,25 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     """Defines the request body for the chat API endpoint."""
     message: str = Field(..., description="The new message from the user.")
-    chat_history: List[ChatMessage] = Field(default_factory=list, description="A list of previous chat messages for context.")
+    conversation_id: Optional[str] = Field(None, description="Continue a stored conversation. Omit (with an empty chat_history) to start a new one.")
+    project_id: Optional[str] = Field(None, description="Ground the answer in the relevant parts of this project's HDL files.")
+    chat_history: List[ChatMessage] = Field(default_factory=list, description="Deprecated: previous messages for stateless clients. Ignored when conversation_id is set.")
 
 class ChatResponse(BaseModel):
     """Defines the response body from the chat API endpoint."""
     response: str = Field(..., description="The generated response from the AI model.")
     ai_uses_left: Optional[int] = Field(None, description="The number of AI uses remaining for the user.")
+    conversation_id: Optional[str] = Field(None, description="The stored conversation this reply belongs to.")
+
+class ConversationSummary(BaseModel):
+    """A stored conversation in the user's conversation list."""
+    conversation_id: str
+    title: str = Field(..., description="The first user message, shortened.")
+    message_count: int
+    created_at: datetime
+    updated_at: datetime
+
+class ConversationDetail(ConversationSummary):
+    """A stored conversation with its most recent messages."""
+    messages: List[ChatMessage]
+    summary: Optional[str] = Field(None, description="Summary of the turns that were compacted out of the context.")
@@ -0,0 +1,177 @@
+# eda-backend/app/aichat/response_cache.py
+# Shared cache of AI assistant replies, matched on the normalised prompt (exactly or as a near
+# duplicate via MinHash) within the same conversation context.
+
+import hashlib
+import json
+import random
+import re
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from pymongo.database import Database as MongoDatabase
+from app.core.config import settings
+from app.aichat.models import ChatMessage
+from app.utils.metrics import metrics
+
+RESPONSE_CACHE_COLLECTION = "aiResponseCache"
+
+SHINGLE_SIZE = 5 # Character n-grams; robust to typos and small rewordings of short questions
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16 # 16 bands of 4 rows: pairs above ~0.5 similarity share a band with high probability
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+MAX_CANDIDATES = 20
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1019) # Fixed seed: signatures must be identical across workers and restarts
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+# Filler words a near match may add or drop; every other word and number must match exactly.
+FILLER_WORDS = frozenset({"a", "an", "the", "please", "pls", "can", "could", "would", "you", "me", "i"})
+
+cache_hits_total = metrics.counter("ai_response_cache_hits_total", "AI replies served from the response cache, by match type.")
+cache_misses_total = metrics.counter("ai_response_cache_misses_total", "AI messages that had to call the LLM.")
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace, so trivially different phrasings share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def history_digest(summary: Optional[str], history: List[ChatMessage], grounding: str = "") -> str:
+    """
+    Identifies the context a reply was generated in (summary, recent turns, injected project code);
+    replies are only reused within the same context and model.
+    """
+    context = [settings.LLM_MODEL, normalize_prompt(summary or ""), grounding] + [
+        [msg.role, normalize_prompt(msg.content)] for msg in history
+    ]
+    return hashlib.sha256(json.dumps(context).encode()).hexdigest()
+
+
+def minhash_signature(normalized: str) -> List[int]:
+    padded = f" {normalized} "
+    shingles = {padded[i:i + SHINGLE_SIZE] for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))}
+    hashes = [zlib.crc32(shingle.encode()) for shingle in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def _band_keys(signature: List[int]) -> List[str]:
+    return [
+        f"{band}:{hashlib.blake2b(str(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]).encode(), digest_size=8).hexdigest()}"
+        for band in range(LSH_BANDS)
+    ]
+
+
+def _content_tokens(normalized: str) -> frozenset:
+    return frozenset(normalized.split()) - FILLER_WORDS
+
+
+def _similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of the two prompts' shingle sets."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERMUTATIONS
+
+
+def is_cacheable(message: str) -> bool:
+    # Long prompts are mostly pasted code: rarely repeated, and possibly private.
+    return settings.AI_CACHE_ENABLED and 0 < len(message) <= settings.AI_CACHE_MAX_PROMPT_CHARS
+
+
+async def lookup(mongo_db: MongoDatabase, message: str, digest: str) -> Optional[str]:
+    """
+    Returns a cached reply for `message` in the given context, or None. An exact match on the
+    normalised prompt is one _id lookup; otherwise prompts sharing an LSH band are compared by
+    MinHash and the most similar one at or above AI_CACHE_SIMILARITY_THRESHOLD is used, but only
+    if it has the same words and numbers apart from filler words. Character shingles alone score
+    '4 to 1 multiplexer' vs '8 to 1 multiplexer' or 'synchronous' vs 'asynchronous' above 0.8.
+    """
+    if not is_cacheable(message):
+        return None
+    try:
+        return await _lookup(mongo_db, message, digest)
+    except Exception as e:
+        print(f"AI response cache lookup failed, calling the LLM: {e}")
+        return None
+
+
+async def _lookup(mongo_db: MongoDatabase, message: str, digest: str) -> Optional[str]:
+    collection = mongo_db[RESPONSE_CACHE_COLLECTION]
+    now = datetime.utcnow()
+    normalized = normalize_prompt(message)
+    hit_update = {"$inc": {"hits": 1}, "$set": {"lastHitAt": now}}
+
+    entry_id = hashlib.sha256(f"{digest}:{normalized}".encode()).hexdigest()
+    exact = await collection.find_one_and_update(
+        {"_id": entry_id, "expiresAt": {"$gt": now}}, hit_update, projection={"response": True}
+    )
+    if exact:
+        cache_hits_total.inc(labels={"match": "exact"})
+        return exact["response"]
+
+    signature = minhash_signature(normalized)
+    candidates = await collection.find(
+        {"historyDigest": digest, "bands": {"$in": _band_keys(signature)}, "expiresAt": {"$gt": now}},
+        projection={"prompt": True, "minhash": True, "response": True}
+    ).limit(MAX_CANDIDATES).to_list(MAX_CANDIDATES)
+    tokens = _content_tokens(normalized)
+    candidates = [c for c in candidates if _content_tokens(c.get("prompt") or "") == tokens]
+    best = max(candidates, key=lambda c: _similarity(signature, c["minhash"]), default=None)
+    if best is None or _similarity(signature, best["minhash"]) < settings.AI_CACHE_SIMILARITY_THRESHOLD:
+        cache_misses_total.inc()
+        return None
+
+    await collection.update_one({"_id": best["_id"]}, hit_update)
+    cache_hits_total.inc(labels={"match": "similar"})
+    return best["response"]
+
+
+async def store(mongo_db: MongoDatabase, message: str, digest: str, response: str) -> None:
+    """Caches a reply for AI_CACHE_TTL_HOURS. Expired entries are removed by the collection's TTL index."""
+    if not is_cacheable(message) or not response:
+        return
+    now = datetime.utcnow()
+    normalized = normalize_prompt(message)
+    signature = minhash_signature(normalized)
+    try:
+        await mongo_db[RESPONSE_CACHE_COLLECTION].replace_one(
+            {"_id": hashlib.sha256(f"{digest}:{normalized}".encode()).hexdigest()},
+            {
+                "prompt": normalized,
+                "historyDigest": digest,
+                "minhash": signature,
+                "bands": _band_keys(signature),
+                "response": response,
+                "hits": 0,
+                "createdAt": now,
+                "lastHitAt": None,
+                "expiresAt": now + timedelta(hours=settings.AI_CACHE_TTL_HOURS),
+            },
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Failed to cache AI response: {e}")
+
+
+async def cache_stats(mongo_db: MongoDatabase, top: int) -> Dict[str, Any]:
+    """Entry and hit totals plus the most reused entries."""
+    collection = mongo_db[RESPONSE_CACHE_COLLECTION]
+    totals = await collection.aggregate([
+        {"$group": {"_id": None, "entries": {"$sum": 1}, "hits": {"$sum": "$hits"}}}
+    ]).to_list(1)
+    top_entries = await collection.find(
+        {}, projection={"prompt": True, "hits": True, "createdAt": True, "lastHitAt": True, "expiresAt": True}
+    ).sort("hits", -1).limit(top).to_list(top)
+    return {
+        "entries": totals[0]["entries"] if totals else 0,
+        "totalHits": totals[0]["hits"] if totals else 0,
+        "topEntries": [{"id": entry.pop("_id"), **entry} for entry in top_entries],
+    }
+
+
+async def purge(mongo_db: MongoDatabase, entry_id: Optional[str] = None, prompt_contains: Optional[str] = None) -> int:
+    """Deletes one entry, the entries whose prompt contains a phrase, or (with no arguments) everything."""
+    query: Dict[str, Any] = {}
+    if entry_id:
+        query["_id"] = entry_id
+    if prompt_contains:
+        query["prompt"] = {"$regex": re.escape(normalize_prompt(prompt_contains))}
+    result = await mongo_db[RESPONSE_CACHE_COLLECTION].delete_many(query)
+    return result.deleted_count
@@ -5,16 +5,14 @@ from typing import Annotated, Optional, Any
 from pymongo.database import Database as MongoDatabase
 import firebase_admin
 from firebase_admin import auth, exceptions
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from app.db.connections import get_mongo_db
 from app.models.user import User as MongoUser
 from app.core.config import settings
+from app.services.user_cache import user_profile_cache
+from app.utils.token_verifier import token_verifier, TokenExpiredError, InvalidTokenError
 from pydantic import BaseModel, Field
 
-executor = ThreadPoolExecutor(max_workers=5)
-
 class CurrentUser(BaseModel):
     firebase_uid: str
     user_data: dict = Field(default_factory=dict)
@@ -40,13 +38,10 @@ async def get_current_user(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Authorization header format. Expected 'Bearer <token>'.")
 
     try:
-        loop = asyncio.get_event_loop()
-        decoded_token = await loop.run_in_executor(
-            executor, lambda: auth.verify_id_token(token)
-        )
-    except auth.ExpiredIdTokenError:
+        decoded_token = await token_verifier.verify(token)
+    except (auth.ExpiredIdTokenError, TokenExpiredError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Firebase ID token has expired.")
-    except (auth.InvalidIdTokenError, ValueError):
+    except (auth.InvalidIdTokenError, InvalidTokenError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Firebase ID token.")
     except Exception as e:
         print(f"🔥 ERROR during auth: {repr(e)}")
@@ -57,9 +52,7 @@ async def get_current_user(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="UID missing in token payload.")
 
     try:
-        users_collection = mongo_db.users
-        print(f"🔥 DEBUG: Attempting to find user with firebaseUid: {firebase_uid}")
-        user_data = await users_collection.find_one({"firebaseUid": firebase_uid})
+        user_data = await user_profile_cache.get(mongo_db, firebase_uid)
     except Exception as e:
         print(f"🔥 ERROR fetching user from MongoDB: {repr(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve user data from the database.")
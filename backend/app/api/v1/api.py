@@ -11,6 +11,9 @@ from app.api.v1.endpoints.chip_tools import router as chip_tools_router
 from app.api.v1.endpoints.platformtools import router as platform_tools_router
 from app.api.v1.endpoints.payment import router as payments_router
 from app.api.v1.endpoints.schematic_tools import router as schematic_tools_router
+from app.api.v1.endpoints.metrics import router as metrics_router
+from app.api.v1.endpoints.chat import router as chat_router
+from app.api.v1.endpoints.Admin import router as admin_router
 
 
 
@@ -24,4 +27,7 @@ api_router.include_router(chip_tools_router, prefix="/tools", tags=["Chip Tools"
 api_router.include_router(platform_tools_router, prefix="/tools", tags=["Platform Tools"])
 api_router.include_router(payments_router, prefix="/payments", tags=["Payments"])
 api_router.include_router(schematic_tools_router, prefix="/chip/schematic", tags=["chip_schematic"])
+api_router.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
+api_router.include_router(chat_router, prefix="/platform", tags=["AI Chat"])
+api_router.include_router(admin_router, prefix="/admin", tags=["Admin"])
 
@@ -1,81 +1,112 @@
 # eda-backend/app/api/v1/endpoints/admin.py
 # Admin API endpoints for managing users and membership products.
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pymongo.database import Database as MongoDatabase
 from firebase_admin import firestore
 # CORRECTED IMPORT: Separate MongoDB and Firebase connections into their respective files
 from app.db.connections import get_mongo_db
 from app.db.firebase_connection import get_firestore_db
 from app.api.deps import get_current_admin_user, CurrentUser # CORRECTED: Renamed dependency to match our plan
-from app.schemas.user import UserResponse, UserUpdate
-from app.schemas.membership import ToolAccessConfig, ToolAccessDetails, MembershipProductCreate, MembershipProductUpdate, MembershipProductResponse
+from app.schemas.user import UserResponse, UserUpdate, UserListResponse, USER_LIST_FIELDS
+from app.schemas.membership import (
+    ToolAccessConfig, ToolAccessDetails, BulkMembershipUpdateRequest, BulkMembershipJobResponse
+)
+from app.schemas.project import MembershipProductCreate, MembershipProductUpdate, MembershipProductResponse
+from app.core.config import settings
 from app.utils.membership_plan import MEMBERSHIP_PLANS
 from app.models.user import User as MongoUser
-from typing import Annotated, List, Dict, Any, Optional
+from app.services.user_cache import user_profile_cache
+from app.services.entitlements import product_catalog
+from app.services.bulk_membership import create_bulk_job, get_bulk_job, run_bulk_membership_update
+from app.aichat import response_cache
+from typing import Annotated, AsyncIterator, List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+import csv
+import io
+import json
 
 router = APIRouter()
 
-# --- Admin User Management ---
-@router.get("/users", response_model=List[UserResponse])
-async def get_all_users(
-    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
-    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
-):
-    """
-    Retrieves all user profiles from MongoDB. (Admin only)
-    """
-    users_collection = mongo_db.users
-    users_data = await users_collection.find().to_list(1000)
-    return [UserResponse(**user) for user in users_data]
+DEFAULT_USER_PAGE_SIZE = 50
+MAX_USER_PAGE_SIZE = 500
 
-@router.put("/users/{firebase_uid}/membership", response_model=UserResponse)
-async def update_user_membership(
-    firebase_uid: str,
-    membership: Optional[str] = None,
-    custom_product_id: Optional[str] = None,
-    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
-    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
-    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)]
-):
-    """
-    Updates a user's base membership and/or assigns a custom membership product. (Admin only)
-    This will also recalculate and update the 'activeToolAccess' in the user's MongoDB profile.
-    """
-    users_collection = mongo_db.users
-    user_data = await users_collection.find_one({"firebaseUid": firebase_uid})
+def _parse_user_fields(fields: Optional[str]) -> List[str]:
+    """Validates a comma-separated `fields` projection. firebaseUid is always returned."""
+    if not fields:
+        return list(USER_LIST_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in USER_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(USER_LIST_FIELDS)}."
+        )
+    return ["firebaseUid"] + [f for f in requested if f != "firebaseUid"]
 
-    if not user_data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+def _build_user_filter(
+    membership: Optional[str],
+    is_admin: Optional[bool],
+    created_after: Optional[datetime],
+    created_before: Optional[datetime]
+) -> Dict[str, Any]:
+    user_filter: Dict[str, Any] = {}
+    if membership:
+        user_filter["membership"] = membership
+    if is_admin is not None:
+        user_filter["isAdmin"] = is_admin
+    if created_after or created_before:
+        user_filter["createdAt"] = {}
+        if created_after:
+            user_filter["createdAt"]["$gte"] = created_after
+        if created_before:
+            user_filter["createdAt"]["$lt"] = created_before
+    return user_filter
 
-    update_fields = {"updatedAt": datetime.utcnow()}
-    
-    current_membership = user_data.get("membership", "free")
+def _serialize_user_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+async def _resolve_membership_update(
+    firestore_db: firestore.Client,
+    membership: Optional[str],
+    custom_product_id: Optional[str],
+    current_membership: str
+) -> Dict[str, Any]:
+    """
+    Builds the MongoDB '$set' for a membership change: base membership, custom product and the
+    recalculated 'activeToolAccess' and 'membershipExpiresAt'. The product is read once, so the
+    result can be applied to any number of users.
+    """
+    update_fields: Dict[str, Any] = {"updatedAt": datetime.utcnow()}
 
     if membership:
         if membership in MEMBERSHIP_PLANS:
             update_fields["membership"] = membership
         else:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid base membership type.")
-    
+
     # CORRECTED: Handle custom_product_id directly, allowing it to be None
     update_fields["customMembershipProductId"] = custom_product_id
 
     # --- Recalculate activeToolAccess based on new membership/product ---
     active_tool_access: Dict[str, ToolAccessDetails] = {}
     membership_expires_at: Optional[datetime] = None
-    
+
     effective_membership = update_fields.get("membership", current_membership)
-    effective_custom_product_id = update_fields.get("customMembershipProductId")
 
-    if effective_custom_product_id:
-        product_doc = await firestore_db.collection("membershipProducts").document(effective_custom_product_id).get()
-        if not product_doc.exists:
+    if custom_product_id:
+        product_schema = await product_catalog.load(firestore_db, custom_product_id)
+        if not product_schema:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Custom Membership Product not found.")
-        
-        product_schema = MembershipProductResponse(id=product_doc.id, **product_doc.to_dict())
-        active_tool_access = product_schema.toolAccess.model_dump()
+
+        active_tool_access = {tool_name: details.model_dump() for tool_name, details in product_schema.toolAccess.items()}
         if product_schema.durationInDays != -1:
             membership_expires_at = datetime.utcnow() + timedelta(days=product_schema.durationInDays)
     else:
@@ -93,17 +124,201 @@ async def update_user_membership(
 
     update_fields["activeToolAccess"] = active_tool_access
     update_fields["membershipExpiresAt"] = membership_expires_at
+    return update_fields
+
+async def _iter_user_export_rows(users_cursor: Any, fields: List[str], export_format: str) -> AsyncIterator[str]:
+    """
+    Renders users as NDJSON or CSV while the cursor streams them in batches of USER_EXPORT_BATCH_SIZE.
+    Only one batch is held in memory at a time, whatever the number of users.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(fields)
+    async for user in users_cursor:
+        row = [_serialize_user_value(user.get(f)) for f in fields]
+        if export_format == "csv":
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, row)), default=str))
+            buffer.write("\n")
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+# --- Admin User Management ---
+@router.get("/users", response_model=UserListResponse)
+async def get_all_users(
+    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    limit: int = Query(DEFAULT_USER_PAGE_SIZE, ge=1, le=MAX_USER_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    membership: Optional[str] = None,
+    is_admin: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(USER_LIST_FIELDS)}")
+):
+    """
+    Retrieves one page of user profiles from MongoDB, newest first. (Admin only)
+    Filter by membership, admin flag and creation date; pass the returned `nextCursor` as `cursor`
+    for the next page.
+    """
+    requested_fields = _parse_user_fields(fields)
+    user_filter = _build_user_filter(membership, is_admin, created_after, created_before)
+    if cursor:
+        try:
+            user_filter["_id"] = {"$lt": ObjectId(cursor)}
+        except InvalidId:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+    users_data = await mongo_db.users.find(
+        user_filter, projection={f: True for f in requested_fields}
+    ).sort("_id", -1).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(users_data) > limit:
+        users_data = users_data[:limit]
+        next_cursor = str(users_data[-1]["_id"])
+    items = [{f: user.get(f) for f in requested_fields} for user in users_data]
+    return UserListResponse(items=items, nextCursor=next_cursor)
+
+@router.get("/users/export")
+async def export_users(
+    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    membership: Optional[str] = None,
+    is_admin: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(USER_LIST_FIELDS)}")
+):
+    """
+    Streams every matching user profile as NDJSON or CSV. (Admin only)
+    Memory use stays constant regardless of the number of users.
+    """
+    requested_fields = _parse_user_fields(fields)
+    user_filter = _build_user_filter(membership, is_admin, created_after, created_before)
+    users_cursor = mongo_db.users.find(
+        user_filter, projection={**{f: True for f in requested_fields}, "_id": False}
+    ).sort("_id", -1).batch_size(settings.USER_EXPORT_BATCH_SIZE)
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    file_name = f"users-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    return StreamingResponse(
+        _iter_user_export_rows(users_cursor, requested_fields, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'}
+    )
+
+@router.put("/users/{firebase_uid}/membership", response_model=UserResponse)
+async def update_user_membership(
+    firebase_uid: str,
+    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
+    membership: Optional[str] = None,
+    custom_product_id: Optional[str] = None
+):
+    """
+    Updates a user's base membership and/or assigns a custom membership product. (Admin only)
+    This will also recalculate and update the 'activeToolAccess' in the user's MongoDB profile.
+    """
+    users_collection = mongo_db.users
+    user_data = await users_collection.find_one({"firebaseUid": firebase_uid})
+
+    if not user_data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+
+    update_fields = await _resolve_membership_update(
+        firestore_db, membership, custom_product_id, user_data.get("membership", "free")
+    )
 
     # Perform the update in MongoDB
     await users_collection.update_one(
         {"firebaseUid": firebase_uid},
         {"$set": update_fields}
     )
+    user_profile_cache.invalidate(firebase_uid)
 
     updated_user_data = await users_collection.find_one({"firebaseUid": firebase_uid})
     return UserResponse(**updated_user_data)
 
 
+def _bulk_job_response(job_data: dict) -> BulkMembershipJobResponse:
+    return BulkMembershipJobResponse(
+        jobId=str(job_data["_id"]),
+        status=job_data.get("status", "pending"),
+        totalUsers=job_data.get("totalUsers"),
+        processed=job_data.get("processed", 0),
+        modified=job_data.get("modified", 0),
+        failedCount=job_data.get("failedCount", 0),
+        failures=job_data.get("failures", []),
+        error=job_data.get("error")
+    )
+
+@router.post("/users/membership/bulk", response_model=BulkMembershipJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def bulk_update_user_membership(
+    bulk_request: BulkMembershipUpdateRequest,
+    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
+    background_tasks: BackgroundTasks
+):
+    """
+    Applies one membership change to many users, e.g. for campaigns and renewals. (Admin only)
+    The product and 'activeToolAccess' are resolved once and written with batched bulk writes in the
+    background. Poll /users/membership/bulk/{job_id} for progress and per-user failures.
+    """
+    if (bulk_request.firebaseUids is None) == (bulk_request.filter is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide either 'firebaseUids' or 'filter'.")
+    if not bulk_request.membership and not bulk_request.customProductId:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide 'membership' and/or 'customProductId'.")
+
+    # Without a new base membership only the product changes, so every user's current tier is irrelevant.
+    update_fields = await _resolve_membership_update(
+        firestore_db, bulk_request.membership, bulk_request.customProductId, "free"
+    )
+
+    user_filter = None
+    if bulk_request.filter is not None:
+        user_filter = _build_user_filter(
+            bulk_request.filter.membership,
+            bulk_request.filter.isAdmin,
+            bulk_request.filter.createdAfter,
+            bulk_request.filter.createdBefore
+        )
+    total_users = len(set(bulk_request.firebaseUids)) if bulk_request.firebaseUids is not None else None
+
+    job_id = await create_bulk_job(mongo_db, current_admin_user.firebase_uid, total_users, update_fields)
+    background_tasks.add_task(
+        run_bulk_membership_update,
+        job_id,
+        mongo_db,
+        update_fields,
+        bulk_request.firebaseUids,
+        user_filter
+    )
+    return _bulk_job_response(await get_bulk_job(mongo_db, job_id))
+
+@router.get("/users/membership/bulk/{job_id}", response_model=BulkMembershipJobResponse)
+async def get_bulk_membership_job(
+    job_id: str,
+    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
+):
+    """
+    Retrieves the progress and failures of a bulk membership job. (Admin only)
+    """
+    job_data = await get_bulk_job(mongo_db, job_id)
+    if not job_data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bulk membership job not found.")
+    return _bulk_job_response(job_data)
+
 # --- Admin Membership Product Management ---
 @router.post("/membership-products", response_model=MembershipProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_membership_product(
@@ -177,4 +392,32 @@ async def delete_membership_product(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Membership Product not found.")
     
     await product_ref.delete()
-    return
\ No newline at end of file
+    return
+
+
+# --- Admin AI Response Cache Management ---
+@router.get("/ai-cache", response_model=Dict[str, Any])
+async def get_ai_cache_stats(
+    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    top: int = Query(20, ge=1, le=100, description="Number of most-hit entries to list")
+):
+    """
+    Shows the size of the AI response cache and its most reused entries with their hit counts. (Admin only)
+    """
+    return await response_cache.cache_stats(mongo_db, top)
+
+@router.delete("/ai-cache", response_model=Dict[str, int])
+async def purge_ai_cache(
+    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    entry_id: Optional[str] = Query(None, description="Delete only this entry"),
+    prompt_contains: Optional[str] = Query(None, description="Delete entries whose prompt contains this phrase")
+):
+    """
+    Purges AI response cache entries, e.g. after correcting a bad answer or changing the system prompt.
+    With no filters the whole cache is cleared. (Admin only)
+    """
+    deleted = await response_cache.purge(mongo_db, entry_id, prompt_contains)
+    print(f"Admin {current_admin_user.firebase_uid} purged {deleted} AI cache entries.")
+    return {"deleted": deleted}
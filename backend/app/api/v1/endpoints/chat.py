@@ -1,17 +1,88 @@
 # eda-backend/app/api/v1/endpoints/chat.py
 
-from typing import Annotated, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import math
+from typing import Annotated, AsyncIterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from app.api.deps import get_current_user, CurrentUser
+from app.middleware.rate_limit import rate_limit
 from app.core.config import settings
-from app.aichat.models import ChatRequest, ChatResponse
-from app.aichat.chat_handler import generate_chat_response
+from app.aichat.models import ChatRequest, ChatResponse, ChatMessage, ConversationSummary, ConversationDetail
+from app.aichat.chat_handler import generate_chat_response, stream_chat_response, format_snippets, AIServiceError, AIServiceUnavailableError
+from app.aichat import conversation_store, response_cache
+from app.services.metering import reserve_ai_use, UsageReservation
+from app.services.project_deletion import is_live_project
+from app.services.rtl_index import rtl_index_registry, select_snippets, RtlSnippet
 from pymongo.database import Database as MongoDatabase
 from app.db.connections import get_mongo_db
+from app.db.firebase_connection import get_firestore_db, get_firebase_storage_bucket
 
 router = APIRouter()
 
-@router.post("/chat", response_model=ChatResponse)
+async def _prepare_context(
+    chat_request: ChatRequest, firebase_uid: str, mongo_db: MongoDatabase
+) -> Tuple[Optional[dict], Optional[str], List[ChatMessage]]:
+    """
+    Returns (conversation, summary, history) without calling the LLM, for the cache lookup.
+    Stored conversations are cut to the token budget here and only summarized by `_compact_context`
+    once a use is reserved; legacy clients that still send chat_history get its most recent part that fits.
+    """
+    if chat_request.conversation_id:
+        conversation = await conversation_store.load_conversation(mongo_db, firebase_uid, chat_request.conversation_id)
+        summary, history = await conversation_store.build_context(mongo_db, conversation, summarize=False)
+        return conversation, summary, history
+    return None, None, conversation_store.trim_to_budget(chat_request.chat_history, settings.CHAT_CONTEXT_TOKEN_BUDGET)
+
+async def _compact_context(
+    mongo_db: MongoDatabase, conversation: Optional[dict], summary: Optional[str], history: List[ChatMessage],
+    reservation: UsageReservation
+) -> Tuple[Optional[str], List[ChatMessage]]:
+    """The context for the LLM call; folding older turns into the summary is itself an LLM call, so it is metered."""
+    if conversation is None:
+        return summary, history
+    try:
+        return await conversation_store.build_context(mongo_db, conversation)
+    except BaseException:
+        await reservation.refund()
+        raise
+
+async def _project_snippets(chat_request: ChatRequest, firebase_uid: str) -> List[RtlSnippet]:
+    """
+    The parts of the project's HDL most relevant to the message (BM25 over module, port and comment
+    tokens), limited to RTL_CONTEXT_TOP_K snippets and RTL_CONTEXT_TOKEN_BUDGET tokens.
+    """
+    if not chat_request.project_id:
+        return []
+    firestore_db = get_firestore_db()
+    project_doc = await firestore_db.collection("projects").document(chat_request.project_id).get()
+    if not is_live_project(project_doc):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    if project_doc.to_dict().get("userId") != firebase_uid:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this project")
+
+    index = await rtl_index_registry.get(firestore_db, get_firebase_storage_bucket(), firebase_uid, chat_request.project_id)
+    return select_snippets(index, chat_request.message, settings.RTL_CONTEXT_TOP_K, settings.RTL_CONTEXT_TOKEN_BUDGET)
+
+async def _save_turn(chat_request: ChatRequest, firebase_uid: str, mongo_db: MongoDatabase, reply: str) -> Optional[str]:
+    """Stores the turn unless the client manages its own history. A failed write does not fail the reply."""
+    if chat_request.chat_history and not chat_request.conversation_id:
+        return None
+    try:
+        return await conversation_store.save_turn(
+            mongo_db, firebase_uid, chat_request.conversation_id, chat_request.message, reply
+        )
+    except Exception as e:
+        print(f"🔥 ERROR saving chat turn for {firebase_uid}: {repr(e)}")
+        return chat_request.conversation_id
+
+def _current_uses_left(current_user: CurrentUser) -> Optional[int]:
+    # Cache hits are free, so the count is unchanged; None means unlimited (paid plans).
+    if current_user.user_data.get("membership", "free") != "free":
+        return None
+    return current_user.user_data.get("aiUsesLeft")
+
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(rate_limit("chat", "chat"))])
 async def chat_with_ai(
     chat_request: ChatRequest,
     current_user: Annotated[CurrentUser, Depends(get_current_user)],
@@ -19,32 +90,179 @@ async def chat_with_ai(
 ):
     """
     Handles conversational requests for the AI Chat Assistant.
+    Repeated questions are answered from the response cache without using up the quota.
     """
-    users_collection = mongo_db.users
-    user_profile = await users_collection.find_one({"firebaseUid": current_user.firebase_uid})
+    conversation, summary, history = await _prepare_context(chat_request, current_user.firebase_uid, mongo_db)
+    snippets = await _project_snippets(chat_request, current_user.firebase_uid)
+    digest = response_cache.history_digest(summary, history, format_snippets(snippets))
+    cached_reply = await response_cache.lookup(mongo_db, chat_request.message, digest)
+    if cached_reply is not None:
+        return ChatResponse(
+            response=cached_reply,
+            ai_uses_left=_current_uses_left(current_user),
+            conversation_id=await _save_turn(chat_request, current_user.firebase_uid, mongo_db, cached_reply)
+        )
 
-    # You must have an 'aiUsesLeft' field in your MongoDB user profile.
-    ai_uses_left = user_profile.get("aiUsesLeft", 0)
+    # Reserve one AI use up front with a conditional decrement; concurrent requests cannot overspend.
+    reservation = await reserve_ai_use(
+        mongo_db, current_user.firebase_uid, current_user.user_data.get("membership", "free")
+    )
+    summary, history = await _compact_context(mongo_db, conversation, summary, history, reservation)
 
-    # Implement AI usage limit logic
-    if user_profile.get("membership") == "free" and ai_uses_left <= 0:
+    # Call the chat handler to get the AI response
+    try:
+        chat_response = await generate_chat_response(chat_request.message, history, summary, snippets)
+    except AIServiceUnavailableError as e:
+        await reservation.refund()
         raise HTTPException(
-            status_code=status.HTTP_402_PAYMENT_REQUIRED,
-            detail="AI usage limit exceeded. Please upgrade your plan."
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
         )
+    except AIServiceError as e:
+        await reservation.refund() # Failed calls do not use up the quota
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+    except BaseException:
+        await reservation.refund()
+        raise
 
-    # Call the chat handler to get the AI response
-    chat_response = await generate_chat_response(chat_request.message, chat_request.chat_history)
-
-    # After a successful LLM call, update the user's remaining uses in MongoDB
-    if user_profile.get("membership") == "free":
-        new_uses_left = ai_uses_left - 1
-        await users_collection.update_one(
-            {"firebaseUid": current_user.firebase_uid},
-            {"$set": {"aiUsesLeft": new_uses_left}}
+    reservation.commit()
+    await response_cache.store(mongo_db, chat_request.message, digest, chat_response.response)
+    chat_response.ai_uses_left = reservation.remaining # None: unlimited uses for paid plans
+    chat_response.conversation_id = await _save_turn(
+        chat_request, current_user.firebase_uid, mongo_db, chat_response.response
+    )
+    return chat_response
+
+
+def _sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def _relay_chat_stream(
+    chat_request: ChatRequest,
+    summary: Optional[str],
+    history: List[ChatMessage],
+    snippets: List[RtlSnippet],
+    firebase_uid: str,
+    mongo_db: MongoDatabase,
+    digest: str,
+    reservation: UsageReservation
+) -> AsyncIterator[str]:
+    """
+    Relays model output as server-sent events: one 'data: {"token": ...}' per chunk, then
+    'event: done' with the uses left and conversation ID, or 'event: error' if the AI service fails.
+    Failed or abandoned streams refund the reserved use.
+    """
+    reply_parts: List[str] = []
+    try:
+        async for token in stream_chat_response(chat_request.message, history, summary, snippets):
+            reply_parts.append(token)
+            yield _sse_event({"token": token})
+    except AIServiceUnavailableError as e:
+        await reservation.refund()
+        yield _sse_event({"detail": str(e), "retry_after": math.ceil(e.retry_after)}, event="error")
+        return
+    except AIServiceError as e:
+        await reservation.refund() # Failed calls do not use up the quota
+        yield _sse_event({"detail": str(e)}, event="error")
+        return
+    except BaseException:
+        await reservation.refund() # Client disconnected mid-stream
+        raise
+
+    reservation.commit()
+    reply = "".join(reply_parts)
+    await response_cache.store(mongo_db, chat_request.message, digest, reply)
+    conversation_id = await _save_turn(chat_request, firebase_uid, mongo_db, reply)
+    yield _sse_event({"ai_uses_left": reservation.remaining, "conversation_id": conversation_id}, event="done")
+
+async def _relay_cached_reply(
+    chat_request: ChatRequest, reply: str, firebase_uid: str, mongo_db: MongoDatabase, uses_left: Optional[int]
+) -> AsyncIterator[str]:
+    yield _sse_event({"token": reply})
+    conversation_id = await _save_turn(chat_request, firebase_uid, mongo_db, reply)
+    yield _sse_event({"ai_uses_left": uses_left, "conversation_id": conversation_id, "cached": True}, event="done")
+
+@router.post("/chat/stream", dependencies=[Depends(rate_limit("chat", "chat"))])
+async def stream_chat_with_ai(
+    chat_request: ChatRequest,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
+):
+    """
+    Streams the AI Chat Assistant's reply as server-sent events (text/event-stream) as the model
+    generates it, so the first words arrive without waiting for the full completion.
+    A cached reply is sent as a single chunk and does not use up the quota.
+    """
+    sse_headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # Keep proxies from buffering the stream
+    conversation, summary, history = await _prepare_context(chat_request, current_user.firebase_uid, mongo_db)
+    snippets = await _project_snippets(chat_request, current_user.firebase_uid)
+    digest = response_cache.history_digest(summary, history, format_snippets(snippets))
+    cached_reply = await response_cache.lookup(mongo_db, chat_request.message, digest)
+    if cached_reply is not None:
+        return StreamingResponse(
+            _relay_cached_reply(chat_request, cached_reply, current_user.firebase_uid, mongo_db, _current_uses_left(current_user)),
+            media_type="text/event-stream",
+            headers=sse_headers
         )
-        chat_response.ai_uses_left = new_uses_left
-    else:
-        chat_response.ai_uses_left = None # Unlimited uses for paid plans
 
-    return chat_response
+    # The quota is checked before streaming starts, so an exhausted plan still gets a plain 402.
+    reservation = await reserve_ai_use(
+        mongo_db, current_user.firebase_uid, current_user.user_data.get("membership", "free")
+    )
+    summary, history = await _compact_context(mongo_db, conversation, summary, history, reservation)
+    return StreamingResponse(
+        _relay_chat_stream(chat_request, summary, history, snippets, current_user.firebase_uid, mongo_db, digest, reservation),
+        media_type="text/event-stream",
+        headers=sse_headers
+    )
+
+
+def _conversation_summary(conversation: dict) -> dict:
+    return {
+        "conversation_id": str(conversation["_id"]),
+        "title": conversation.get("title", ""),
+        "message_count": conversation.get("messageCount", 0),
+        "created_at": conversation["createdAt"],
+        "updated_at": conversation["updatedAt"],
+    }
+
+@router.get("/conversations", response_model=List[ConversationSummary])
+async def list_conversations(
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    Lists the user's stored AI chat conversations, most recently active first.
+    """
+    conversations = await conversation_store.list_conversations(mongo_db, current_user.firebase_uid, limit)
+    return [ConversationSummary(**_conversation_summary(c)) for c in conversations]
+
+@router.get("/conversations/{conversation_id}", response_model=ConversationDetail)
+async def get_conversation(
+    conversation_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
+):
+    """
+    Retrieves a stored conversation with its most recent messages, e.g. to restore a chat window.
+    """
+    conversation = await conversation_store.load_conversation(mongo_db, current_user.firebase_uid, conversation_id)
+    return ConversationDetail(
+        **_conversation_summary(conversation),
+        messages=conversation.get("messages", []),
+        summary=conversation.get("summary")
+    )
+
+@router.delete("/conversations/{conversation_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_conversation(
+    conversation_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
+):
+    """
+    Deletes a stored conversation.
+    """
+    await conversation_store.delete_conversation(mongo_db, current_user.firebase_uid, conversation_id)
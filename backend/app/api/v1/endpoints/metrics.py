@@ -0,0 +1,20 @@
+# eda-backend/app/api/v1/endpoints/metrics.py
+# Exposes the process's in-memory metrics (cache hit ratios, staleness, ...) to administrators.
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from typing import Annotated
+from app.api.deps import get_current_admin_user, CurrentUser
+from app.utils.metrics import metrics
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics(
+    current_admin_user: Annotated[CurrentUser, Depends(get_current_admin_user)]
+):
+    """
+    Returns this worker's metrics in the Prometheus text format. (Admin only)
+    Each worker process keeps its own metrics.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
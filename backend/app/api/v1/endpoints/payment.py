@@ -7,6 +7,7 @@ from app.db.connections import get_mongo_db
 from app.db.firebase_connection import get_firestore_db # Import get_firestore_db
 from app.api.deps import get_current_user, CurrentUser
 from app.services.razorpay import create_razorpay_order # Razorpay service
+from app.services.user_cache import user_profile_cache
 import app.utils.membership_plan as membership_plans_util # Use the alias
 from app.schemas.user import UserResponse # For returning updated user data
 from app.schemas.project import MembershipProductResponse, ToolAccessDetails # Import new schemas
@@ -126,7 +127,7 @@ async def verify_payment(
         update_fields = {"updatedAt": datetime.utcnow()}
         active_tool_access: Dict[str, ToolAccessDetails] = {}
         membership_expires_at: Optional[datetime] = None # pyright: ignore[reportUndefinedVariable]
-        base_membership_tier: str = current_user.mongo_user.membership # Default to current base tier
+        base_membership_tier: str = current_user.user_data.get("membership", "free") # Default to current base tier
 
         # Determine if it's a custom product or a base plan
         custom_product_assigned_id = None
@@ -171,6 +172,7 @@ async def verify_payment(
             {"firebaseUid": current_user.firebase_uid},
             {"$set": update_fields}
         )
+        user_profile_cache.invalidate(current_user.firebase_uid)
 
         # Fetch and return the updated user profile
         updated_user_data = await users_collection.find_one({"firebaseUid": current_user.firebase_uid})
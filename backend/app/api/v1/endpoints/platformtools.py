@@ -3,11 +3,19 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from firebase_admin import firestore, storage
+from pymongo.database import Database as MongoDatabase
+from app.db.connections import get_mongo_db
 from app.db.firebase_connection import get_firestore_db, get_firebase_storage_bucket
-from app.schemas.project import ToolLogEntry, PlatformSimulationParameters, FileMetadata
+from app.schemas.project import PlatformSimulationParameters, FileMetadata
 from app.api.deps import get_current_user, CurrentUser
-from app.middleware.membership import check_membership
+from app.middleware.membership import check_membership, reserve_tool_run
+from app.middleware.rate_limit import rate_limit
 from app.services.ai import process_design_request
+from app.services import project_files
+from app.services.metering import UsageReservation
+from app.services.project_deletion import is_live_project
+from app.services.signed_urls import get_download_url
+from app.services.tool_jobs import create_job, finish_job, get_owned_job
 from app.services.zip import create_dummy_zip
 from app.core.config import settings
 from typing import Annotated, Dict, Any, List # Import Any
@@ -24,7 +32,8 @@ async def _simulate_platform_tool_execution(
     simulation_parameters: PlatformSimulationParameters, # Use Pydantic model here
     input_files_meta: List[FileMetadata],
     firestore_db: firestore.Client,
-    firebase_storage_bucket: Any # CORRECTED: Changed from storage.Bucket to Any
+    firebase_storage_bucket: Any, # CORRECTED: Changed from storage.Bucket to Any
+    reservation: UsageReservation
 ):
     """
     Simulates the execution of a Platform simulation tool.
@@ -33,20 +42,14 @@ async def _simulate_platform_tool_execution(
     job_id = f"platform_job_{project_id}_{datetime.now().timestamp()}"
     print(f"[{job_id}] Simulating Platform simulation tool for project {project_id} by user {user_id}")
 
-    tool_log_entry = ToolLogEntry(
-        userId=user_id,
-        toolName=tool_name,
-        projectId=project_id,
-        details={"status": "initiated", "jobId": job_id, "simulationParameters": simulation_parameters.model_dump()}
-    )
-    tool_log_ref = firestore_db.collection("toolLogs").document()
-    await tool_log_ref.set(tool_log_entry.model_dump())
-    tool_log_entry.id = tool_log_ref.id
+    # 1. Record the job and log its initiation
+    await create_job(firestore_db, job_id, user_id, tool_name, project_id, {"simulationParameters": simulation_parameters.model_dump()})
 
     try:
         print(f"[{job_id}] Calling AI service for simulation analysis...")
         ai_response = await process_design_request(
-            {"simulationParameters": simulation_parameters.model_dump(), "inputFiles": [f.model_dump() for f in input_files_meta]}
+            {"simulationParameters": simulation_parameters.model_dump(), "inputFiles": [f.model_dump() for f in input_files_meta]},
+            call_site=tool_name
         )
         print(f"[{job_id}] AI Service Response: {ai_response.get('status')}")
 
@@ -66,18 +69,20 @@ async def _simulate_platform_tool_execution(
         output_public_url = blob.public_url
         print(f"[{job_id}] Output uploaded to Storage: {output_public_url}")
 
+        output_size = os.path.getsize(temp_zip_path)
         os.remove(temp_zip_path)
 
+        file_metadata = FileMetadata(
+            fileName=output_file_name,
+            filePath=output_file_path_in_storage,
+            fileUrl=output_public_url,
+            fileType="application/zip",
+            uploadedAt=datetime.utcnow(),
+            size=output_size
+        )
+        await project_files.add_file(firestore_db, project_id, file_metadata)
         project_ref = firestore_db.collection("projects").document(project_id)
-        file_metadata = {
-            "fileName": output_file_name,
-            "filePath": output_file_path_in_storage,
-            "fileUrl": output_public_url,
-            "fileType": "application/zip",
-            "uploadedAt": firestore.SERVER_TIMESTAMP
-        }
         await project_ref.update({
-            "files": firestore.ArrayUnion([file_metadata]),
             "updatedAt": firestore.SERVER_TIMESTAMP,
             f"tool_outputs.{tool_name}.{job_id}": {
                 "status": "completed",
@@ -87,32 +92,30 @@ async def _simulate_platform_tool_execution(
             }
         })
 
-        await firestore_db.collection("toolLogs").document(tool_log_entry.id).update({
-            "details.status": "completed",
-            "details.outputFilePath": output_file_path_in_storage,
-            "details.outputUrl": output_public_url,
-            "details.aiServiceStatus": ai_response.get('status'),
-            "details.completedAt": firestore.SERVER_TIMESTAMP,
-            "cost": 1.00 # Example cost
-        })
+        # Update the job record and log its completion
+        await finish_job(firestore_db, job_id, user_id, tool_name, project_id, "completed", {
+            "outputFilePath": output_file_path_in_storage,
+            "outputUrl": output_public_url,
+            "aiServiceStatus": ai_response.get('status'),
+        }, cost=1.00) # Example cost
         print(f"[{job_id}] Platform simulation tool completed successfully.")
+        reservation.commit({"projectId": project_id, "jobId": job_id})
 
     except Exception as e:
         print(f"[{job_id}] Error during Platform tool execution: {e}")
-        await firestore_db.collection("toolLogs").document(tool_log_entry.id).update({
-            "details.status": "failed",
-            "details.error": str(e),
-            "details.completedAt": firestore.SERVER_TIMESTAMP,
-        })
+        await reservation.refund() # Failed runs do not count against the plan
+        # Update the job record and log the failure
+        await finish_job(firestore_db, job_id, user_id, tool_name, project_id, "failed", {"error": str(e)})
 
 
-@router.post("/platform/simulation", response_model=dict)
+@router.post("/platform/simulation", response_model=dict, dependencies=[Depends(rate_limit("platformSimulationTool", "tools"))])
 async def run_platform_simulation_tool(
     project_id: str,
     simulation_parameters: PlatformSimulationParameters, # Use Pydantic model here
     current_user: Annotated[CurrentUser, Depends(check_membership("platformSimulationTool"))],
     firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
     firebase_storage_bucket: Annotated[Any, Depends(get_firebase_storage_bucket)], # CORRECTED: Changed from storage.Bucket to Any
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
     background_tasks: BackgroundTasks
 ):
     """
@@ -122,14 +125,15 @@ async def run_platform_simulation_tool(
     project_ref = firestore_db.collection("projects").document(project_id)
     project_doc = await project_ref.get()
 
-    if not project_doc.exists:
+    if not is_live_project(project_doc):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
     project_data = project_doc.to_dict()
     if project_data.get("userId") != current_user.firebase_uid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to run tools on this project")
 
-    input_files_meta = [FileMetadata(**f) for f in project_data.get("files", [])]
+    input_files_meta = await project_files.list_all_files(firestore_db, project_id)
+    reservation = await reserve_tool_run("platformSimulationTool", current_user, firestore_db, mongo_db)
 
     background_tasks.add_task(
         _simulate_platform_tool_execution,
@@ -138,10 +142,11 @@ async def run_platform_simulation_tool(
         simulation_parameters,
         input_files_meta,
         firestore_db,
-        firebase_storage_bucket
+        firebase_storage_bucket,
+        reservation
     )
 
-    return {"message": "Platform simulation tool initiated successfully. Check project status for updates."}
+    return {"message": "Platform simulation tool initiated successfully. Check project status for updates.", "runsLeft": reservation.remaining}
 
 @router.get("/platform/status/{job_id}", response_model=dict)
 async def get_platform_tool_status(
@@ -152,52 +157,34 @@ async def get_platform_tool_status(
     """
     Retrieves the status of a Platform tool job.
     """
-    tool_logs_ref = firestore_db.collection("toolLogs")
-    query = tool_logs_ref.where("userId", "==", current_user.firebase_uid)\
-                         .where("toolName", "==", "platformSimulationTool")\
-                         .where("details.jobId", "==", job_id)\
-                         .limit(1)
-
-    log_snapshot = await query.get()
-
-    if not log_snapshot.empty:
-        log_entry = log_snapshot.docs[0].to_dict()
-        return {
-            "jobId": job_id,
-            "status": log_entry.get("details", {}).get("status", "unknown"),
-            "message": log_entry.get("details", {}).get("message", "Status available."),
-            "outputAvailable": log_entry.get("details", {}).get("status") == "completed",
-            "outputUrl": log_entry.get("details", {}).get("outputUrl"),
-            "details": log_entry.get("details", {})
-        }
-    else:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or not authorized.")
+    job_data = await get_owned_job(firestore_db, job_id, current_user.firebase_uid, "platformSimulationTool")
+    return {
+        "jobId": job_id,
+        "status": job_data.get("status", "unknown"),
+        "message": job_data.get("message", "Status available."),
+        "outputAvailable": job_data.get("status") == "completed",
+        "outputUrl": job_data.get("outputUrl"),
+        "details": job_data
+    }
 
 @router.get("/platform/download/{job_id}", response_model=dict)
 async def download_platform_output(
     job_id: str,
     current_user: Annotated[CurrentUser, Depends(get_current_user)],
     firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
+    firebase_storage_bucket: Annotated[Any, Depends(get_firebase_storage_bucket)],
 ):
     """
     Provides a download URL for the output of a completed Platform tool job.
     """
-    tool_logs_ref = firestore_db.collection("toolLogs")
-    query = tool_logs_ref.where("userId", "==", current_user.firebase_uid)\
-                         .where("toolName", "==", "platformSimulationTool")\
-                         .where("details.jobId", "==", job_id)\
-                         .where("details.status", "==", "completed")\
-                         .limit(1)
-
-    log_snapshot = await query.get()
-
-    if not log_snapshot.empty:
-        log_entry = log_snapshot.docs[0].to_dict()
-        output_url = log_entry.get("details", {}).get("outputUrl")
-        if output_url:
-            return {"download_url": output_url}
-        else:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Output URL not found for this job.")
-    else:
+    job_data = await get_owned_job(firestore_db, job_id, current_user.firebase_uid, "platformSimulationTool")
+    if job_data.get("status") != "completed":
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Completed job not found or not authorized.")
 
+    output_file_path = job_data.get("outputFilePath")
+    if output_file_path:
+        return {"download_url": await get_download_url(firebase_storage_bucket, output_file_path)}
+    output_url = job_data.get("outputUrl")
+    if output_url:
+        return {"download_url": output_url}
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Output URL not found for this job.")
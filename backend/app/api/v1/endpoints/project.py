@@ -1,19 +1,167 @@
 # eda-backend/app/api/v1/endpoints/projects.py
 # API endpoints for project management (Firestore for metadata, Firebase Storage for files).
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Header, Query, BackgroundTasks
 from firebase_admin import firestore, storage
+from pymongo.database import Database as MongoDatabase
+from app.db.connections import get_mongo_db
 from app.db.firebase_connection import get_firestore_db, get_firebase_storage_bucket
-from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectResponse, FileMetadata
+from app.schemas.project import (
+    ProjectCreate, ProjectUpdate, ProjectResponse, ProjectListResponse, PROJECT_LIST_FIELDS, FileMetadata, FileListResponse,
+    UploadSessionCreate, UploadSessionResponse
+)
 from app.api.deps import get_current_user, CurrentUser
+from app.services import project_files
+from app.services.user_cache import user_profile_cache
+from app.services.project_deletion import (
+    deletion_job_id, is_live_project, tombstone_project, run_cascade_delete
+)
+from app.services.signed_urls import get_download_url, invalidate_download_url
+from app.services.uploads import (
+    ChunkedDigest, UploadError, create_resumable_session, stream_to_session, upload_fileobj_chunked
+)
+from app.utils.membership_plan import get_storage_quota_bytes
 from app.core.config import settings
 from typing import Annotated, List, Optional, Any
 from datetime import datetime, timedelta
 import os
 import asyncio
+import base64
+import json
 
 router = APIRouter()
 
+DEFAULT_PROJECT_PAGE_SIZE = 20
+MAX_PROJECT_PAGE_SIZE = 100
+
+def _encode_project_cursor(updated_at: datetime, project_id: str) -> str:
+    payload = json.dumps({"u": updated_at.isoformat(), "id": project_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def _decode_project_cursor(cursor: str) -> dict:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {"updatedAt": datetime.fromisoformat(payload["u"]), "__name__": payload["id"]}
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+def _parse_project_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validates a comma-separated `fields` projection; None means all fields."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in PROJECT_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(PROJECT_LIST_FIELDS)}."
+        )
+    return requested
+
+def _storage_remaining(current_user: CurrentUser) -> Optional[int]:
+    """Bytes left in the user's storage quota as of the cached profile; None when the plan is unlimited."""
+    quota = get_storage_quota_bytes(current_user.user_data.get("membership", "free"))
+    if quota == -1:
+        return None
+    return max(quota - current_user.user_data.get("storageBytesUsed", 0), 0)
+
+def _check_storage_quota(current_user: CurrentUser, incoming_bytes: int) -> None:
+    """
+    Rejects an upload whose declared size would push the user past their plan's storage quota.
+    This is only an early check against the cached total; _reserve_storage is what enforces the quota.
+    """
+    remaining = _storage_remaining(current_user)
+    if remaining is not None and incoming_bytes > remaining:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Storage quota exceeded: this upload needs {incoming_bytes} bytes, {remaining} bytes remaining."
+        )
+
+async def _reserve_storage(mongo_db: MongoDatabase, current_user: CurrentUser, size: int) -> None:
+    """
+    Adds `size` bytes to the user's storage usage in one conditional update that only matches while the
+    total stays within the quota, so concurrent uploads cannot all pass against the same stale total.
+    Raises 413 when it doesn't fit. Undo with _release_storage if the upload is not recorded.
+    """
+    firebase_uid = current_user.firebase_uid
+    quota = get_storage_quota_bytes(current_user.user_data.get("membership", "free"))
+    query: dict = {"firebaseUid": firebase_uid}
+    if quota != -1:
+        query["$or"] = [{"storageBytesUsed": {"$lte": quota - size}}, {"storageBytesUsed": {"$exists": False}}]
+    result = None
+    if quota == -1 or size <= quota:
+        result = await mongo_db.users.update_one(query, {"$inc": {"storageBytesUsed": size}})
+        user_profile_cache.invalidate(firebase_uid)
+    if result is None or result.matched_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Storage quota exceeded: this upload needs {size} bytes."
+        )
+
+async def _release_storage(mongo_db: MongoDatabase, firebase_uid: str, size: int) -> None:
+    await mongo_db.users.update_one({"firebaseUid": firebase_uid}, {"$inc": {"storageBytesUsed": -size}})
+    user_profile_cache.invalidate(firebase_uid)
+
+async def _delete_blob(blob: Any) -> None:
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(None, lambda: blob.delete())
+    except Exception as e:
+        print(f"Failed to delete rejected upload {blob.name} from Storage: {e}")
+
+async def _record_uploaded_file(
+    firestore_db: firestore.Client,
+    project_id: str,
+    blob: Any,
+    file_name: str,
+    file_path_in_storage: str,
+    content_type: str,
+    size: int,
+    checksum: str,
+    firebase_uid: str,
+    mongo_db: MongoDatabase
+) -> FileMetadata:
+    """
+    Publishes an uploaded blob and records its metadata on the project. Its size must already be
+    reserved with _reserve_storage; a previous file with the same name is replaced, its blob removed
+    and its size given back.
+    """
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, lambda: blob.make_public())
+
+    file_metadata = FileMetadata(
+        fileName=file_name,
+        filePath=file_path_in_storage,
+        fileUrl=blob.public_url,
+        fileType=content_type,
+        uploadedAt=datetime.utcnow(),
+        size=size,
+        checksum=checksum
+    )
+    replaced = await project_files.add_file(firestore_db, project_id, file_metadata)
+    if replaced:
+        invalidate_download_url(replaced.filePath)
+        try:
+            old_blob = blob.bucket.blob(replaced.filePath)
+            await loop.run_in_executor(None, lambda: old_blob.delete())
+        except Exception as e:
+            print(f"Failed to delete replaced file {replaced.filePath} from Storage: {e}")
+        if replaced.size:
+            await _release_storage(mongo_db, firebase_uid, replaced.size)
+    return file_metadata
+
+def _upload_session_response(upload_id: str, session_data: dict, file_metadata: Optional[FileMetadata] = None) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        uploadId=upload_id,
+        projectId=session_data["projectId"],
+        fileName=session_data["fileName"],
+        size=session_data["size"],
+        bytesReceived=session_data.get("bytesReceived", 0),
+        chunkSize=session_data["chunkSize"],
+        status=session_data.get("status", "pending"),
+        file=file_metadata
+    )
+
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project_in: ProjectCreate,
@@ -25,7 +173,8 @@ async def create_project(
     """
     project_data = project_in.model_dump()
     project_data["userId"] = current_user.firebase_uid # CORRECTED: Associate project with the current user
-    project_data["files"] = []
+    project_data["fileCount"] = 0
+    project_data["totalFileBytes"] = 0
     project_data["createdAt"] = firestore.SERVER_TIMESTAMP
     project_data["updatedAt"] = firestore.SERVER_TIMESTAMP
 
@@ -37,23 +186,55 @@ async def create_project(
     created_project_doc = await project_ref.get()
     return ProjectResponse(id=created_project_doc.id, **created_project_doc.to_dict())
 
-@router.get("/", response_model=List[ProjectResponse])
+@router.get("/", response_model=ProjectListResponse)
 async def get_projects(
     current_user: Annotated[CurrentUser, Depends(get_current_user)],
-    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)]
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
+    limit: Annotated[int, Query(ge=1, le=MAX_PROJECT_PAGE_SIZE)] = DEFAULT_PROJECT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Annotated[Optional[str], Query(description="Comma-separated projection, e.g. id,name,status")] = None
 ):
     """
-    Retrieves all projects for the authenticated user from Firestore.
+    Retrieves the authenticated user's projects from Firestore, one page at a time,
+    most recently updated first. Only the requested fields are read from Firestore.
+    Requires a composite index on (userId, updatedAt desc, __name__ desc).
     """
-    projects_ref = firestore_db.collection("projects")
-    # Query projects where 'userId' matches the current authenticated user's UID
-    query = projects_ref.where("userId", "==", current_user.firebase_uid).order_by("createdAt", direction=firestore.Query.DESCENDING)
-    projects_snapshot = await query.get()
+    requested_fields = _parse_project_fields(fields)
 
-    projects = []
-    for doc in projects_snapshot:
-        projects.append(ProjectResponse(id=doc.id, **doc.to_dict()))
-    return projects
+    projects_ref = firestore_db.collection("projects")
+    query = projects_ref.where("userId", "==", current_user.firebase_uid)
+
+    total_count = None
+    if not cursor:
+        # Count aggregation is billed per 1000 index entries, so only the first page pays for the hint.
+        count_result = await query.count().get()
+        total_count = count_result[0][0].value
+
+    query = query.order_by("updatedAt", direction=firestore.Query.DESCENDING)\
+                 .order_by(firestore.FieldPath.document_id(), direction=firestore.Query.DESCENDING)
+    if requested_fields is not None:
+        # updatedAt is always read so the next cursor can be built, deletionJobId to hide tombstoned projects.
+        query = query.select(sorted({f for f in requested_fields if f != "id"} | {"updatedAt", "deletionJobId"}))
+    if cursor:
+        query = query.start_after(_decode_project_cursor(cursor))
+    projects_snapshot = await query.limit(limit + 1).get()
+
+    docs = list(projects_snapshot)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = _encode_project_cursor(docs[-1].get("updatedAt"), docs[-1].id)
+
+    items = []
+    for doc in docs:
+        if deletion_job_id(doc.to_dict()):
+            continue
+        if requested_fields is None:
+            items.append(ProjectResponse(id=doc.id, **doc.to_dict()).model_dump())
+        else:
+            doc_data = doc.to_dict()
+            items.append({f: doc.id if f == "id" else doc_data.get(f) for f in requested_fields})
+    return ProjectListResponse(items=items, nextCursor=next_cursor, totalCount=total_count)
 
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project_by_id(
@@ -67,7 +248,7 @@ async def get_project_by_id(
     project_ref = firestore_db.collection("projects").document(project_id)
     project_doc = await project_ref.get()
 
-    if not project_doc.exists:
+    if not is_live_project(project_doc):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
     project_data = project_doc.to_dict()
@@ -89,7 +270,7 @@ async def update_project(
     project_ref = firestore_db.collection("projects").document(project_id)
     project_doc = await project_ref.get()
 
-    if not project_doc.exists:
+    if not is_live_project(project_doc):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
     project_data = project_doc.to_dict()
@@ -104,15 +285,19 @@ async def update_project(
     updated_project_doc = await project_ref.get()
     return ProjectResponse(id=updated_project_doc.id, **updated_project_doc.to_dict())
 
-@router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{project_id}", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def delete_project(
     project_id: str,
     current_user: Annotated[CurrentUser, Depends(get_current_user)],
     firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
-    firebase_storage_bucket: Annotated[Any, Depends(get_firebase_storage_bucket)]
+    firebase_storage_bucket: Annotated[Any, Depends(get_firebase_storage_bucket)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    background_tasks: BackgroundTasks
 ):
     """
-    Deletes a project from Firestore and its associated files from Firebase Storage.
+    Deletes a project. The project is tombstoned immediately and hidden from all project endpoints;
+    its files, tool outputs, tool logs and other dependent documents are removed by a background
+    cascade-delete job whose progress is available at /projects/deletions/{job_id}.
     """
     project_ref = firestore_db.collection("projects").document(project_id)
     project_doc = await project_ref.get()
@@ -124,20 +309,97 @@ async def delete_project(
     if project_data.get("userId") != current_user.firebase_uid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this project")
 
-    if project_data.get("files"):
-        loop = asyncio.get_event_loop()
-        for file_meta in project_data["files"]:
-            file_path_in_storage = file_meta.get("filePath")
-            if file_path_in_storage:
-                try:
-                    blob = firebase_storage_bucket.blob(file_path_in_storage)
-                    await loop.run_in_executor(None, lambda: blob.delete())
-                    print(f"Deleted file from Storage: {file_path_in_storage}")
-                except Exception as e:
-                    print(f"Failed to delete file {file_path_in_storage} from Storage: {e}")
-
-    await project_ref.delete()
-    return
+    if deletion_job_id(project_data):
+        return {"message": "Project deletion already in progress.", "jobId": deletion_job_id(project_data)}
+
+    job_id = await tombstone_project(firestore_db, project_id, current_user.firebase_uid)
+    background_tasks.add_task(
+        run_cascade_delete,
+        job_id,
+        project_id,
+        current_user.firebase_uid,
+        firestore_db,
+        firebase_storage_bucket,
+        mongo_db
+    )
+    return {"message": "Project deletion started.", "jobId": job_id}
+
+async def _get_owned_deletion_job(firestore_db: firestore.Client, job_id: str, firebase_uid: str) -> dict:
+    job_doc = await firestore_db.collection("deletionJobs").document(job_id).get()
+    if not job_doc.exists or job_doc.to_dict().get("userId") != firebase_uid:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deletion job not found or not authorized.")
+    return job_doc.to_dict()
+
+@router.get("/deletions/{job_id}", response_model=dict)
+async def get_deletion_job(
+    job_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)]
+):
+    """
+    Retrieves the progress of a project deletion job.
+    """
+    job_data = await _get_owned_deletion_job(firestore_db, job_id, current_user.firebase_uid)
+    return {
+        "jobId": job_id,
+        "projectId": job_data.get("projectId"),
+        "status": job_data.get("status"),
+        "blobsTotal": job_data.get("blobsTotal", 0),
+        "blobsDeleted": job_data.get("blobsDeleted", 0),
+        "documentsDeleted": job_data.get("documentsDeleted", 0),
+        "failedPaths": job_data.get("failedPaths", []),
+        "attempts": job_data.get("attempts", 0),
+    }
+
+@router.post("/deletions/{job_id}/retry", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def retry_deletion_job(
+    job_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
+    firebase_storage_bucket: Annotated[Any, Depends(get_firebase_storage_bucket)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    background_tasks: BackgroundTasks
+):
+    """
+    Re-runs a failed project deletion job. Only what is still left behind is deleted.
+    """
+    job_data = await _get_owned_deletion_job(firestore_db, job_id, current_user.firebase_uid)
+    if job_data.get("status") != "failed":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Deletion job is {job_data.get('status')}, not failed.")
+
+    background_tasks.add_task(
+        run_cascade_delete,
+        job_id,
+        job_data["projectId"],
+        current_user.firebase_uid,
+        firestore_db,
+        firebase_storage_bucket,
+        mongo_db
+    )
+    return {"message": "Project deletion retry started.", "jobId": job_id}
+
+@router.get("/{project_id}/files", response_model=FileListResponse)
+async def list_project_files(
+    project_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
+    limit: Annotated[int, Query(ge=1, le=project_files.MAX_PAGE_SIZE)] = project_files.DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None
+):
+    """
+    Lists a project's files one page at a time, ordered by file name.
+    """
+    project_ref = firestore_db.collection("projects").document(project_id)
+    project_doc = await project_ref.get()
+
+    if not is_live_project(project_doc):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    if project_doc.to_dict().get("userId") != current_user.firebase_uid:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this project's files")
+
+    files, next_cursor = await project_files.list_files(firestore_db, project_id, limit, cursor)
+    return FileListResponse(items=files, nextCursor=next_cursor)
 
 @router.post("/{project_id}/upload-file", response_model=ProjectResponse)
 async def upload_project_file(
@@ -145,54 +407,218 @@ async def upload_project_file(
     current_user: Annotated[CurrentUser, Depends(get_current_user)],
     firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
     firebase_storage_bucket: Annotated[Any, Depends(get_firebase_storage_bucket)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
     file: Annotated[UploadFile, File(...)]
 ):
     """
     Uploads a file to a specific project in Firebase Storage and updates Firestore metadata.
+    The file is streamed to Storage in UPLOAD_CHUNK_SIZE chunks instead of being read into memory,
+    and the storage quota is charged for the bytes actually received, whatever size was declared.
+    For large files prefer the resumable `/uploads` endpoints.
     """
     project_ref = firestore_db.collection("projects").document(project_id)
     project_doc = await project_ref.get()
 
-    if not project_doc.exists:
+    if not is_live_project(project_doc):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
     project_data = project_doc.to_dict()
     if project_data.get("userId") != current_user.firebase_uid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to upload to this project")
 
-    file_content = await file.read()
+    if file.size is not None:
+        _check_storage_quota(current_user, file.size)
 
     unique_filename = f"{datetime.now().timestamp()}-{file.filename}"
     file_path_in_storage = f"project-files/{project_id}/{unique_filename}"
     blob = firebase_storage_bucket.blob(file_path_in_storage)
 
+    # Stop reading once the body outgrows the remaining quota; the reservation below is the real check.
+    max_size = _storage_remaining(current_user)
     loop = asyncio.get_event_loop()
     try:
-        await loop.run_in_executor(None, lambda: blob.upload_from_string(file_content, content_type=file.content_type))
-        await loop.run_in_executor(None, lambda: blob.make_public())
-        public_url = blob.public_url
+        size, checksum = await loop.run_in_executor(
+            None,
+            lambda: upload_fileobj_chunked(blob, file.file, file.content_type, settings.UPLOAD_CHUNK_SIZE, max_size)
+        )
+    except UploadError as e:
+        await _delete_blob(blob)
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Storage quota exceeded: {e}")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to upload file to Firebase Storage: {e}"
         )
 
-    file_metadata = FileMetadata(
-        fileName=file.filename,
-        filePath=file_path_in_storage,
-        fileUrl=public_url,
-        fileType=file.content_type,
-        uploadedAt=datetime.utcnow()
-    )
-
-    await project_ref.update({
-        "files": firestore.ArrayUnion([file_metadata.model_dump()]),
-        "updatedAt": firestore.SERVER_TIMESTAMP,
-    })
+    try:
+        await _reserve_storage(mongo_db, current_user, size)
+    except HTTPException:
+        await _delete_blob(blob)
+        raise
+    try:
+        await _record_uploaded_file(
+            firestore_db, project_id, blob, file.filename, file_path_in_storage, file.content_type,
+            size, checksum, current_user.firebase_uid, mongo_db
+        )
+    except Exception:
+        await _release_storage(mongo_db, current_user.firebase_uid, size)
+        raise
 
     updated_project_doc = await project_ref.get()
     return ProjectResponse(id=updated_project_doc.id, **updated_project_doc.to_dict())
 
+@router.post("/{project_id}/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    project_id: str,
+    upload_in: UploadSessionCreate,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
+    firebase_storage_bucket: Annotated[Any, Depends(get_firebase_storage_bucket)]
+):
+    """
+    Starts a resumable upload. The declared size is checked against the storage quota
+    before any bytes are accepted, and charged to it when the upload completes.
+    """
+    project_ref = firestore_db.collection("projects").document(project_id)
+    project_doc = await project_ref.get()
+
+    if not is_live_project(project_doc):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    if project_doc.to_dict().get("userId") != current_user.firebase_uid:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to upload to this project")
+
+    _check_storage_quota(current_user, upload_in.size)
+
+    unique_filename = f"{datetime.now().timestamp()}-{upload_in.fileName}"
+    file_path_in_storage = f"project-files/{project_id}/{unique_filename}"
+    blob = firebase_storage_bucket.blob(file_path_in_storage)
+
+    try:
+        session_url = await create_resumable_session(blob, upload_in.contentType, upload_in.size)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to start upload session in Firebase Storage: {e}"
+        )
+
+    session_data = {
+        "userId": current_user.firebase_uid,
+        "projectId": project_id,
+        "fileName": upload_in.fileName,
+        "contentType": upload_in.contentType,
+        "filePath": file_path_in_storage,
+        "sessionUrl": session_url,
+        "size": upload_in.size,
+        "bytesReceived": 0,
+        "chunkSize": settings.UPLOAD_CHUNK_SIZE,
+        "chunkDigests": [],
+        "status": "pending",
+        "createdAt": firestore.SERVER_TIMESTAMP,
+        "expiresAt": datetime.utcnow() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+    }
+    session_ref = firestore_db.collection("uploadSessions").document()
+    await session_ref.set(session_data)
+    return _upload_session_response(session_ref.id, session_data)
+
+async def _get_owned_upload_session(firestore_db: firestore.Client, project_id: str, upload_id: str, firebase_uid: str):
+    session_ref = firestore_db.collection("uploadSessions").document(upload_id)
+    session_doc = await session_ref.get()
+
+    if not session_doc.exists:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+
+    session_data = session_doc.to_dict()
+    if session_data.get("userId") != firebase_uid or session_data.get("projectId") != project_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this upload session")
+
+    expires_at = session_data.get("expiresAt")
+    if session_data.get("status") != "completed" and expires_at and expires_at.replace(tzinfo=None) < datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Upload session has expired. Start a new upload.")
+
+    return session_ref, session_data
+
+@router.get("/{project_id}/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    project_id: str,
+    upload_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)]
+):
+    """
+    Returns the state of a resumable upload. Clients resume by sending the rest of the file from `bytesReceived`.
+    """
+    _, session_data = await _get_owned_upload_session(firestore_db, project_id, upload_id, current_user.firebase_uid)
+    return _upload_session_response(upload_id, session_data)
+
+@router.put("/{project_id}/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_file_chunks(
+    project_id: str,
+    upload_id: str,
+    request: Request,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    firestore_db: Annotated[firestore.Client, Depends(get_firestore_db)],
+    firebase_storage_bucket: Annotated[Any, Depends(get_firebase_storage_bucket)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    upload_offset: Annotated[int, Header(alias="Upload-Offset")] = 0
+):
+    """
+    Streams the request body into the upload session in fixed-size chunks, starting at `Upload-Offset`.
+    Progress is committed after every chunk, so an interrupted request can be resumed from
+    `bytesReceived`. The file is added to the project once the declared size has been received,
+    provided it still fits the storage quota at that point; otherwise the upload is rejected with 413.
+    """
+    session_ref, session_data = await _get_owned_upload_session(
+        firestore_db, project_id, upload_id, current_user.firebase_uid
+    )
+    if session_data.get("status") == "completed":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session is already completed.")
+    if session_data.get("status") == "rejected":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session was rejected for exceeding the storage quota.")
+
+    bytes_received = session_data.get("bytesReceived", 0)
+    if upload_offset != bytes_received:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload-Offset mismatch: resume from byte {bytes_received}."
+        )
+
+    digest = ChunkedDigest(session_data.get("chunkDigests", []))
+
+    async def _commit_progress(committed_bytes: int, chunk_digest: ChunkedDigest) -> None:
+        session_data["bytesReceived"] = committed_bytes
+        await session_ref.update({"bytesReceived": committed_bytes, "chunkDigests": chunk_digest.chunk_digests})
+
+    try:
+        bytes_received = await stream_to_session(
+            session_data["sessionUrl"], request.stream(), bytes_received,
+            session_data["size"], session_data["chunkSize"], digest, _commit_progress
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Upload to Firebase Storage failed: {e}")
+
+    if bytes_received < session_data["size"]:
+        return _upload_session_response(upload_id, session_data)
+
+    blob = firebase_storage_bucket.blob(session_data["filePath"])
+    try:
+        await _reserve_storage(mongo_db, current_user, session_data["size"])
+    except HTTPException:
+        await _delete_blob(blob)
+        await session_ref.update({"status": "rejected"})
+        raise
+    try:
+        file_metadata = await _record_uploaded_file(
+            firestore_db, project_id, blob, session_data["fileName"], session_data["filePath"],
+            session_data["contentType"], session_data["size"], digest.hexdigest(), current_user.firebase_uid, mongo_db
+        )
+    except Exception:
+        await _release_storage(mongo_db, current_user.firebase_uid, session_data["size"])
+        raise
+    session_data["status"] = "completed"
+    await session_ref.update({"status": "completed", "completedAt": firestore.SERVER_TIMESTAMP})
+    return _upload_session_response(upload_id, session_data, file_metadata)
+
 @router.get("/{project_id}/download-file/{file_name}", response_model=dict)
 async def download_project_file(
     project_id: str,
@@ -207,32 +633,22 @@ async def download_project_file(
     project_ref = firestore_db.collection("projects").document(project_id)
     project_doc = await project_ref.get()
 
-    if not project_doc.exists:
+    if not is_live_project(project_doc):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
     project_data = project_doc.to_dict()
     if project_data.get("userId") != current_user.firebase_uid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this project's files")
 
-    found_file = next((f for f in project_data.get("files", []) if f.get("fileName") == file_name), None)
+    found_file = await project_files.get_file(firestore_db, project_id, file_name)
 
     if not found_file:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found in this project")
 
-    file_path_in_storage = found_file.get("filePath")
+    file_path_in_storage = found_file.filePath
     if not file_path_in_storage:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="File path missing in metadata")
 
-    blob = firebase_storage_bucket.blob(file_path_in_storage)
-
-    loop = asyncio.get_event_loop()
-    file_exists = await loop.run_in_executor(None, lambda: blob.exists())
-
-    if not file_exists:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found in storage")
-
-    if blob.public_url:
-        return {"download_url": blob.public_url}
-    else:
-        signed_url = await loop.run_in_executor(None, lambda: blob.generate_signed_url(expiration=datetime.utcnow() + timedelta(hours=1)))
-        return {"download_url": signed_url}
+    # The file's presence in project metadata is the existence check; no storage round trip is needed.
+    download_url = await get_download_url(firebase_storage_bucket, file_path_in_storage)
+    return {"download_url": download_url}
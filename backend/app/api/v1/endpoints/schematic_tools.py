@@ -1,15 +1,52 @@
 # eda-backend/app/api/v1/endpoints/schematic_tools.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from pymongo.database import Database as MongoDatabase
 from app.api.deps import get_current_user, CurrentUser
-from typing import Annotated, Any
+from app.core.config import settings
+from app.db.connections import get_mongo_db
+from app.services import schematic_documents, schematic_drc
+from app.services.netlister import build_netlist, iter_verilog, Netlist, NetlistError
+from typing import Annotated, Any, Optional
 
 router = APIRouter()
 
 class SchematicData(BaseModel):
     components: list[Any]
-    nets: list[Any]
+    wires: list[Any] = [] # Editor wires: startComp/startPin (or startX/startY) to endComp/endPin
+    nets: list[Any] = [] # Optional named nets: {"name": ..., "pins": [{"component": id, "pin": index}]}
+
+class SchematicDrcRequest(SchematicData):
+    previous: Optional[list[Any]] = None # 'errors' from the last DRC result, for an incremental re-check
+    changed_ids: Optional[list[str]] = None # Components/wires added, modified or removed since that result
+    before: list[Any] = [] # Previous versions of the modified and removed elements
+
+class SchematicDocumentCreate(BaseModel):
+    name: str = "Untitled schematic"
+    project_id: Optional[str] = None
+    components: list[Any] = []
+    wires: list[Any] = []
+
+class SchematicPatch(BaseModel):
+    base_revision: int = Field(ge=0) # Revision the ops were computed against
+    ops: list[dict[str, Any]] # JSON-patch style: {"op": "add"|"replace"|"remove", "path": "/components/<id>/x", "value": ...}
+
+async def _build_netlist(schematic_data: SchematicData) -> Netlist:
+    if not schematic_data.components:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No components in schematic.")
+    loop = asyncio.get_event_loop()
+    try:
+        # CPU-bound for large schematics; keep it off the event loop.
+        return await loop.run_in_executor(
+            None, build_netlist, schematic_data.components, schematic_data.wires, schematic_data.nets
+        )
+    except NetlistError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except (AttributeError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed schematic data.")
 
 @router.post("/generate-netlist")
 async def generate_netlist(
@@ -17,34 +54,125 @@ async def generate_netlist(
     current_user: Annotated[CurrentUser, Depends(get_current_user)]
 ):
     """
-    Generates a Verilog netlist from the provided schematic data.
-    (Placeholder implementation)
+    Generates a structural Verilog netlist from the schematic: connected wires and pins are merged
+    into nets, gates become Verilog primitives and other components module instances. Nets nothing
+    drives become inputs of the top module, and driven nets nothing reads become its outputs.
     """
-    # Placeholder logic to process schematic_data
-    if not schematic_data.components:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No components in schematic.")
+    netlist = await _build_netlist(schematic_data)
+    header = f"Generated Netlist for project by {current_user.email}"
+    loop = asyncio.get_event_loop()
+    verilog = await loop.run_in_executor(None, lambda: "".join(iter_verilog(netlist, header=header)))
+    return {"netlist": verilog, "stats": netlist.stats, "message": "Netlist generated successfully!"}
 
-    # A simple, mock netlist
-    netlist = f"// Generated Netlist for project by {current_user.email}\n"
-    netlist += "module top (\n"
-    netlist += "  // Inputs and Outputs\n);\n"
-    netlist += "  // Wires and components\n"
-    netlist += "endmodule\n"
-
-    return {"netlist": netlist, "message": "Netlist generated successfully!"}
+@router.post("/generate-netlist/stream")
+async def stream_netlist(
+    schematic_data: SchematicData,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)]
+):
+    """
+    Same netlist as /generate-netlist, streamed as a netlist.v download instead of a JSON string,
+    for schematics too large to hold in the browser as one response body.
+    """
+    netlist = await _build_netlist(schematic_data)
+    header = f"Generated Netlist for project by {current_user.email}"
+    return StreamingResponse(
+        iter_verilog(netlist, header=header), # Sync generator: Starlette iterates it in a worker thread
+        media_type="text/plain",
+        headers={"Content-Disposition": 'attachment; filename="netlist.v"'}
+    )
 
 @router.post("/run-drc")
 async def run_drc(
-    schematic_data: SchematicData,
+    drc_request: SchematicDrcRequest,
     current_user: Annotated[CurrentUser, Depends(get_current_user)]
 ):
     """
-    Runs a Design Rule Check (DRC) on the schematic.
-    (Placeholder implementation)
+    Runs a Design Rule Check (DRC) on the schematic: component overlaps, dangling wires, unconnected
+    pins, nets shorted by several outputs and wires crossing pins they do not connect to.
+    Send the previous result's `errors` as `previous` with `changed_ids` (and the old versions of
+    modified or removed elements as `before`) to re-check only the area around an edit.
     """
-    # Mock DRC logic
-    errors = []
-    if len(schematic_data.nets) < 10:
-        errors.append({"type": "warning", "message": "Low net count. Check for unconnected components."})
-    
-    return {"status": "success", "errors": errors, "message": f"DRC completed with {len(errors)} errors/warnings."}
+    loop = asyncio.get_event_loop()
+    try:
+        result = await loop.run_in_executor(None, lambda: schematic_drc.run_drc(
+            drc_request.components, drc_request.wires, drc_request.previous, drc_request.changed_ids, drc_request.before
+        ))
+    except schematic_drc.SchematicDataError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except (AttributeError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed schematic data.")
+
+    errors = result.pop("violations")
+    return {
+        "status": "success",
+        "errors": errors,
+        **result,
+        "message": f"DRC completed with {len(errors)} errors/warnings."
+    }
+
+@router.post("/documents", status_code=status.HTTP_201_CREATED)
+async def create_schematic_document(
+    document: SchematicDocumentCreate,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
+):
+    """
+    Stores a schematic as a versioned document at revision 0. Later edits are sent as deltas to
+    PATCH /documents/{id} instead of re-posting the whole schematic.
+    """
+    return await schematic_documents.create_document(
+        mongo_db, current_user.firebase_uid, document.name, document.project_id,
+        {"components": document.components, "wires": document.wires}
+    )
+
+@router.get("/documents/{schematic_id}")
+async def get_schematic_document(
+    schematic_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
+):
+    """Returns the schematic's latest components and wires with its revision."""
+    return await schematic_documents.get_document(mongo_db, current_user.firebase_uid, schematic_id)
+
+@router.patch("/documents/{schematic_id}")
+async def patch_schematic_document(
+    schematic_id: str,
+    patch: SchematicPatch,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
+):
+    """
+    Applies a delta on top of `base_revision` and returns the new revision. If someone else saved
+    first this is a 409 with the current revision: fetch /deltas?since=base_revision, rebase the
+    pending edits on them and retry.
+    """
+    if not patch.ops:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A patch needs at least one op.")
+    if len(patch.ops) > settings.SCHEMATIC_MAX_OPS_PER_PATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.SCHEMATIC_MAX_OPS_PER_PATCH} ops per patch; replace the collection instead."
+        )
+    revision = await schematic_documents.apply_delta(
+        mongo_db, current_user.firebase_uid, schematic_id, patch.base_revision, patch.ops
+    )
+    return {"id": schematic_id, "revision": revision}
+
+@router.get("/documents/{schematic_id}/deltas")
+async def get_schematic_deltas(
+    schematic_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)],
+    since: int = Query(..., ge=0)
+):
+    """The deltas saved after revision `since`, oldest first. 410 once they have been compacted into a snapshot."""
+    deltas = await schematic_documents.deltas_since(mongo_db, current_user.firebase_uid, schematic_id, since)
+    return {"id": schematic_id, "deltas": deltas}
+
+@router.delete("/documents/{schematic_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_schematic_document(
+    schematic_id: str,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    mongo_db: Annotated[MongoDatabase, Depends(get_mongo_db)]
+):
+    await schematic_documents.delete_document(mongo_db, current_user.firebase_uid, schematic_id)
@@ -6,6 +6,7 @@ from app.db.connections import get_mongo_db
 from app.api.deps import get_current_user, CurrentUser, get_current_admin_user
 from app.schemas.user import UserCreate, UserLogin, UserUpdate, UserResponse
 from app.models.user import User as MongoUser
+from app.services.user_cache import user_profile_cache
 from typing import Annotated
 import firebase_admin
 from firebase_admin import auth
@@ -135,6 +136,7 @@ async def update_current_user(
         {"firebaseUid": current_user.firebase_uid},
         {"$set": user_data}
     )
+    user_profile_cache.invalidate(current_user.firebase_uid)
 
     updated_user_data = await users_collection.find_one({"firebaseUid": current_user.firebase_uid})
     return UserResponse(**transform_mongo_user(updated_user_data))
@@ -161,6 +163,7 @@ async def delete_user(
         )
 
     await users_collection.delete_one({"firebaseUid": firebase_uid})
+    user_profile_cache.invalidate(firebase_uid)
 
     try:
         await auth.delete_user(firebase_uid)
@@ -3,6 +3,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
 import os
+import tempfile
 
 load_dotenv(".env") # Fallback to load .env manually
 
@@ -20,6 +21,96 @@ class Settings(BaseSettings):
     ]
     UPLOAD_DIR: str = "uploads/project-files"
 
+    # --- Project File Upload Settings ---
+    # Resumable uploads to Cloud Storage require chunks that are multiples of 256 KiB.
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+    UPLOAD_SESSION_TTL_HOURS: int = 24 # Storage expires resumable sessions after about a week
+
+    # --- Download URL Settings ---
+    SIGNED_URL_EXPIRY_MINUTES: int = 60
+    SIGNED_URL_CACHE_MARGIN_MINUTES: int = 5 # Cached URLs are dropped this long before they expire
+    SIGNED_URL_CACHE_SIZE: int = 10000
+
+    # --- Project Deletion Settings ---
+    DELETE_CONCURRENCY: int = 16 # Blob deletions in flight per deletion job
+    DELETE_MAX_RETRIES: int = 3
+    DELETE_PROGRESS_INTERVAL: int = 50 # Persist job progress every N deleted blobs
+
+    # --- Usage Metering Settings ---
+    USAGE_FLUSH_INTERVAL_SECONDS: float = 5.0 # Usage events are written to MongoDB in the background
+    USAGE_FLUSH_BATCH_SIZE: int = 500
+    USAGE_MAX_BUFFERED_EVENTS: int = 50000
+    USAGE_FLUSH_MAX_ATTEMPTS: int = 5 # An event that fails this many writes is dropped
+
+    # --- Rate Limit Settings ---
+    RATE_LIMIT_DB_PATH: str = "rate_limits.db" # SQLite file shared by all workers on the host
+
+    # --- Admin Settings ---
+    USER_EXPORT_BATCH_SIZE: int = 1000 # Documents fetched per cursor batch when exporting users
+    BULK_MEMBERSHIP_BATCH_SIZE: int = 500 # Updates per bulk_write in bulk membership jobs
+    BULK_MEMBERSHIP_MAX_REPORTED_FAILURES: int = 1000 # Failures listed on a job; failedCount counts them all
+
+    # --- AI Chat Settings ---
+    LLM_API_BASE_URL: str = "https://generativelanguage.googleapis.com/v1beta" # e.g. http://127.0.0.1:8001/v1beta for scripts/mock_llm_server.py
+    LLM_MODEL: str = "gemini-2.5-flash-preview-05-20"
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_CONNECTIONS: int = 100 # Pooled connections shared by all chat requests in a worker
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    CHAT_CONTEXT_TOKEN_BUDGET: int = 4000 # History tokens sent per message; older turns are summarized beyond this
+    CHAT_COMPACT_TO_TOKENS: int = 2000 # Compaction keeps this many recent tokens, so it runs once every few turns
+    CHAT_SUMMARY_MAX_TOKENS: int = 512
+    CHAT_MAX_LOADED_MESSAGES: int = 200 # Most recent messages read from a stored conversation per request
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_TTL_HOURS: int = 24
+    AI_CACHE_SIMILARITY_THRESHOLD: float = 0.8 # Estimated Jaccard similarity of prompts to reuse a reply (same words and numbers required too)
+    AI_CACHE_MAX_PROMPT_CHARS: int = 500 # Longer prompts (usually pasted code) are never cached
+
+    # --- AI Gateway Settings (all AI provider calls) ---
+    AI_GATEWAY_MAX_CONCURRENCY: int = 32 # Provider calls in flight per worker
+    AI_GATEWAY_QUEUE_TIMEOUT_SECONDS: float = 10.0 # Wait for a free slot before rejecting with 503
+    AI_BREAKER_FAILURE_THRESHOLD: int = 5 # Consecutive failures that open the circuit
+    AI_BREAKER_COOLDOWN_SECONDS: float = 30.0 # Calls fail fast this long before a probe is let through
+
+    # --- Log Triage Settings (tool logs are classified locally before any AI analysis) ---
+    LOG_TRIAGE_MAX_DIAGNOSTICS: int = 200 # Distinct diagnostics listed in a summary; the counts cover all of them
+    LOG_TRIAGE_MAX_LOCATIONS: int = 20 # Locations kept per deduplicated diagnostic
+    LOG_TRIAGE_RESIDUE_MAX_CHARS: int = 4000 # Unclassified log lines sent for AI analysis
+
+    # --- RTL Retrieval Settings (project code context for AI chat) ---
+    RTL_INDEX_MAX_PROJECTS: int = 256 # Project indexes kept in memory per worker
+    RTL_INDEX_IDLE_SECONDS: float = 3600.0 # Unused indexes are dropped and rebuilt on the next question
+    RTL_INDEX_MAX_FILE_BYTES: int = 1024 * 1024 # Larger HDL files (usually generated netlists) are not indexed
+    RTL_INDEX_REMOTE_SYNC_SECONDS: float = 30.0 # How often uploaded files are re-listed for changes
+    RTL_CHUNK_LINES: int = 60
+    RTL_CONTEXT_TOP_K: int = 5
+    RTL_CONTEXT_TOKEN_BUDGET: int = 1500
+
+    # --- Schematic DRC Settings ---
+    SCHEMATIC_DRC_GRID_CELL_SIZE: float = 100.0 # Spatial index cell, in canvas units (components are 60x50)
+    SCHEMATIC_DRC_TOLERANCE: float = 2.0 # Wire ends and pins closer than this are treated as touching
+    SCHEMATIC_DRC_MAX_COORDINATE: float = 1_000_000.0 # Elements outside +/- this (canvas units) are rejected
+    SCHEMATIC_DRC_MAX_COMPONENT_SIZE: float = 10_000.0 # Larger component boxes are rejected
+
+    # --- Schematic Document Settings ---
+    SCHEMATIC_SNAPSHOT_INTERVAL: int = 50 # Revisions between full snapshots; deltas older than the previous one are dropped
+    SCHEMATIC_CACHE_MAX_DOCUMENTS: int = 256 # Documents each worker keeps in memory
+    SCHEMATIC_CACHE_IDLE_SECONDS: float = 1800.0 # Unedited documents leave the cache after this long
+    SCHEMATIC_MAX_OPS_PER_PATCH: int = 10000
+
+    # --- PCB DRC Settings (board units are mm; a board's own rules override the defaults) ---
+    PCB_DRC_DEFAULT_CLEARANCE: float = 0.2 # Copper to copper of different nets
+    PCB_DRC_MIN_TRACK_WIDTH: float = 0.15
+    PCB_DRC_MIN_ANNULAR_RING: float = 0.13
+    PCB_DRC_MIN_DRILL: float = 0.3
+    PCB_DRC_MAX_WORKERS: int = 4 # Processes checking layers in parallel
+    PCB_DRC_PARALLEL_MIN_PRIMITIVES: int = 50000 # Smaller boards are checked in-process; the pool costs more than it saves
+    PCB_DRC_MAX_VIOLATIONS: int = 1000 # Violations listed in a result; the counts cover all of them
+
+    # --- PCB Fabrication Output Settings (Gerber/Excellon) ---
+    # Where archives go when no storage bucket is given; outside the source tree, override with the env var
+    PCB_ARTIFACT_DIR: str = os.path.join(tempfile.gettempdir(), "eda-pcb-artifacts")
+    GERBER_PARALLEL_MIN_PRIMITIVES: int = 50000 # Smaller boards write their layers in-process, straight into the archive
+
     # --- MongoDB Settings (for User Profiles/Membership) ---
     # It's best practice to load MONGO_URI from .env for security.
     # Ensure the database name in the URI matches MONGO_DB_NAME below.
@@ -43,6 +134,12 @@ class Settings(BaseSettings):
     RAZORPAY_KEY_SECRET: str = "" # Provide default empty string or load from env
     AI_SERVICE_API_KEY: str = "" # Provide default empty string or load from env
 
+    # --- Auth Settings ---
+    AUTH_VERIFY_WORKERS: int = 32 # Threads for ID token signature checks on cache misses
+    AUTH_TOKEN_CACHE_SIZE: int = 50000
+    USER_CACHE_TTL_SECONDS: float = 5.0 # How stale a cached profile may be when written by another worker
+    USER_CACHE_SIZE: int = 10000
+
     # --- Security Settings ---
     JWT_SECRET_KEY: str = "your_super_secret_jwt_key"
     ALGORITHM: str = "HS256"
@@ -0,0 +1,59 @@
+# eda-backend/app/db/indexes.py
+# Declares the MongoDB indexes every collection needs and applies them idempotently at startup.
+
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database as MongoDatabase
+from pymongo.errors import PyMongoError
+
+# Collection name -> indexes. Names are explicit so re-running with the same definition is a no-op.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # get_current_user, login_user, chat/tool metering and payments all filter by firebaseUid.
+        IndexModel([("firebaseUid", ASCENDING)], name="firebaseUid_unique", unique=True),
+        # register_user's duplicate check and admin search by email.
+        IndexModel([("email", ASCENDING)], name="email"),
+        # Admin listing: newest first, optionally filtered by membership or creation date.
+        IndexModel([("membership", ASCENDING), ("_id", DESCENDING)], name="membership_id"),
+        IndexModel([("createdAt", DESCENDING)], name="createdAt"),
+    ],
+    "usageCounters": [
+        IndexModel([("userId", ASCENDING), ("period", ASCENDING)], name="userId_period"),
+    ],
+    "conversations": [
+        # Conversation list (newest first); single conversations are fetched by _id and userId.
+        IndexModel([("userId", ASCENDING), ("updatedAt", DESCENDING)], name="userId_updatedAt"),
+    ],
+    "aiResponseCache": [
+        # Near-duplicate lookup: entries with the same context sharing a MinHash band.
+        IndexModel([("historyDigest", ASCENDING), ("bands", ASCENDING)], name="historyDigest_bands"),
+        # Entries are removed once they expire.
+        IndexModel([("expiresAt", ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0),
+        IndexModel([("hits", DESCENDING)], name="hits"),
+    ],
+    "schematics": [
+        IndexModel([("userId", ASCENDING), ("updatedAt", DESCENDING)], name="userId_updatedAt"),
+    ],
+    "schematicDeltas": [
+        # Replay after a snapshot and catch-up reads; unique so two writers can never claim one revision.
+        IndexModel([("schematicId", ASCENDING), ("revision", ASCENDING)], name="schematicId_revision_unique", unique=True),
+    ],
+    "usageEvents": [
+        IndexModel([("userId", ASCENDING), ("createdAt", DESCENDING)], name="userId_createdAt"),
+    ],
+}
+
+
+async def ensure_indexes(mongo_db: MongoDatabase) -> None:
+    """
+    Creates any missing index from INDEXES. Existing indexes with the same definition are left alone.
+    A failure on one collection (e.g. duplicate firebaseUid values blocking the unique index, or an
+    unreachable server) is logged and does not stop startup; run scripts/check_query_plans.py to
+    see what is missing.
+    """
+    for collection_name, index_models in INDEXES.items():
+        try:
+            created = await mongo_db[collection_name].create_indexes(index_models)
+            print(f"✅ Indexes ensured on '{collection_name}': {', '.join(created)}")
+        except PyMongoError as e:
+            print(f"❌ Failed to create indexes on '{collection_name}': {e}")
@@ -1,12 +1,23 @@
 # main.py
 import os
 import uvicorn
+from contextlib import asynccontextmanager
 import firebase_admin
 from firebase_admin import credentials, firestore, auth as firebase_auth
 from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional, Dict
+from app.core.config import settings
+from app.db import connections
+from app.db.indexes import ensure_indexes
+from app.api.v1.api import api_router
+from app.aichat.chat_handler import close_llm_client
+from app.services.entitlements import product_catalog
+from app.services.metering import usage_events
+from app.services.pcb_drc import shutdown_process_pool
+from app.services.rtl_index import rtl_index_registry
+from app.utils.token_verifier import token_verifier
 
 # --- Configuration ---
 # Your Firebase Admin SDK credentials. For production, load this from a secret environment variable.
@@ -42,11 +53,34 @@ UPLOAD_DIR = os.path.join("uploads", "project-files")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 print(f"📁 File upload directory: {os.path.abspath(UPLOAD_DIR)}")
 
+# --- Application Lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: connects to MongoDB, applies the declared indexes and prefetches the token signing certificates.
+    Shutdown: writes buffered usage events, stops the membership product listener and the PCB DRC
+    worker processes, and closes the LLM and MongoDB connections.
+    """
+    await connections.connect_to_db()
+    if connections.mongo_client is not None:
+        await ensure_indexes(connections.mongo_client[settings.MONGO_DB_NAME])
+    try:
+        await token_verifier.refresh_certs()
+    except Exception as e:
+        print(f"❌ Failed to prefetch Firebase signing certificates (will retry on first request): {e}")
+    yield
+    await usage_events.flush()
+    product_catalog.stop()
+    shutdown_process_pool()
+    await close_llm_client()
+    await connections.close_db_connections()
+
 # Your FastAPI application instance
 app = FastAPI(
     title="EDA Backend API",
     description="A backend for handling EDA tool logic and file management.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- CORS Middleware ---
@@ -60,6 +94,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Versioned API (users, projects, tools, payments, chat, ...) ---
+app.include_router(api_router, prefix=settings.API_V1_STR)
+
 # --- Models for API Request Bodies ---
 class SaveCodeRequest(BaseModel):
     project_id: str = Field(..., description="The ID of the project.")
@@ -108,6 +145,13 @@ async def save_code(save_request: SaveCodeRequest, user_id: str = Depends(get_cu
             
         print(f"Saved file for user {user_id} at {file_path}")
 
+        # Keep the project's AI chat retrieval index current without rescanning the project
+        file_stat = os.stat(file_path)
+        rtl_index_registry.note_saved(
+            save_request.project_id, os.path.basename(file_path), save_request.code,
+            f"{file_stat.st_mtime_ns}:{file_stat.st_size}"
+        )
+
         # Update Firestore to reflect the file save
         project_ref = db.collection('artifacts').document(APP_IDENTIFIER) \
                         .collection('users').document(user_id) \
@@ -0,0 +1,126 @@
+# eda-backend/app/middleware/rate_limit.py
+# Per-user, per-route token-bucket rate limiting with rates taken from the user's membership plan.
+
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Callable, Tuple
+from fastapi import HTTPException, status, Depends
+from app.api.deps import get_current_user, CurrentUser
+from app.core.config import settings
+from app.utils.membership_plan import get_rate_limit
+from app.utils.metrics import metrics
+
+PRUNE_EVERY = 10000 # Acquisitions between sweeps of idle buckets
+IDLE_BUCKET_SECONDS = 24 * 3600
+
+allowed_total = metrics.counter("rate_limit_allowed_total", "Requests admitted by the rate limiter, by route and plan.")
+throttled_total = metrics.counter("rate_limit_throttled_total", "Requests rejected with 429 by the rate limiter, by route and plan.")
+store_errors_total = metrics.counter("rate_limit_store_errors_total", "Rate limiter store failures (requests were let through).")
+
+
+class SQLiteTokenBucketStore:
+    """
+    Token buckets in a SQLite file. Every gunicorn worker on the host opens the same file, and each
+    acquisition is one IMMEDIATE transaction, so limits hold across workers. A networked store
+    (e.g. Redis) can replace this class as long as `acquire` stays atomic.
+    """
+    def __init__(self, path: str, max_workers: int = 4):
+        self.path = path
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rate-limit")
+        self._acquisitions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _acquire_sync(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        """Takes one token if available. Returns (allowed, seconds until a token is available)."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * refill_per_second)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (key, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        retry_after = 0.0 if allowed else (1.0 - tokens) / refill_per_second
+        return allowed, retry_after
+
+    def _prune_sync(self) -> None:
+        self._connection().execute("DELETE FROM buckets WHERE updated_at < ?", (time.time() - IDLE_BUCKET_SECONDS,))
+
+    async def acquire(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        loop = asyncio.get_event_loop()
+        self._acquisitions += 1
+        if self._acquisitions % PRUNE_EVERY == 0:
+            loop.run_in_executor(self._executor, self._prune_sync)
+        return await loop.run_in_executor(
+            self._executor, lambda: self._acquire_sync(key, capacity, refill_per_second)
+        )
+
+
+bucket_store = SQLiteTokenBucketStore(settings.RATE_LIMIT_DB_PATH)
+
+
+def rate_limit(route_name: str, limit_group: str) -> Callable[[CurrentUser], None]:
+    """
+    Dependency factory that throttles a route per user. `limit_group` selects the rate from the
+    'rateLimits' of the user's membership plan (e.g. 'chat', 'tools'); every route has its own bucket.
+    Throttled requests get 429 with a Retry-After header. If the store fails, requests are let through.
+    """
+    async def _rate_limit_dependency(
+        current_user: Annotated[CurrentUser, Depends(get_current_user)]
+    ) -> None:
+        membership = current_user.user_data.get("membership", "free")
+        capacity, refill_per_minute = get_rate_limit(membership, limit_group)
+        labels = {"route": route_name, "plan": membership}
+        try:
+            allowed, retry_after = await bucket_store.acquire(
+                f"{current_user.firebase_uid}:{route_name}", capacity, refill_per_minute / 60.0
+            )
+        except Exception as e:
+            print(f"🔥 ERROR in rate limiter store, allowing request: {repr(e)}")
+            store_errors_total.inc()
+            return
+
+        if not allowed:
+            throttled_total.inc(labels=labels)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please slow down and try again shortly.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+        allowed_total.inc(labels=labels)
+
+    return _rate_limit_dependency
@@ -1,6 +1,6 @@
 # rtl-editor-backend/app/models/common.py
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class ToolResponse(BaseModel):
     """
@@ -9,4 +9,5 @@ class ToolResponse(BaseModel):
     success: bool
     log: str # Full output log from the EDA tool
     message: str # A short, user-friendly message
-    waveformData: List[Dict[str, Any]] = [] # Optional: for simulation results
\ No newline at end of file
+    waveformData: List[Dict[str, Any]] = [] # Optional: for simulation results
+    triage: Optional[Dict[str, Any]] = None # Classified, deduplicated diagnostics from the log (services/log_triage)
@@ -0,0 +1,21 @@
+# rtl-editor-backend/app/models/pcb_models.py
+from typing import Any, Dict, List, Optional
+from app.models.common import ToolResponse
+
+class PcbValidationResult(ToolResponse):
+    """
+    Result of a PCB design rule check.
+    """
+    errors: List[str] = [] # One line per error, with its location
+    warnings: List[str] = []
+    violations: List[Dict[str, Any]] = [] # Structured violations: rule, layer(s), items, nets, location, actual/required
+    stats: Dict[str, Any] = {} # Board size and check timings
+
+class GerberGenerationResult(ToolResponse):
+    """
+    Result of Gerber/Excellon generation. The files are in a zip archive referenced by `archive`,
+    not inlined, so the response stays small however complex the board is.
+    """
+    archive: Optional[Dict[str, Any]] = None # storagePath (or artifactId for GET /pcb/artifacts/{id}), size, contentType
+    artifacts: List[Dict[str, Any]] = [] # One per file in the archive: name, layer, function, size, compressedSize, crc32
+    stats: Dict[str, Any] = {}
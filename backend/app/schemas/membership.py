@@ -2,7 +2,7 @@
 # Pydantic schemas for Membership-related data (ToolAccessConfig, ToolAccessDetails).
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 # --- Tool Access Configuration within a Membership Product ---
@@ -33,3 +33,35 @@ class ToolAccessConfig(BaseModel):
             }
         }
 
+
+# --- Bulk Membership Updates (Admin) ---
+class BulkMembershipUserFilter(BaseModel):
+    """Selects users the same way the admin user listing does."""
+    membership: Optional[str] = None
+    isAdmin: Optional[bool] = None
+    createdAfter: Optional[datetime] = None
+    createdBefore: Optional[datetime] = None
+
+class BulkMembershipUpdateRequest(BaseModel):
+    """
+    Applies one membership change to many users. Target users with either `firebaseUids` or
+    `filter`; set `membership`, `customProductId`, or both.
+    """
+    firebaseUids: Optional[List[str]] = Field(None, max_length=100000)
+    filter: Optional[BulkMembershipUserFilter] = None
+    membership: Optional[str] = None
+    customProductId: Optional[str] = None
+
+class BulkMembershipFailure(BaseModel):
+    firebaseUid: str
+    error: str
+
+class BulkMembershipJobResponse(BaseModel):
+    jobId: str
+    status: str # pending, running, completed, failed
+    totalUsers: Optional[int] = None # Known up front only for explicit firebaseUids
+    processed: int = 0
+    modified: int = 0
+    failedCount: int = 0
+    failures: List[BulkMembershipFailure] = [] # First BULK_MEMBERSHIP_MAX_REPORTED_FAILURES only
+    error: Optional[str] = None
@@ -13,6 +13,31 @@ class FileMetadata(BaseModel):
     fileUrl: str # Public URL (if public) or placeholder for signed URL
     fileType: str
     uploadedAt: datetime = Field(default_factory=datetime.utcnow)
+    size: Optional[int] = Field(None, description="Size of the stored file in bytes")
+    checksum: Optional[str] = Field(None, description="sha256 over the per-chunk sha256 digests of the upload")
+
+class FileListResponse(BaseModel):
+    """One page of a project's files."""
+    items: List[FileMetadata] = []
+    nextCursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
+
+# --- Resumable Upload Schemas ---
+class UploadSessionCreate(BaseModel):
+    """Schema for starting a resumable project file upload."""
+    fileName: str = Field(..., min_length=1, max_length=255)
+    contentType: str = Field("application/octet-stream", description="MIME type of the file")
+    size: int = Field(..., gt=0, description="Declared total size of the file in bytes")
+
+class UploadSessionResponse(BaseModel):
+    """Schema for the state of a resumable upload session."""
+    uploadId: str = Field(..., description="Firestore Document ID of the upload session")
+    projectId: str
+    fileName: str
+    size: int
+    bytesReceived: int = Field(0, description="Bytes durably committed to storage; resume from this offset")
+    chunkSize: int
+    status: str = Field("pending", description="pending, completed, rejected (over the storage quota)")
+    file: Optional[FileMetadata] = None
 
 class ProjectBase(BaseModel):
     """Base schema for a project."""
@@ -27,6 +52,8 @@ class ProjectCreate(ProjectBase):
 
 class ProjectUpdate(ProjectBase):
     """Schema for updating an existing project."""
+    # Only these fields can be changed; server-only fields such as the deletion tombstone
+    # ('deletionJobId', 'deletedAt') are not declared here, so they are dropped from requests.
     name: Optional[str] = None
     description: Optional[str] = None
     status: Optional[str] = None
@@ -35,7 +62,8 @@ class ProjectResponse(ProjectBase):
     """Schema for project data returned in API responses."""
     id: str = Field(..., description="Firestore Document ID")
     userId: str = Field(..., description="Firebase UID of the project owner")
-    files: List[FileMetadata] = []
+    fileCount: int = Field(0, description="Number of files; list them via /projects/{id}/files")
+    totalFileBytes: int = Field(0, description="Combined size of the project's files in bytes")
     createdAt: datetime
     updatedAt: datetime
 
@@ -44,6 +72,15 @@ class ProjectResponse(ProjectBase):
         json_encoders = {datetime: lambda dt: dt.isoformat()}
         populate_by_name = True
 
+# Fields a client may request with `GET /projects?fields=...`; "id" is the document ID.
+PROJECT_LIST_FIELDS = ("id", "name", "description", "status", "userId", "fileCount", "totalFileBytes", "createdAt", "updatedAt")
+
+class ProjectListResponse(BaseModel):
+    """One page of the user's projects, newest activity first."""
+    items: List[Dict[str, Any]] = Field([], description="Projects, limited to the requested fields")
+    nextCursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
+    totalCount: Optional[int] = Field(None, description="Total number of projects; only computed for the first page")
+
 # --- Membership Product Schemas (now in project.py) ---
 # These were previously in project.py, now they are here
 # We need to import ToolAccessDetails from app.schemas.membership
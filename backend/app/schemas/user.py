@@ -1,7 +1,7 @@
 # eda-backend/app/schemas/user.py
 
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -52,3 +52,14 @@ class UserResponse(BaseModel):
         json_encoders = {
             datetime: lambda dt: dt.isoformat()
         }
+
+# Fields an admin user listing or export may project; "firebaseUid" is always included.
+USER_LIST_FIELDS = (
+    "firebaseUid", "email", "name", "membership", "isAdmin", "customMembershipProductId",
+    "membershipExpiresAt", "aiUsesLeft", "storageBytesUsed", "createdAt", "updatedAt"
+)
+
+class UserListResponse(BaseModel):
+    """One page of the admin user listing. Pass `nextCursor` back as `cursor` to get the next page."""
+    items: List[Dict[str, Any]]
+    nextCursor: Optional[str] = None
@@ -4,13 +4,35 @@
 import asyncio
 from typing import Dict, Any
 from app.core.config import settings
+from app.services.ai_gateway import ai_gateway, AIUnavailableError
+from app.services.log_triage import triage_log, unclassified_residue
 
 # Placeholder for actual AI API calls.
 # You would integrate Google Gemini API here.
 # Example using a hypothetical Gemini client:
 # from google.generativeai import GenerativeModel # Assuming you install google-generativeai
 
-async def process_design_request(design_data: Dict[str, Any]) -> Dict[str, Any]:
+def _degraded_design_response(error: AIUnavailableError) -> Dict[str, Any]:
+    """Returned instead of an analysis while the AI service is unavailable, so tool jobs still complete."""
+    return {
+        "analysis": "AI analysis was skipped because the AI service is temporarily unavailable.",
+        "suggestions": [],
+        "generatedCodeSnippet": None,
+        "status": "degraded",
+        "cost_estimate": 0.0
+    }
+
+async def process_design_request(design_data: Dict[str, Any], call_site: str = "design") -> Dict[str, Any]:
+    """
+    Runs a design request through the AI gateway: bounded concurrency, identical in-flight requests
+    share one call, and a degraded response (status 'degraded') while the service is unavailable.
+    `call_site` labels the gateway metrics, e.g. with the calling tool's name.
+    """
+    return await ai_gateway.call(
+        call_site, design_data, lambda: _process_design_request(design_data), fallback=_degraded_design_response
+    )
+
+async def _process_design_request(design_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Simulates processing a design request using an AI agent.
     Replace this with actual calls to Google Gemini API or other AI services.
@@ -41,17 +63,50 @@ async def process_design_request(design_data: Dict[str, Any]) -> Dict[str, Any]:
     print("AI Service: Design request processed (simulated).")
     return simulated_response
 
-async def analyze_tool_log(log_data: Dict[str, Any]) -> Dict[str, Any]:
+async def analyze_tool_log(log_data: Dict[str, Any], call_site: str = "toolLog") -> Dict[str, Any]:
+    """
+    Analyzes a tool log. Known Verilator/Yosys/iverilog diagnostics are classified locally
+    (services/log_triage); only the unclassified residue, capped at LOG_TRIAGE_RESIDUE_MAX_CHARS,
+    goes to the AI agent, and not at all when everything was recognised.
+    `log_data` carries the raw log as 'log' (a string or a list of lines) and optionally 'tool'.
+    """
+    log = log_data.get("log") or ""
+    lines = log.splitlines() if isinstance(log, str) else log
+    # Multi-MB logs take a moment to scan; keep it off the event loop.
+    triage = await asyncio.get_event_loop().run_in_executor(None, triage_log, lines)
+    residue = unclassified_residue(triage)
+
+    response = {
+        "summary": f"{triage['errorCount']} error(s) and {triage['warningCount']} warning(s) in {len(triage['diagnostics'])} distinct diagnostics.",
+        "anomaliesDetected": triage["errorCount"] > 0 or bool(triage["unclassified"]),
+        "recommendations": [d["hint"] for d in triage["diagnostics"] if d["hint"]][:10],
+        "triage": triage,
+        "aiAnalysis": None,
+    }
+    if residue:
+        residue_request = {"tool": log_data.get("tool"), "residue": residue}
+        response["aiAnalysis"] = await ai_gateway.call(
+            call_site, residue_request, lambda: _analyze_log_residue(residue_request), fallback=_degraded_log_analysis
+        )
+    return response
+
+def _degraded_log_analysis(error: AIUnavailableError) -> Dict[str, Any]:
+    return {
+        "summary": "AI analysis of the unclassified log lines was skipped because the AI service is temporarily unavailable.",
+        "recommendations": [],
+        "status": "degraded",
+    }
+
+async def _analyze_log_residue(residue_request: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Simulates analyzing tool logs using an AI agent.
+    Simulates analyzing the unclassified part of a tool log using an AI agent.
     """
-    print("AI Service: Analyzing tool log...")
+    print(f"AI Service: Analyzing {len(residue_request['residue'])} characters of unclassified log output...")
     await asyncio.sleep(1)
     simulated_response = {
-        "summary": "Simulated AI summary of tool log. No critical anomalies detected.",
-        "anomaliesDetected": False,
+        "summary": "Simulated AI summary of the unclassified log lines. No critical anomalies detected.",
         "recommendations": ["Ensure consistent input formatting."],
+        "status": "success",
     }
     print("AI Service: Tool log analysis processed (simulated).")
     return simulated_response
-
@@ -0,0 +1,194 @@
+# eda-backend/app/services/ai_gateway.py
+# Gateway in front of every AI provider call: bounded concurrency, coalescing of identical
+# in-flight requests, a circuit breaker that fails fast while the provider is down, and metrics.
+
+import asyncio
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+from app.utils.metrics import metrics
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+call_duration = metrics.histogram(
+    "ai_call_duration_seconds", "Latency of AI provider calls, by call site and outcome.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+calls_total = metrics.counter("ai_calls_total", "AI gateway calls by call site and outcome (success, error, busy, circuit_open, coalesced).")
+inflight = metrics.gauge("ai_calls_in_flight", "AI provider calls currently holding a concurrency slot, by call site.")
+circuit_state = metrics.gauge("ai_circuit_state", "AI gateway circuit breaker state: 0 closed, 1 half-open, 2 open.")
+
+
+class AIUnavailableError(Exception):
+    """Raised without calling the provider, because it is failing or saturated. Safe to retry after `retry_after` seconds."""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `cooldown_seconds`.
+    Then one probe call is let through (half-open): success closes the circuit, failure reopens it.
+    """
+    def __init__(self, name: str, failure_threshold: int, cooldown_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        circuit_state.set(_STATE_VALUES[CLOSED], labels={"gateway": name})
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            print(f"AI gateway '{self.name}' circuit {self.state} -> {state}")
+        self.state = state
+        circuit_state.set(_STATE_VALUES[state], labels={"gateway": self.name})
+
+    def retry_after(self) -> float:
+        return max(1.0, self.opened_at + self.cooldown_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self.failures = 0
+        self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def release_probe(self) -> None:
+        """For calls that ended without telling us anything about the provider (e.g. cancelled)."""
+        self._probe_in_flight = False
+
+
+def _payload_key(call_site: str, payload: Any) -> str:
+    return call_site + ":" + hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class AIGateway:
+    """
+    Every AI call goes through `call` (request/response) or `slot` (streams). At most
+    `max_concurrency` calls reach the provider at once; others wait up to `queue_timeout_seconds`
+    for a slot and are then rejected, so a slow provider cannot pile up requests until workers
+    time out. Identical payloads already in flight share one provider call.
+    """
+    def __init__(self, name: str, max_concurrency: int, queue_timeout_seconds: float, breaker: CircuitBreaker):
+        self.name = name
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.breaker = breaker
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @asynccontextmanager
+    async def slot(
+        self, call_site: str, is_failure: Callable[[BaseException], bool] = lambda e: True
+    ) -> AsyncIterator[None]:
+        """
+        Holds a concurrency slot for the duration of the block and reports its outcome to the
+        circuit breaker. Raises AIUnavailableError instead of entering while the circuit is open
+        or no slot frees up in time. `is_failure` decides which errors count against the provider
+        (e.g. not a 400 caused by our own request).
+        """
+        labels = {"site": call_site}
+        if not self.breaker.allow():
+            calls_total.inc(labels={**labels, "outcome": "circuit_open"})
+            raise AIUnavailableError("The AI service is temporarily unavailable.", self.breaker.retry_after())
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.breaker.release_probe()
+            calls_total.inc(labels={**labels, "outcome": "busy"})
+            raise AIUnavailableError("The AI service is busy. Please try again shortly.", self.queue_timeout_seconds)
+
+        inflight.inc(labels=labels)
+        started = time.monotonic()
+        outcome = "success"
+        try:
+            yield
+            self.breaker.record_success()
+        except Exception as e:
+            outcome = "error"
+            if is_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success() # The provider answered; the request itself was at fault
+            raise
+        except BaseException:
+            outcome = "cancelled"
+            self.breaker.release_probe()
+            raise
+        finally:
+            self._semaphore.release()
+            inflight.dec(labels=labels)
+            call_duration.observe(time.monotonic() - started, labels={**labels, "outcome": outcome})
+            calls_total.inc(labels={**labels, "outcome": outcome})
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception() # Retrieved here so an error nobody is still waiting for is not logged as unhandled
+
+    async def _run(self, call_site: str, fn: Callable[[], Awaitable[Any]], is_failure: Callable[[BaseException], bool]) -> Any:
+        async with self.slot(call_site, is_failure):
+            return await fn()
+
+    async def call(
+        self,
+        call_site: str,
+        payload: Any,
+        fn: Callable[[], Awaitable[Any]],
+        fallback: Optional[Callable[[AIUnavailableError], Any]] = None,
+        is_failure: Callable[[BaseException], bool] = lambda e: True
+    ) -> Any:
+        """
+        Runs `fn` through the gateway. Callers passing an equal `payload` for the same call site
+        while it runs get the same result (or error). With a `fallback`, a rejected call returns
+        fallback(error) (a degraded answer) instead of raising AIUnavailableError.
+        """
+        key = _payload_key(call_site, payload)
+        task = self._inflight.get(key)
+        if task is not None:
+            calls_total.inc(labels={"site": call_site, "outcome": "coalesced"})
+        else:
+            task = asyncio.ensure_future(self._run(call_site, fn, is_failure))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        try:
+            # Shielded so one caller going away does not cancel the call for the others sharing it.
+            return await asyncio.shield(task)
+        except AIUnavailableError as e:
+            if fallback is None:
+                raise
+            return fallback(e)
+
+
+ai_gateway = AIGateway(
+    "llm",
+    max_concurrency=settings.AI_GATEWAY_MAX_CONCURRENCY,
+    queue_timeout_seconds=settings.AI_GATEWAY_QUEUE_TIMEOUT_SECONDS,
+    breaker=CircuitBreaker(
+        "llm",
+        failure_threshold=settings.AI_BREAKER_FAILURE_THRESHOLD,
+        cooldown_seconds=settings.AI_BREAKER_COOLDOWN_SECONDS
+    )
+)
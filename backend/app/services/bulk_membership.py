@@ -0,0 +1,119 @@
+# eda-backend/app/services/bulk_membership.py
+# Service for applying one membership change to many users with batched MongoDB bulk writes.
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.database import Database as MongoDatabase
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.services.user_cache import user_profile_cache
+
+BULK_JOBS_COLLECTION = "bulkMembershipJobs"
+
+
+async def create_bulk_job(mongo_db: MongoDatabase, admin_uid: str, total_users: Optional[int], update_fields: Dict[str, Any]) -> str:
+    """Records a pending bulk membership job and returns its ID."""
+    result = await mongo_db[BULK_JOBS_COLLECTION].insert_one({
+        "status": "pending",
+        "createdBy": admin_uid,
+        "totalUsers": total_users,
+        "processed": 0,
+        "modified": 0,
+        "failedCount": 0,
+        "failures": [],
+        "update": {k: v for k, v in update_fields.items() if k != "updatedAt"},
+        "createdAt": datetime.utcnow(),
+        "updatedAt": datetime.utcnow(),
+    })
+    return str(result.inserted_id)
+
+
+async def get_bulk_job(mongo_db: MongoDatabase, job_id: str) -> Optional[dict]:
+    try:
+        return await mongo_db[BULK_JOBS_COLLECTION].find_one({"_id": ObjectId(job_id)})
+    except Exception:
+        return None
+
+
+async def _uid_batches(
+    mongo_db: MongoDatabase,
+    firebase_uids: Optional[List[str]],
+    user_filter: Optional[Dict[str, Any]],
+    batch_size: int
+) -> AsyncIterator[List[str]]:
+    """Yields the targeted UIDs in batches; a filter is streamed from a cursor, never loaded whole."""
+    if firebase_uids is not None:
+        unique_uids = list(dict.fromkeys(firebase_uids))
+        for start in range(0, len(unique_uids), batch_size):
+            yield unique_uids[start:start + batch_size]
+        return
+
+    batch: List[str] = []
+    cursor = mongo_db.users.find(user_filter or {}, projection={"firebaseUid": True, "_id": False}).batch_size(batch_size)
+    async for user in cursor:
+        batch.append(user["firebaseUid"])
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def run_bulk_membership_update(
+    job_id: str,
+    mongo_db: MongoDatabase,
+    update_fields: Dict[str, Any],
+    firebase_uids: Optional[List[str]] = None,
+    user_filter: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Applies `update_fields` to every targeted user with unordered bulk_write calls of
+    BULK_MEMBERSHIP_BATCH_SIZE updates. After each batch the job document records progress
+    and the users that failed (unknown UIDs or rejected writes), so one bad user never stops the rest.
+    """
+    jobs = mongo_db[BULK_JOBS_COLLECTION]
+    job_filter = {"_id": ObjectId(job_id)}
+    await jobs.update_one(job_filter, {"$set": {"status": "running", "updatedAt": datetime.utcnow()}})
+    max_reported = settings.BULK_MEMBERSHIP_MAX_REPORTED_FAILURES
+
+    try:
+        async for uids in _uid_batches(mongo_db, firebase_uids, user_filter, settings.BULK_MEMBERSHIP_BATCH_SIZE):
+            batch_count = len(uids)
+            failures: List[Dict[str, str]] = []
+            if firebase_uids is not None:
+                # Explicit IDs may name users that do not exist; report those instead of silently matching nothing.
+                found = await mongo_db.users.find(
+                    {"firebaseUid": {"$in": uids}}, projection={"firebaseUid": True, "_id": False}
+                ).to_list(len(uids))
+                found_uids = {user["firebaseUid"] for user in found}
+                failures += [{"firebaseUid": uid, "error": "User not found."} for uid in uids if uid not in found_uids]
+                uids = [uid for uid in uids if uid in found_uids]
+
+            modified = 0
+            if uids:
+                operations = [UpdateOne({"firebaseUid": uid}, {"$set": update_fields}) for uid in uids]
+                try:
+                    result = await mongo_db.users.bulk_write(operations, ordered=False)
+                    modified = result.modified_count
+                except BulkWriteError as e:
+                    modified = e.details.get("nModified", 0)
+                    failures += [
+                        {"firebaseUid": uids[error["index"]], "error": error.get("errmsg", "Write failed.")}
+                        for error in e.details.get("writeErrors", [])
+                    ]
+                for uid in uids:
+                    user_profile_cache.invalidate(uid)
+
+            await jobs.update_one(job_filter, {
+                "$inc": {"processed": batch_count, "modified": modified, "failedCount": len(failures)},
+                "$push": {"failures": {"$each": failures, "$slice": max_reported}},
+                "$set": {"updatedAt": datetime.utcnow()},
+            })
+
+        await jobs.update_one(job_filter, {"$set": {"status": "completed", "completedAt": datetime.utcnow(), "updatedAt": datetime.utcnow()}})
+        print(f"Bulk membership job {job_id} completed.")
+    except Exception as e:
+        print(f"Bulk membership job {job_id} failed: {e}")
+        await jobs.update_one(job_filter, {"$set": {"status": "failed", "error": str(e), "updatedAt": datetime.utcnow()}})
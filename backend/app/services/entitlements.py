@@ -0,0 +1,169 @@
+# eda-backend/app/services/entitlements.py
+# Resolves which tools a user may run. Each user's effective access is compiled once into a
+# frozen lookup table; membership products are mirrored in memory by a Firestore snapshot listener.
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+from firebase_admin import firestore
+from app.core.config import settings
+from app.schemas.project import MembershipProductResponse
+from app.utils.cache import TTLCache
+from app.utils.membership_plan import MEMBERSHIP_PLANS
+from app.utils.metrics import metrics
+
+MEMBERSHIP_PRODUCTS_COLLECTION = "membershipProducts"
+
+compilations = metrics.counter("entitlement_compilations_total", "User entitlement tables compiled.")
+catalog_reloads = metrics.counter("membership_catalog_reloads_total", "Membership product snapshots applied.")
+
+
+@dataclass(frozen=True)
+class ToolEntitlement:
+    hasAccess: bool
+    limit: int # -1 for unlimited
+    denyReason: str = ""
+
+
+@dataclass(frozen=True)
+class Entitlements:
+    """A user's compiled tool access. Checking a tool is a dict lookup plus an expiry comparison."""
+    membership: str
+    tools: Mapping[str, ToolEntitlement]
+    defaultDenyReason: str
+    expiresAt: Optional[datetime] = None
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        return self.expiresAt is not None and self.expiresAt < (now or datetime.utcnow())
+
+    def get(self, tool_name: str) -> ToolEntitlement:
+        return self.tools.get(tool_name) or ToolEntitlement(
+            False, 0, self.defaultDenyReason.replace("{tool_name}", tool_name)
+        )
+
+
+class MembershipProductCatalog:
+    """
+    In-memory copy of every membership product, kept current by an on_snapshot listener on
+    'membershipProducts'. Listener callbacks run on a Firestore thread and swap in a new dict,
+    so readers never see a partial update. `version` changes with every snapshot.
+    """
+    def __init__(self):
+        self._products: Dict[str, MembershipProductResponse] = {}
+        self._watch = None
+        self._lock = threading.Lock()
+        self.version = 0
+        self.ready = threading.Event()
+
+    def ensure_listening(self, firestore_db: firestore.Client) -> None:
+        if self._watch is not None:
+            return
+        with self._lock:
+            if self._watch is None:
+                self._watch = firestore_db.collection(MEMBERSHIP_PRODUCTS_COLLECTION).on_snapshot(self._on_snapshot)
+                print("👂 Listening for membership product changes.")
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+                self.ready.clear()
+
+    def _on_snapshot(self, doc_snapshots: Any, changes: Any, read_time: Any) -> None:
+        products = {}
+        for doc in doc_snapshots:
+            try:
+                products[doc.id] = MembershipProductResponse(**{**doc.to_dict(), "id": doc.id})
+            except Exception as e:
+                print(f"Warning: Skipping invalid membership product '{doc.id}': {e}")
+        self._products = products
+        self.version += 1
+        self.ready.set()
+        catalog_reloads.inc()
+
+    def get(self, product_id: str) -> Optional[MembershipProductResponse]:
+        return self._products.get(product_id)
+
+    async def load(self, firestore_db: firestore.Client, product_id: str) -> Optional[MembershipProductResponse]:
+        """Catalog lookup. Reads Firestore directly only until the listener's first snapshot has arrived."""
+        self.ensure_listening(firestore_db)
+        if self.ready.is_set():
+            return self.get(product_id)
+        product_doc = await firestore_db.collection(MEMBERSHIP_PRODUCTS_COLLECTION).document(product_id).get()
+        if not product_doc.exists:
+            return None
+        return MembershipProductResponse(**{**product_doc.to_dict(), "id": product_doc.id})
+
+
+def compile_entitlements(user_data: dict, product: Optional[MembershipProductResponse]) -> Entitlements:
+    """
+    Builds a user's lookup table with the same precedence check_membership always used:
+    1. entries in the profile's 'activeToolAccess' (written by admin updates and payments),
+    2. the assigned custom product, when it exists (tools it does not list are denied),
+    3. the base membership plan.
+    """
+    membership = user_data.get("membership", "free")
+    tools: Dict[str, ToolEntitlement] = {}
+
+    if product:
+        default_deny = f"Your custom plan '{product.name}' does not grant access to '{{tool_name}}'."
+        for tool_name, details in product.toolAccess.items():
+            tools[tool_name] = ToolEntitlement(details.hasAccess, details.limit, default_deny.replace("{tool_name}", tool_name))
+    else:
+        if user_data.get("customMembershipProductId"):
+            print(f"Warning: Custom Membership Product '{user_data['customMembershipProductId']}' not found. Falling back to base plan.")
+        base_plan_details = MEMBERSHIP_PLANS.get(membership)
+        if base_plan_details:
+            default_deny = f"Your base membership ({membership}) does not grant access to '{{tool_name}}'. Please upgrade."
+            for tool_name, has_access in base_plan_details["toolAccess"].items():
+                limit = base_plan_details["usageLimits"].get(tool_name, 0)
+                tools[tool_name] = ToolEntitlement(has_access, limit, default_deny.replace("{tool_name}", tool_name))
+        else:
+            default_deny = "Access to '{tool_name}' is denied. No valid membership found."
+
+    for tool_name, details in (user_data.get("activeToolAccess") or {}).items():
+        details = details if isinstance(details, dict) else {}
+        tools[tool_name] = ToolEntitlement(
+            bool(details.get("hasAccess", False)),
+            int(details.get("limit", 0)),
+            f"Your current plan does not grant access to '{tool_name}'."
+        )
+
+    expires_at = user_data.get("membershipExpiresAt") if membership != "free" else None
+    compilations.inc()
+    return Entitlements(
+        membership=membership,
+        tools=MappingProxyType(tools),
+        defaultDenyReason=default_deny,
+        expiresAt=expires_at
+    )
+
+
+class EntitlementResolver:
+    """
+    Caches compiled entitlements per user. An entry is keyed by the profile's 'updatedAt' (every
+    membership write sets it) and the catalog version, so a membership or product change compiles
+    a fresh table on the next request and nothing needs explicit invalidation.
+    """
+    def __init__(self, catalog: MembershipProductCatalog, max_entries: int):
+        self.catalog = catalog
+        self._compiled = TTLCache(max_entries=max_entries, ttl_seconds=24 * 3600)
+
+    async def resolve(self, firestore_db: firestore.Client, firebase_uid: str, user_data: dict) -> Entitlements:
+        product_id = user_data.get("customMembershipProductId")
+        cache_key = (firebase_uid, user_data.get("updatedAt"), product_id, self.catalog.version)
+        entitlements = self._compiled.get(cache_key)
+        if entitlements is None:
+            product = await self.catalog.load(firestore_db, product_id) if product_id else None
+            entitlements = compile_entitlements(user_data, product)
+            # Pre-snapshot compilations read Firestore directly; don't pin them to catalog version 0.
+            if self.catalog.ready.is_set() or not product_id:
+                self._compiled.set(cache_key, entitlements)
+        return entitlements
+
+
+product_catalog = MembershipProductCatalog()
+entitlement_resolver = EntitlementResolver(product_catalog, max_entries=settings.USER_CACHE_SIZE)
@@ -0,0 +1,245 @@
+# eda-backend/app/services/gerber_writer.py
+# Fabrication output: one RS-274X (Gerber X2) file per copper layer and Excellon drill files
+# (plated and unplated holes kept apart so mounting holes are not plated),
+# generated one primitive at a time and streamed into a zip archive. Apertures are deduplicated
+# into a single table, so the same pad or track width has the same D code on every layer.
+
+import math
+import os
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.services.pcb_drc import Board
+
+GENERATOR = "EDA Backend,PCB Tools,1.0"
+WRITE_CHUNK_LINES = 4096 # Lines joined into each chunk the writers yield
+READ_CHUNK_BYTES = 1024 * 1024 # Pre-written layer files are copied into the archive in chunks this size
+FIRST_APERTURE = 10 # D01-D09 are operation codes
+
+ApertureKey = Tuple[Any, ...] # ("C", diameter) | ("R", w, h) | ("O", w, h)
+
+
+def _coordinate(value: float) -> str:
+    # Format 4.6 in mm: the coordinate as an integer number of nanometres
+    return str(int(round(value * 1_000_000)))
+
+
+def _is_right_angle(rotation: float) -> bool:
+    return rotation % 90 == 0
+
+
+def _pad_feature(x: float, y: float, width: float, height: float, rotation: float, shape: str) -> tuple:
+    """
+    How a pad is drawn: ("flash", aperture) for shapes a standard aperture can take, ("stroke",
+    aperture, x1, y1, x2, y2) for an oval at an odd angle, ("region", corners) for a rotated
+    rectangle. Rounded rectangles and other shapes are drawn as their bounding rectangle.
+    """
+    if shape == "circle" or (shape == "oval" and width == height):
+        return ("flash", ("C", round(min(width, height) if shape == "oval" else width, 6)))
+    if _is_right_angle(rotation):
+        if rotation % 180:
+            width, height = height, width
+        return ("flash", ("O" if shape == "oval" else "R", round(width, 6), round(height, 6)))
+    angle = math.radians(rotation)
+    cos_a, sin_a = math.cos(angle), -math.sin(angle) # y points down
+    if shape == "oval":
+        half = abs(width - height) / 2
+        dx, dy = (half * cos_a, half * sin_a) if width >= height else (-half * sin_a, half * cos_a)
+        return ("stroke", ("C", round(min(width, height), 6)), x - dx, y - dy, x + dx, y + dy)
+    corners = [
+        (x + cx * cos_a - cy * sin_a, y + cx * sin_a + cy * cos_a)
+        for cx, cy in ((-width / 2, -height / 2), (width / 2, -height / 2), (width / 2, height / 2), (-width / 2, height / 2))
+    ]
+    return ("region", corners)
+
+
+def _aperture_definition(code: int, key: ApertureKey) -> str:
+    if key[0] == "C":
+        return f"%ADD{code}C,{key[1]:.6f}*%"
+    return f"%ADD{code}{key[0]},{key[1]:.6f}X{key[2]:.6f}*%"
+
+
+def build_aperture_table(board: Board) -> Dict[ApertureKey, int]:
+    """Every distinct aperture on the board, numbered once for all layers."""
+    table: Dict[ApertureKey, int] = {}
+    widths = set()
+    for features in (board.artwork or {}).values():
+        for feature in features:
+            if feature[0] == "L":
+                widths.add(round(feature[5], 6))
+            elif feature[0] == "P":
+                drawn = _pad_feature(*feature[1:])
+                if drawn[0] != "region" and drawn[1] not in table:
+                    table[drawn[1]] = FIRST_APERTURE + len(table)
+    for width in sorted(widths):
+        table.setdefault(("C", width), FIRST_APERTURE + len(table))
+    return table
+
+
+def layer_file_name(layer: str) -> str:
+    return layer.replace(".", "_") + ".gbr"
+
+
+def file_function(layer: str, copper_layers: List[str]) -> str:
+    position = copper_layers.index(layer) + 1 if layer in copper_layers else len(copper_layers)
+    side = "Top" if position == 1 else "Bot" if position == len(copper_layers) else "Inr"
+    return f"Copper,L{position},{side}"
+
+
+def iter_gerber(
+    features: List[tuple], function: str, apertures: Dict[ApertureKey, int], created: str
+) -> Iterator[str]:
+    """
+    Writes one layer, yielding it in chunks of WRITE_CHUNK_LINES lines. Apertures are defined just
+    before their first use, which keeps the writer single-pass; the codes come from the shared table.
+    """
+    lines = [
+        f"%TF.GenerationSoftware,{GENERATOR}*%",
+        f"%TF.CreationDate,{created}*%",
+        f"%TF.FileFunction,{function}*%",
+        "%TF.FilePolarity,Positive*%",
+        "%FSLAX46Y46*%",
+        "%MOMM*%",
+        "%LPD*%",
+        "G01*",
+    ]
+    keys = {code: key for key, code in apertures.items()}
+    defined = set()
+    current: Optional[int] = None
+    pen: Optional[Tuple[float, float]] = None
+    stroke_codes: Dict[float, int] = {}
+    append = lines.append
+
+    for feature in features:
+        kind = feature[0]
+        if kind == "L":
+            _, x1, y1, x2, y2, width = feature
+            code = stroke_codes.get(width)
+            if code is None:
+                code = stroke_codes[width] = apertures[("C", round(width, 6))]
+        elif kind == "P":
+            drawn = _pad_feature(*feature[1:])
+            if drawn[0] == "region":
+                kind, outline = "R", drawn[1]
+            else:
+                code = apertures[drawn[1]]
+                if drawn[0] == "stroke":
+                    kind, (x1, y1, x2, y2) = "L", drawn[2:]
+                else:
+                    x1 = x2 = feature[1]
+                    y1 = y2 = feature[2]
+                    kind = "L"
+        else:
+            outline = feature[1]
+
+        if kind == "R":
+            points = [(float(px), float(py)) for px, py in outline]
+            append("G36*")
+            append(f"X{_coordinate(points[0][0])}Y{_coordinate(-points[0][1])}D02*")
+            for px, py in points[1:] + points[:1]:
+                append(f"X{_coordinate(px)}Y{_coordinate(-py)}D01*")
+            append("G37*")
+            pen = None
+        else:
+            if code not in defined:
+                defined.add(code)
+                append(_aperture_definition(code, keys[code]))
+            if code != current:
+                append(f"D{code}*")
+                current = code
+            if x1 == x2 and y1 == y2:
+                append(f"X{_coordinate(x1)}Y{_coordinate(-y1)}D03*")
+                pen = None
+            else:
+                if pen != (x1, y1):
+                    append(f"X{_coordinate(x1)}Y{_coordinate(-y1)}D02*")
+                append(f"X{_coordinate(x2)}Y{_coordinate(-y2)}D01*")
+                pen = (x2, y2)
+
+        if len(lines) >= WRITE_CHUNK_LINES:
+            yield "\n".join(lines) + "\n"
+            lines = []
+            append = lines.append
+
+    append("M02*")
+    yield "\n".join(lines) + "\n"
+
+
+def iter_excellon(holes: List[Tuple[float, float, float, float, float]], function: str, created: str) -> Iterator[str]:
+    """
+    Excellon drill file, metric with decimal coordinates; one tool per distinct diameter, slots as
+    G85. `function` (e.g. 'Plated,1,4,PTH') is written as the X2 file function comment fabs read.
+    """
+    by_tool: Dict[float, List[Tuple[float, float, float, float, float]]] = {}
+    for hole in holes:
+        by_tool.setdefault(round(hole[2], 4), []).append(hole)
+    tools = sorted(by_tool)
+
+    lines = [
+        "M48",
+        f"; DRILL file {GENERATOR} date {created}",
+        f"; #@! TF.FileFunction,{function}",
+        "; FORMAT={-:-/ absolute / metric / decimal}",
+        "FMAT,2",
+        "METRIC",
+    ]
+    lines += [f"T{number}C{diameter:.4f}" for number, diameter in enumerate(tools, start=1)]
+    lines += ["%", "G90", "G05"]
+    for number, diameter in enumerate(tools, start=1):
+        lines.append(f"T{number}")
+        for x, y, _, dx, dy in by_tool[diameter]:
+            if dx or dy:
+                lines.append(f"X{x - dx:.4f}Y{-(y - dy):.4f}G85X{x + dx:.4f}Y{-(y + dy):.4f}")
+            else:
+                lines.append(f"X{x:.4f}Y{-y:.4f}")
+            if len(lines) >= WRITE_CHUNK_LINES:
+                yield "\n".join(lines) + "\n"
+                lines = []
+    lines.append("M30")
+    yield "\n".join(lines) + "\n"
+
+
+def write_layer_file(
+    path: str, features: List[tuple], function: str, apertures: Dict[ApertureKey, int], created: str
+) -> str:
+    """Writes one layer to `path`. Runs in a worker process when layers are generated in parallel."""
+    with open(path, "w") as f:
+        for chunk in iter_gerber(features, function, apertures, created):
+            f.write(chunk)
+    return path
+
+
+def _read_chunks(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def read_layer_file(path: str) -> Iterator[bytes]:
+    """A pre-written layer file as archive input; the file is removed once copied."""
+    yield from _read_chunks(path)
+    os.remove(path)
+
+
+def write_archive(archive_path: str, members: Iterable[Tuple[str, Dict[str, Any], Iterable[Any]]]) -> List[Dict[str, Any]]:
+    """
+    Streams each member's chunks (str or bytes) into a deflated zip, never holding a whole file in
+    memory. Returns one artifact entry per member: name, size, compressed size and CRC-32.
+    """
+    artifacts = []
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for name, attributes, chunks in members:
+            with archive.open(name, "w", force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk.encode("ascii") if isinstance(chunk, str) else chunk)
+            info = archive.getinfo(name)
+            artifacts.append({
+                "name": name,
+                **attributes,
+                "size": info.file_size,
+                "compressedSize": info.compress_size,
+                "crc32": f"{info.CRC:08x}",
+            })
+    return artifacts
@@ -0,0 +1,243 @@
+# eda-backend/app/services/log_triage.py
+# Local triage of Verilator, Yosys and Icarus Verilog logs: known diagnostics are classified and
+# deduplicated with a compiled pattern index, so only the unrecognised residue needs AI analysis.
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+ERROR, WARNING = "error", "warning"
+
+
+@dataclass(frozen=True)
+class LogPattern:
+    tool: str
+    code: str
+    severity: str
+    category: str
+    regex: str # Named groups: msg (required), file, line, col, vcode (Verilator's own warning code)
+    hint: str = ""
+
+
+# Verilator prefixes every diagnostic with its own code; known codes are classified from this table.
+VERILATOR_CODES: Dict[str, Tuple[str, str]] = {
+    "UNUSED": ("unused", "Remove the signal or wrap it in /* verilator lint_off UNUSED */ if it is intentionally unused."),
+    "UNUSEDSIGNAL": ("unused", "Remove the signal or wrap it in /* verilator lint_off UNUSED */ if it is intentionally unused."),
+    "UNUSEDPARAM": ("unused", "Remove the parameter or use it."),
+    "UNDRIVEN": ("undriven", "Drive the signal or tie it off; undriven nets read as X in simulation."),
+    "WIDTH": ("width", "Operand widths differ; size the constant or slice/extend the signal explicitly."),
+    "WIDTHEXPAND": ("width", "Operand widths differ; size the constant or slice/extend the signal explicitly."),
+    "WIDTHTRUNC": ("width", "The value is truncated; check the target width or slice the source explicitly."),
+    "WIDTHCONCAT": ("width", "Size the unsized constants inside the concatenation."),
+    "SELRANGE": ("range", "The bit or part select is outside the declared range."),
+    "CASEINCOMPLETE": ("case", "Add a default branch so every case value is covered."),
+    "CASEOVERLAP": ("case", "Two case items match the same value; only the first one is ever taken."),
+    "CASEX": ("style", "Use casez instead of casex; casex also treats X in the case expression as don't-care."),
+    "LATCH": ("latch", "Assign every output on every path of the always_comb block, or give defaults at its top."),
+    "NOLATCH": ("latch", "No latch was inferred in an always_latch block; use always_comb instead."),
+    "MULTIDRIVEN": ("multidriven", "Drive the signal from a single always block."),
+    "BLKSEQ": ("assignment", "Use non-blocking assignments (<=) in clocked always blocks."),
+    "COMBDLY": ("assignment", "Use blocking assignments (=) in combinational always blocks."),
+    "BLKANDNBLK": ("assignment", "Do not mix blocking and non-blocking assignments to the same variable."),
+    "PROCASSWIRE": ("assignment", "Procedural assignment to a wire; declare the target as reg or logic."),
+    "PINMISSING": ("port", "Connect the missing port in the instance, or connect it explicitly as empty."),
+    "PINCONNECTEMPTY": ("port", "The port is connected as empty; check that this is intentional."),
+    "PINNOTFOUND": ("port", "The instance connects a port the module does not declare."),
+    "IMPLICIT": ("implicit-net", "Declare the net explicitly; `default_nettype none turns these into errors."),
+    "UNOPTFLAT": ("combinational-loop", "The signal is in (or looks like it is in) a combinational loop; check for feedback without a register."),
+    "ALWCOMBORDER": ("assignment", "A variable is read in always_comb before it is assigned."),
+    "SYNCASYNCNET": ("reset", "The same net is used as a synchronous and an asynchronous reset."),
+    "MODDUP": ("duplicate", "The module is defined more than once."),
+    "STMTDLY": ("timing", "Delays (#) are ignored by synthesis."),
+    "INITIALDLY": ("timing", "Delayed assignments in initial blocks are ignored by synthesis."),
+    "DECLFILENAME": ("style", "Name the file after the module it contains."),
+    "EOFNEWLINE": ("style", "Add a newline at the end of the file."),
+    "GENUNNAMED": ("style", "Name the generate block so its hierarchy is stable."),
+}
+
+_FILE_LINE = r"(?P<file>[^\s:]+):(?P<line>\d+)"
+
+LOG_PATTERNS: List[LogPattern] = [
+    # --- Verilator ---
+    LogPattern("verilator", "VERILATOR_SYNTAX", ERROR, "syntax",
+               r"%Error: " + _FILE_LINE + r":(?:(?P<col>\d+):)? (?P<msg>syntax error.*)",
+               "Check the line for a missing ';', 'end' or mismatched parenthesis."),
+    LogPattern("verilator", "VERILATOR_MISSING_MODULE", ERROR, "missing-module",
+               r"%Error: (?:" + _FILE_LINE + r":(?:(?P<col>\d+):)? )?(?P<msg>Cannot find file containing module: .*)",
+               "Add the file defining the module to the project, or fix the module name."),
+    LogPattern("verilator", "VERILATOR_UNDECLARED", ERROR, "undeclared",
+               r"%Error: " + _FILE_LINE + r":(?:(?P<col>\d+):)? (?P<msg>Can't find definition of .*)",
+               "Declare the identifier before using it, or fix its spelling."),
+    LogPattern("verilator", "", WARNING, "",
+               r"%(?:Warning|Error)-(?P<vcode>[A-Z0-9_]+): (?:" + _FILE_LINE + r":(?:(?P<col>\d+):)? )?(?P<msg>.*)"),
+    # --- Yosys ---
+    LogPattern("yosys", "YOSYS_SYNTAX", ERROR, "syntax",
+               r"(?:" + _FILE_LINE + r"(?:\.\d+)?(?:-\d+(?:\.\d+)?)?: )?ERROR: (?P<msg>syntax error.*)",
+               "Check the line for a missing ';', 'end' or mismatched parenthesis."),
+    LogPattern("yosys", "YOSYS_MISSING_MODULE", ERROR, "missing-module",
+               r"ERROR: (?P<msg>Module `.*' referenced in module `.*' .*is not part of the design\.)",
+               "Read the file defining the module before synthesis, or fix the module name."),
+    LogPattern("yosys", "YOSYS_FILE_NOT_FOUND", ERROR, "missing-file",
+               r"ERROR: (?P<msg>Can't open input file `.*)",
+               "Check the file name in the synthesis script."),
+    LogPattern("yosys", "YOSYS_ASSIGNED_IN_BLOCK", ERROR, "assignment",
+               r"(?:" + _FILE_LINE + r"(?:\.\d+)?(?:-\d+(?:\.\d+)?)?: )?ERROR: (?P<msg>.*is assigned in a block.*)",
+               "Declare the target as reg or logic, or drive it with a continuous assign."),
+    LogPattern("yosys", "YOSYS_IMPLICIT", WARNING, "implicit-net",
+               r"Warning: (?P<msg>Identifier `.*' is implicitly declared)(?: at " + _FILE_LINE + r")?.*",
+               "Declare the net explicitly; `default_nettype none turns these into errors."),
+    LogPattern("yosys", "YOSYS_LATCH", WARNING, "latch",
+               r"(?P<msg>Latch inferred for signal `.*)",
+               "Assign the signal on every path of the combinational block, or give it a default."),
+    LogPattern("yosys", "YOSYS_MULTIDRIVEN", WARNING, "multidriven",
+               r"Warning: (?P<msg>(?:multiple conflicting drivers for|Driver-driver conflict for) .*)",
+               "Drive the signal from a single process or assign."),
+    LogPattern("yosys", "YOSYS_NO_DRIVER", WARNING, "undriven",
+               r"Warning: (?P<msg>Wire .* is used but has no driver\.)",
+               "Drive the wire or tie it off."),
+    LogPattern("yosys", "YOSYS_LOGIC_LOOP", WARNING, "combinational-loop",
+               r"Warning: (?P<msg>found logic loop in module .*)",
+               "Break the combinational feedback with a register."),
+    LogPattern("yosys", "YOSYS_PORT_RESIZE", WARNING, "width",
+               r"Warning: (?P<msg>Resizing cell port .*)",
+               "The connected signal's width differs from the port's; size it to match."),
+    LogPattern("yosys", "YOSYS_MEMORY_TO_REGISTERS", WARNING, "memory",
+               r"Warning: (?P<msg>Replacing memory .* with list of registers.*)",
+               "The memory is accessed in a way that cannot map to RAM; this can be expected for small arrays."),
+    # --- Icarus Verilog ---
+    LogPattern("iverilog", "IVERILOG_SYNTAX", ERROR, "syntax",
+               _FILE_LINE + r": (?P<msg>syntax error|error: (?:Invalid module item|Malformed statement|Invalid module instantiation).*)",
+               "Check the line for a missing ';', 'end' or mismatched parenthesis."),
+    LogPattern("iverilog", "IVERILOG_UNBOUND", ERROR, "undeclared",
+               _FILE_LINE + r": error: (?P<msg>Unable to bind .*)",
+               "Declare the identifier before using it, or fix its spelling."),
+    LogPattern("iverilog", "IVERILOG_UNKNOWN_MODULE", ERROR, "missing-module",
+               _FILE_LINE + r": error: (?P<msg>Unknown module type: .*)",
+               "Add the file defining the module to the compile, or fix the module name."),
+    LogPattern("iverilog", "IVERILOG_REDECLARED", ERROR, "duplicate",
+               _FILE_LINE + r": error: (?P<msg>.* has already been declared in this scope\.)",
+               "Remove or rename the duplicate declaration."),
+    LogPattern("iverilog", "IVERILOG_INCLUDE_NOT_FOUND", ERROR, "missing-file",
+               _FILE_LINE + r": (?P<msg>Include file .* not found)",
+               "Add the include directory with -I or fix the file name."),
+    LogPattern("iverilog", "IVERILOG_PORT_WIDTH", WARNING, "width",
+               _FILE_LINE + r": warning: (?P<msg>Port .* expects \d+ bits?, got \d+\.)",
+               "Size the connected signal to match the port."),
+    LogPattern("iverilog", "IVERILOG_IMPLICIT", WARNING, "implicit-net",
+               _FILE_LINE + r": warning: (?P<msg>implicit definition of wire .*)",
+               "Declare the net explicitly; `default_nettype none turns these into errors."),
+    LogPattern("iverilog", "IVERILOG_NO_SENSITIVITY", WARNING, "sensitivity",
+               _FILE_LINE + r": warning: (?P<msg>@\* found no sensitivities.*)",
+               "The block reads no signals, so it never runs; use an initial block or check the logic."),
+    LogPattern("iverilog", "IVERILOG_TIMESCALE", WARNING, "timing",
+               _FILE_LINE + r": warning: (?P<msg>(?:timescale for .* inherited from another file|Some (?:design elements|modules) have no explicit time).*)",
+               "Add `timescale to every file so all modules use the same time unit."),
+    LogPattern("iverilog", "IVERILOG_UNSUPPORTED", ERROR, "unsupported",
+               _FILE_LINE + r": sorry: (?P<msg>.*)",
+               "Icarus Verilog does not support this construct; rewrite it, or compile with -g2012 if it is SystemVerilog."),
+]
+
+# Run summaries and continuation lines that repeat what the diagnostics already said.
+_IGNORED = re.compile(
+    r"%Error: Exiting due to|%Warning: Exiting due to|\d+ error\(s\)|Warnings: \d+ unique messages|"
+    r"Found and reported \d+ problems|End of script|\.\.\. |\s"
+)
+_CANDIDATE = re.compile(r"warning|error|sorry|latch inferred|not found", re.IGNORECASE)
+_DIAGNOSTIC = re.compile(r"\b(?:warning|error|sorry|fatal)\b|not found", re.IGNORECASE)
+_GROUP_NAME = re.compile(r"\(\?P<\w+>")
+
+# All patterns as one alternation: a single match per line finds which pattern (if any) applies,
+# then only that pattern is re-run to extract its fields.
+_INDEX = re.compile("|".join(f"(?P<p{i}>{_GROUP_NAME.sub('(?:', p.regex)})" for i, p in enumerate(LOG_PATTERNS)))
+_COMPILED = [re.compile(p.regex) for p in LOG_PATTERNS]
+
+
+def classify_line(line: str) -> Optional[Dict[str, Any]]:
+    """The diagnostic a log line reports, or None if it matches no known pattern."""
+    hit = _INDEX.match(line)
+    if not hit:
+        return None
+    index = int(hit.lastgroup[1:])
+    pattern = LOG_PATTERNS[index]
+    fields = _COMPILED[index].match(line).groupdict()
+
+    code, severity, category, hint = pattern.code, pattern.severity, pattern.category, pattern.hint
+    if fields.get("vcode"):
+        known = VERILATOR_CODES.get(fields["vcode"])
+        if known is None:
+            return None
+        code = f"VERILATOR_{fields['vcode']}"
+        severity = ERROR if line.startswith("%Error") else WARNING
+        category, hint = known
+
+    location = None
+    if fields.get("file"):
+        location = f"{fields['file']}:{fields['line']}" + (f":{fields['col']}" if fields.get("col") else "")
+    return {
+        "tool": pattern.tool,
+        "code": code,
+        "severity": severity,
+        "category": category,
+        "message": fields["msg"].strip(),
+        "hint": hint,
+        "location": location,
+    }
+
+
+def triage_log(lines: Iterable[str]) -> Dict[str, Any]:
+    """
+    Classifies a tool log line by line in one pass. Identical diagnostics (same code and message)
+    are merged with a count and up to LOG_TRIAGE_MAX_LOCATIONS locations. Lines that look like
+    diagnostics but match no pattern are kept, deduplicated, as 'unclassified'; everything else
+    (progress and info output, source excerpts) is dropped.
+    """
+    diagnostics: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    unclassified: Dict[str, int] = {}
+    scanned = 0
+    for raw_line in lines:
+        scanned += 1
+        line = raw_line.rstrip("\r\n")
+        if not line or not _CANDIDATE.search(line) or _IGNORED.match(line):
+            continue
+        diagnostic = classify_line(line)
+        if diagnostic is None:
+            if _DIAGNOSTIC.search(line):
+                unclassified[line] = unclassified.get(line, 0) + 1
+            continue
+
+        key = (diagnostic["code"], diagnostic["message"])
+        merged = diagnostics.get(key)
+        location = diagnostic.pop("location")
+        if merged is None:
+            merged = diagnostics[key] = {**diagnostic, "count": 0, "locations": []}
+        merged["count"] += 1
+        if location and location not in merged["locations"] and len(merged["locations"]) < settings.LOG_TRIAGE_MAX_LOCATIONS:
+            merged["locations"].append(location)
+
+    ranked = sorted(diagnostics.values(), key=lambda d: (d["severity"] != ERROR, -d["count"], d["code"]))
+    by_category: Dict[str, int] = {}
+    for diagnostic in ranked:
+        by_category[diagnostic["category"]] = by_category.get(diagnostic["category"], 0) + diagnostic["count"]
+
+    return {
+        "linesScanned": scanned,
+        "errorCount": sum(d["count"] for d in ranked if d["severity"] == ERROR),
+        "warningCount": sum(d["count"] for d in ranked if d["severity"] == WARNING),
+        "byCategory": by_category,
+        "diagnostics": ranked[:settings.LOG_TRIAGE_MAX_DIAGNOSTICS],
+        "omittedDiagnostics": max(0, len(ranked) - settings.LOG_TRIAGE_MAX_DIAGNOSTICS),
+        "unclassified": list(unclassified),
+    }
+
+
+def unclassified_residue(triage: Dict[str, Any]) -> str:
+    """The unclassified lines, capped at LOG_TRIAGE_RESIDUE_MAX_CHARS: all the AI needs to see of the log."""
+    residue: List[str] = []
+    used = 0
+    for line in triage["unclassified"]:
+        used += len(line) + 1
+        if used > settings.LOG_TRIAGE_RESIDUE_MAX_CHARS:
+            break
+        residue.append(line)
+    return "\n".join(residue)
@@ -0,0 +1,248 @@
+# eda-backend/app/services/metering.py
+# Usage metering for tool runs and AI chat: atomic quota reservations in MongoDB with refunds on
+# failure, and usage events written to the database in batches by a background flusher.
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.database import Database as MongoDatabase
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.core.config import settings
+from app.services.user_cache import user_profile_cache
+from app.utils.metrics import metrics
+
+USAGE_COUNTERS_COLLECTION = "usageCounters"
+USAGE_EVENTS_COLLECTION = "usageEvents"
+AI_CHAT_METER = "aiChat"
+
+reservations_total = metrics.counter("usage_reservations_total", "Quota reservations granted, by meter.")
+rejections_total = metrics.counter("usage_rejections_total", "Quota reservations rejected because the limit was reached, by meter.")
+refunds_total = metrics.counter("usage_refunds_total", "Quota reservations refunded after a failed call, by meter.")
+events_flushed = metrics.counter("usage_events_flushed_total", "Usage events written to MongoDB.")
+events_dropped = metrics.counter("usage_events_dropped_total", "Usage events dropped because the buffer was full or writes kept failing.")
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def current_period(now: Optional[datetime] = None) -> str:
+    """Usage limits are per calendar month (UTC)."""
+    return (now or datetime.utcnow()).strftime("%Y-%m")
+
+
+@dataclass
+class UsageReservation:
+    """
+    One unit of quota taken from a meter. Call `commit` when the metered call succeeded and
+    `refund` when it failed; whichever comes first wins, so both are safe to call from cleanup code.
+    """
+    meter: str
+    firebase_uid: str
+    mongo_db: MongoDatabase
+    collection: Optional[str] = None # None for unlimited meters: nothing to refund
+    counter_filter: Optional[Dict[str, Any]] = None
+    refund_update: Optional[Dict[str, Any]] = None
+    remaining: Optional[int] = None # None means unlimited
+    settled: bool = field(default=False, init=False)
+
+    def commit(self, details: Optional[Dict[str, Any]] = None) -> None:
+        if self.settled:
+            return
+        self.settled = True
+        usage_events.record(self.mongo_db, {
+            "userId": self.firebase_uid,
+            "meter": self.meter,
+            "period": current_period(),
+            "details": details or {},
+            "createdAt": datetime.utcnow(),
+        })
+
+    async def refund(self) -> None:
+        if self.settled:
+            return
+        self.settled = True
+        refunds_total.inc(labels={"meter": self.meter})
+        if self.collection is None:
+            return
+        try:
+            await self.mongo_db[self.collection].update_one(self.counter_filter, self.refund_update)
+            if self.collection == "users":
+                user_profile_cache.invalidate(self.firebase_uid)
+        except Exception as e:
+            print(f"Failed to refund {self.meter} usage for {self.firebase_uid}: {e}")
+
+
+async def reserve_tool_use(mongo_db: MongoDatabase, firebase_uid: str, tool_name: str, limit: int) -> UsageReservation:
+    """
+    Takes one run of `tool_name` from the user's monthly allowance in a single conditional upsert.
+    The counter document for the month is created on first use; once it reaches `limit` the
+    filter stops matching, the upsert collides with the existing document, and the run is refused.
+    `limit` is -1 for unlimited tools; 0 means the plan includes no runs and is refused outright
+    (the upsert would otherwise insert a first counter and grant a run).
+    """
+    if limit < 0:
+        reservations_total.inc(labels={"meter": tool_name})
+        return UsageReservation(tool_name, firebase_uid, mongo_db)
+    if limit == 0:
+        rejections_total.inc(labels={"meter": tool_name})
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=f"Your plan does not include any runs of '{tool_name}'. Please upgrade."
+        )
+
+    counter_id = f"{firebase_uid}:{tool_name}:{current_period()}"
+    try:
+        counter = await mongo_db[USAGE_COUNTERS_COLLECTION].find_one_and_update(
+            {"_id": counter_id, "count": {"$lt": limit}},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {"userId": firebase_uid, "tool": tool_name, "period": current_period()},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        counter = None
+    if counter is None:
+        rejections_total.inc(labels={"meter": tool_name})
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=f"You have used all {limit} runs of '{tool_name}' included in your plan this month. Please upgrade."
+        )
+
+    reservations_total.inc(labels={"meter": tool_name})
+    return UsageReservation(
+        tool_name, firebase_uid, mongo_db,
+        collection=USAGE_COUNTERS_COLLECTION,
+        counter_filter={"_id": counter_id},
+        refund_update={"$inc": {"count": -1}},
+        remaining=limit - counter["count"]
+    )
+
+
+async def reserve_ai_use(mongo_db: MongoDatabase, firebase_uid: str, membership: str) -> UsageReservation:
+    """
+    Takes one AI chat use from a free user's 'aiUsesLeft' with a conditional decrement, so
+    concurrent requests can never spend more uses than are left. Paid plans are unlimited.
+    """
+    if membership != "free":
+        reservations_total.inc(labels={"meter": AI_CHAT_METER})
+        return UsageReservation(AI_CHAT_METER, firebase_uid, mongo_db)
+
+    user_filter = {"firebaseUid": firebase_uid}
+    user_data = await mongo_db.users.find_one_and_update(
+        {**user_filter, "aiUsesLeft": {"$gt": 0}},
+        {"$inc": {"aiUsesLeft": -1}},
+        projection={"aiUsesLeft": True},
+        return_document=ReturnDocument.AFTER
+    )
+    if user_data is None:
+        rejections_total.inc(labels={"meter": AI_CHAT_METER})
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="AI usage limit exceeded. Please upgrade your plan."
+        )
+    user_profile_cache.invalidate(firebase_uid)
+
+    reservations_total.inc(labels={"meter": AI_CHAT_METER})
+    return UsageReservation(
+        AI_CHAT_METER, firebase_uid, mongo_db,
+        collection="users",
+        counter_filter=user_filter,
+        refund_update={"$inc": {"aiUsesLeft": 1}},
+        remaining=user_data["aiUsesLeft"]
+    )
+
+
+class UsageEventBuffer:
+    """
+    Write-behind buffer for usage events. Events are appended in memory and inserted with one
+    insert_many per batch by a background task, every USAGE_FLUSH_INTERVAL_SECONDS or as soon as
+    USAGE_FLUSH_BATCH_SIZE events are waiting. Call `flush` on shutdown to write what is left.
+    Each event gets its _id when recorded, so a retried write is idempotent: duplicate-key errors
+    mean the event was already written.
+    """
+    def __init__(self, batch_size: int, interval_seconds: float, max_buffered: int, max_attempts: int):
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.max_buffered = max_buffered
+        self.max_attempts = max_attempts
+        self._events: List[dict] = []
+        self._failed_attempts: Dict[ObjectId, int] = {}
+        self._mongo_db: Optional[MongoDatabase] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, mongo_db: MongoDatabase, event: dict) -> None:
+        self._mongo_db = mongo_db
+        if len(self._events) >= self.max_buffered:
+            events_dropped.inc()
+            return
+        event.setdefault("_id", ObjectId())
+        self._events.append(event)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if len(self._events) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while self._events:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self._mongo_db is None:
+            return
+        while self._events:
+            batch, self._events = self._events[:self.batch_size], self._events[self.batch_size:]
+            try:
+                await self._mongo_db[USAGE_EVENTS_COLLECTION].insert_many(batch, ordered=False)
+                failed = []
+            except BulkWriteError as e:
+                # Unordered: everything else in the batch was written. A duplicate key is an event
+                # an earlier, seemingly failed attempt already wrote.
+                errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY_ERROR]
+                failed = [batch[error["index"]] for error in errors]
+                if failed:
+                    print(f"Failed to write {len(failed)} of {len(batch)} usage events: {errors[0].get('errmsg')}")
+            except Exception as e:
+                print(f"Failed to write {len(batch)} usage events, will retry: {e}")
+                failed = batch
+            events_flushed.inc(len(batch) - len(failed))
+            if self._failed_attempts:
+                failed_ids = {event["_id"] for event in failed}
+                for event in batch:
+                    if event["_id"] not in failed_ids:
+                        self._failed_attempts.pop(event["_id"], None)
+            if failed:
+                self._events[:0] = self._retryable(failed)
+                return
+
+    def _retryable(self, failed: List[dict]) -> List[dict]:
+        """The failed events to put back on the queue; those that failed max_attempts times are dropped."""
+        retry = []
+        for event in failed:
+            attempts = self._failed_attempts.get(event["_id"], 0) + 1
+            if attempts >= self.max_attempts:
+                self._failed_attempts.pop(event["_id"], None)
+                events_dropped.inc()
+                continue
+            self._failed_attempts[event["_id"]] = attempts
+            retry.append(event)
+        return retry
+
+
+usage_events = UsageEventBuffer(
+    batch_size=settings.USAGE_FLUSH_BATCH_SIZE,
+    interval_seconds=settings.USAGE_FLUSH_INTERVAL_SECONDS,
+    max_buffered=settings.USAGE_MAX_BUFFERED_EVENTS,
+    max_attempts=settings.USAGE_FLUSH_MAX_ATTEMPTS
+)
@@ -0,0 +1,275 @@
+# eda-backend/app/services/netlister.py
+# Schematic to structural Verilog: wires and named nets are merged into nets with union-find,
+# components become gate primitives or module instances, and the text is written as a stream.
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Editor component types that map onto Verilog gate primitives (ports positional, output first).
+GATE_PRIMITIVES = {
+    "AND": "and", "OR": "or", "XOR": "xor", "NAND": "nand", "NOR": "nor", "XNOR": "xnor", "NOT": "not", "BUF": "buf",
+}
+# Other editor types become instances of these modules, with the pin labels as port names.
+CELL_MODULES = {"FLIPFLOP": "dff", "ALU": "alu", "MEMORY": "ram"}
+
+_PRIMITIVES = frozenset(GATE_PRIMITIVES.values())
+
+WRITE_CHUNK_LINES = 4096 # Lines joined into each chunk the writer yields
+
+_NON_IDENTIFIER = re.compile(r"[^A-Za-z0-9_]")
+
+# IEEE 1364-2005 reserved words; a name that is one of these gets a trailing underscore.
+VERILOG_KEYWORDS = frozenset("""
+    always and assign automatic begin buf bufif0 bufif1 case casex casez cell cmos config deassign default
+    defparam design disable edge else end endcase endconfig endfunction endgenerate endmodule endprimitive
+    endspecify endtable endtask event for force forever fork function generate genvar highz0 highz1 if ifnone
+    incdir include initial inout input instance integer join large liblist library localparam macromodule
+    medium module nand negedge nmos nor noshowcancelled not notif0 notif1 or output parameter pmos posedge
+    primitive pull0 pull1 pulldown pullup pulsestyle_ondetect pulsestyle_onevent rcmos real realtime reg release
+    repeat rnmos rpmos rtran rtranif0 rtranif1 scalared showcancelled signed small specify specparam strong0
+    strong1 supply0 supply1 table task time tran tranif0 tranif1 tri tri0 tri1 triand trior trireg unsigned use
+    uwire vectored wait wand weak0 weak1 while wire wor xnor xor
+""".split())
+
+
+class NetlistError(ValueError):
+    """The schematic references components or pins that do not exist. The message is safe to show to the user."""
+
+
+@dataclass
+class Netlist:
+    components: List[Dict[str, Any]]
+    instance_names: List[str]
+    pin_offsets: List[int] # Node index of each component's first pin
+    pin_is_output: List[bool]
+    pin_nets: List[int] # Net number of every component pin, in node order
+    net_names: List[str]
+    inputs: List[int] # Nets with no driver: top-level input ports
+    outputs: List[int] # Driven nets nothing reads: top-level output ports
+    multi_driven: List[int] # Nets driven by more than one output pin
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "components": len(self.components),
+            "nets": len(self.net_names),
+            "inputs": len(self.inputs),
+            "outputs": len(self.outputs),
+            "multiDrivenNets": len(self.multi_driven),
+        }
+
+
+def _identifier(text: str, fallback: str) -> str:
+    text = str(text)
+    if text.isascii() and text.isidentifier():
+        name = text
+    else:
+        # Q̅ (Q with a combining overline) is the editor's inverted output; keep the inversion in the name.
+        name = _NON_IDENTIFIER.sub("_", text.replace("̅", "_N")).strip("_")
+        if not name:
+            return fallback
+        if name[0].isdigit():
+            name = f"_{name}"
+    return f"{name}_" if name in VERILOG_KEYWORDS else name
+
+
+def build_netlist(components: List[Dict[str, Any]], wires: List[Dict[str, Any]], nets: List[Dict[str, Any]]) -> Netlist:
+    """
+    Every component pin is a node. Each wire joins its two end points, and each entry of `nets`
+    ({"name": ..., "pins": [{"component": id, "pin": index}, ...]}) joins all its pins and names the
+    result. Wire ends not on a pin (drawn from an empty spot of the canvas) are nodes keyed by their
+    coordinates, so wires meeting at the same point are connected. Runs in near-linear time.
+    """
+    comp_index: Dict[Any, int] = {}
+    pin_offsets: List[int] = []
+    pin_is_output: List[bool] = []
+    for i, comp in enumerate(components):
+        comp_index[comp.get("id")] = i
+        pin_offsets.append(len(pin_is_output))
+        pin_is_output += [pin.get("type") == "output" for pin in comp.get("pins") or ()]
+    pin_count = len(pin_is_output)
+    pin_offsets.append(pin_count)
+
+    parent = list(range(pin_count))
+    points: Dict[Tuple[Any, Any], int] = {}
+
+    def point(x: Any, y: Any) -> int:
+        node = points.get((x, y))
+        if node is None:
+            node = points[(x, y)] = len(parent)
+            parent.append(node)
+        return node
+
+    def pin_node(comp_id: Any, pin: Any) -> int:
+        ci = comp_index.get(comp_id)
+        if ci is None:
+            raise NetlistError(f"Wire or net references unknown component '{comp_id}'.")
+        offset = pin_offsets[ci]
+        if type(pin) is not int or not 0 <= pin < pin_offsets[ci + 1] - offset:
+            raise NetlistError(f"Component '{comp_id}' has no pin {pin!r}.")
+        return offset + pin
+
+    def find(n: int) -> int:
+        while parent[n] != n:
+            parent[n] = n = parent[parent[n]] # Path halving
+        return n
+
+    index_of = comp_index.get
+    pin_counts = [pin_offsets[i + 1] - pin_offsets[i] for i in range(len(components))]
+    for wire in wires:
+        # Fast path for the usual pin-to-pin wire; pin_node/point handle free ends and report errors.
+        start, end = index_of(wire.get("startComp")), index_of(wire.get("endComp"))
+        a, b = wire.get("startPin"), wire.get("endPin")
+        if start is not None and type(a) is int and 0 <= a < pin_counts[start]:
+            a += pin_offsets[start]
+        elif wire.get("startComp") is not None:
+            a = pin_node(wire["startComp"], a)
+        else:
+            a = point(wire.get("startX"), wire.get("startY"))
+        if end is not None and type(b) is int and 0 <= b < pin_counts[end]:
+            b += pin_offsets[end]
+        elif wire.get("endComp") is not None:
+            b = pin_node(wire["endComp"], b)
+        else:
+            b = point(wire.get("endX"), wire.get("endY"))
+        # find() inlined: this loop runs once per wire
+        while parent[a] != a:
+            parent[a] = a = parent[parent[a]]
+        while parent[b] != b:
+            parent[b] = b = parent[parent[b]]
+        if a != b:
+            parent[a] = b
+
+    named: List[Tuple[int, str]] = []
+    for net in nets:
+        members = [
+            pin_node(p["component"], p.get("pin")) if p.get("component") is not None else point(p.get("x"), p.get("y"))
+            for p in net.get("pins") or ()
+        ]
+        if not members:
+            continue
+        root = find(members[0])
+        for member in members[1:]:
+            other = find(member)
+            if other != root:
+                parent[other] = root
+        if net.get("name"):
+            named.append((members[0], net["name"]))
+
+    # Number the nets in pin order, counting drivers and loads as we go.
+    net_of_root: Dict[int, int] = {}
+    pin_nets: List[int] = []
+    drivers: List[int] = []
+    loads: List[int] = []
+    for n in range(pin_count):
+        root = n
+        while parent[root] != root:
+            parent[root] = root = parent[parent[root]]
+        net = net_of_root.get(root)
+        if net is None:
+            net = net_of_root[root] = len(drivers)
+            drivers.append(0)
+            loads.append(0)
+        pin_nets.append(net)
+        if pin_is_output[n]:
+            drivers[net] += 1
+        else:
+            loads[net] += 1
+
+    # Instances and nets share the module's namespace, so instances are named first and nets avoid them.
+    instance_names: List[str] = []
+    used_names = set()
+    for i, comp in enumerate(components):
+        name = "u_" + _identifier(comp.get("id"), str(i))
+        if name in used_names:
+            name = f"{name}_{i}"
+        used_names.add(name)
+        instance_names.append(name)
+
+    net_names = [f"n{i}" for i in range(len(drivers))]
+    used_names.update(net_names)
+    for member, name in named:
+        net = net_of_root.get(find(member))
+        if net is None: # Named net made only of free wire points: no pin, nothing to emit
+            continue
+        identifier = _identifier(name, net_names[net])
+        if identifier != net_names[net]:
+            while identifier in used_names:
+                identifier += "_"
+            used_names.add(identifier)
+            net_names[net] = identifier
+
+    return Netlist(
+        components=components,
+        instance_names=instance_names,
+        pin_offsets=pin_offsets,
+        pin_is_output=pin_is_output,
+        pin_nets=pin_nets,
+        net_names=net_names,
+        inputs=[net for net, count in enumerate(drivers) if count == 0],
+        outputs=[net for net, count in enumerate(drivers) if count > 0 and loads[net] == 0],
+        multi_driven=[net for net, count in enumerate(drivers) if count > 1],
+    )
+
+
+def iter_verilog(netlist: Netlist, module_name: str = "top", header: Optional[str] = None) -> Iterator[str]:
+    """
+    Writes the netlist as a structural Verilog module, yielding it in chunks of WRITE_CHUNK_LINES
+    lines so a large netlist can be streamed to the client without being built as one string.
+    """
+    names = netlist.net_names
+    pin_names = [names[net] for net in netlist.pin_nets]
+    is_output = netlist.pin_is_output
+    offsets = netlist.pin_offsets
+    instance_names = netlist.instance_names
+    modules: Dict[str, str] = {}
+    port_names: Dict[Any, str] = {}
+    lines: List[str] = []
+    if header:
+        lines.extend(f"// {line}" for line in header.splitlines())
+
+    ports = [("input", net) for net in netlist.inputs] + [("output", net) for net in netlist.outputs]
+    lines.append(f"module {_identifier(module_name, 'top')} (")
+    lines.extend(
+        f"    {direction} wire {names[net]}{',' if i < len(ports) - 1 else ''}" for i, (direction, net) in enumerate(ports)
+    )
+    lines.append(");")
+
+    port_nets = set(netlist.inputs) | set(netlist.outputs)
+    for net in range(len(names)):
+        if net not in port_nets:
+            lines.append(f"    wire {names[net]};")
+            if len(lines) >= WRITE_CHUNK_LINES:
+                yield "\n".join(lines) + "\n"
+                lines = []
+    lines.append("")
+
+    for i, comp in enumerate(netlist.components):
+        start, end = offsets[i], offsets[i + 1]
+        comp_type = comp.get("type", "")
+        module = modules.get(comp_type)
+        if module is None:
+            key = str(comp_type).upper()
+            module = modules[comp_type] = GATE_PRIMITIVES.get(key) or CELL_MODULES.get(key) or _identifier(key.lower(), "cell")
+        if module in _PRIMITIVES:
+            connected = pin_names[start:end]
+            directions = is_output[start:end]
+            outputs = [net for net, out in zip(connected, directions) if out]
+            inputs = [net for net, out in zip(connected, directions) if not out]
+            lines.append(f"    {module} {instance_names[i]} ({', '.join(outputs + inputs)});")
+        else:
+            connections = []
+            for p, pin in enumerate(comp.get("pins") or ()):
+                label = pin.get("label") or f"p{p}"
+                port = port_names.get(label)
+                if port is None:
+                    port = port_names[label] = _identifier(label, f"p{p}")
+                connections.append(f".{port}({pin_names[start + p]})")
+            lines.append(f"    {module} {instance_names[i]} ({', '.join(connections)});")
+        if len(lines) >= WRITE_CHUNK_LINES:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    lines.append("endmodule")
+    yield "\n".join(lines) + "\n"
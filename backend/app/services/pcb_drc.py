@@ -0,0 +1,670 @@
+# eda-backend/app/services/pcb_drc.py
+# Geometric PCB design rule check. The board (JSON or a KiCad .kicad_pcb file) is reduced to
+# copper "capsules" per layer - a segment with a radius: tracks, round vias, pads (as their
+# inscribed rounded rectangle) and zone outline edges. Candidate pairs come from a spatial hash,
+# exact distances from vectorized NumPy kernels, and layers are checked in a process pool.
+
+import json
+import math
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+CELL_SIZE_PERCENTILE = 25 # Grid cell edge, as a percentile of primitive size
+MAX_CELLS_PER_PRIMITIVE = 16 # Longer primitives are paired by a direct bounding-box scan instead
+BBOX_SCAN_CHUNK = 4_000_000 # Max bounding-box comparisons held in memory at once
+CONTACT_TOLERANCE = 1e-6 # Same-net copper this close is connected
+
+
+class BoardParseError(ValueError):
+    """The board file cannot be read. The message is safe to show to the user."""
+
+
+@dataclass
+class DrcRules:
+    clearance: float = field(default_factory=lambda: settings.PCB_DRC_DEFAULT_CLEARANCE)
+    min_track_width: float = field(default_factory=lambda: settings.PCB_DRC_MIN_TRACK_WIDTH)
+    min_annular_ring: float = field(default_factory=lambda: settings.PCB_DRC_MIN_ANNULAR_RING)
+    min_drill: float = field(default_factory=lambda: settings.PCB_DRC_MIN_DRILL)
+
+
+@dataclass
+class Board:
+    """
+    Parsed copper geometry. `items` are the user-visible objects (a track, a pad, a via, a zone);
+    each is made of one or more primitives, on one or more layers.
+    """
+    rules: DrcRules = field(default_factory=DrcRules)
+    copper_layers: List[str] = field(default_factory=list) # Stack order, top to bottom
+    net_names: List[str] = field(default_factory=list)
+    items: List[Tuple[str, str, int]] = field(default_factory=list) # (kind, reference, net or -1)
+    primitives: Dict[str, List[List[float]]] = field(default_factory=dict) # layer -> [x1, y1, x2, y2, r, net, item]
+    zones: Dict[str, List[Tuple[int, int, np.ndarray]]] = field(default_factory=dict) # layer -> [(item, net, outline)]
+    keepouts: List[List[float]] = field(default_factory=list) # Unplated holes, checked on every copper layer: [x1, y1, x2, y2, r, -1, item]
+    rule_violations: List[Dict[str, Any]] = field(default_factory=list) # Single-item checks: widths, drills
+    # Fabrication output only (parse with artwork=True): the real shapes per layer and the holes.
+    artwork: Optional[Dict[str, List[tuple]]] = None # layer -> ("L", x1, y1, x2, y2, width) | ("P", x, y, w, h, rotation, shape) | ("R", outline)
+    holes: List[Tuple[float, float, float, float, float]] = field(default_factory=list) # Plated: (x, y, diameter, slot dx, slot dy)
+    unplated_holes: List[Tuple[float, float, float, float, float]] = field(default_factory=list) # Same, for mounting holes
+    _net_ids: Dict[str, int] = field(default_factory=dict)
+
+    def net(self, name: Any) -> int:
+        if name is None or name == "":
+            return -1
+        name = str(name)
+        net = self._net_ids.get(name)
+        if net is None:
+            net = self._net_ids[name] = len(self.net_names)
+            self.net_names.append(name)
+        return net
+
+    def add_item(self, kind: str, reference: str, net: int) -> int:
+        self.items.append((kind, reference, net))
+        return len(self.items) - 1
+
+    def layer_span(self, layers: Iterable[str]) -> List[str]:
+        """Copper layers named by a pad or via: '*.Cu' is every layer, a pair spans the stack between them."""
+        layers = [layer for layer in layers if layer.endswith(".Cu")]
+        if "*.Cu" in layers:
+            return list(self.copper_layers)
+        positions = [self.copper_layers.index(layer) for layer in layers if layer in self.copper_layers]
+        if len(positions) == 2 and len(layers) == 2:
+            low, high = sorted(positions)
+            return self.copper_layers[low:high + 1]
+        for layer in layers:
+            if layer not in self.copper_layers:
+                self.copper_layers.append(layer)
+        return layers
+
+    def add_capsule(self, layer: str, x1: float, y1: float, x2: float, y2: float, radius: float, net: int, item: int) -> None:
+        self.primitives.setdefault(layer, []).append([x1, y1, x2, y2, radius, net, item])
+        if self.artwork is not None:
+            self.artwork.setdefault(layer, []).append(("L", x1, y1, x2, y2, radius * 2))
+
+    def add_pad(self, layers: List[str], x: float, y: float, width: float, height: float, rotation: float,
+                shape: str, net: int, item: int) -> None:
+        if shape == "circle":
+            height = width = min(width, height) if height else width
+        # Inscribed capsule along the long side; that is the whole pad for circles and ovals.
+        half_length = abs(width - height) / 2
+        angle = math.radians(rotation + (0 if width >= height else 90))
+        dx, dy = half_length * math.cos(angle), -half_length * math.sin(angle)
+        rows = [[x - dx, y - dy, x + dx, y + dy, min(width, height) / 2, net, item]]
+        if shape not in ("circle", "oval"):
+            # Rectangles (and shapes drawn as their bounding rectangle) also get their four edges, so
+            # the corners outside the capsule are checked too.
+            cos_a, sin_a = math.cos(math.radians(rotation)), -math.sin(math.radians(rotation))
+            corners = [
+                (x + cx * cos_a - cy * sin_a, y + cx * sin_a + cy * cos_a)
+                for cx, cy in ((-width / 2, -height / 2), (width / 2, -height / 2), (width / 2, height / 2), (-width / 2, height / 2))
+            ]
+            rows += [[*corners[k], *corners[(k + 1) % 4], 0.0, net, item] for k in range(4)]
+        for layer in layers:
+            self.primitives.setdefault(layer, []).extend(list(row) for row in rows)
+            if self.artwork is not None:
+                self.artwork.setdefault(layer, []).append(("P", x, y, width, height, rotation, shape))
+
+    def add_hole(self, x: float, y: float, diameter: float, slot_length: float = 0.0, rotation: float = 0.0,
+                 plated: bool = True) -> None:
+        if self.artwork is not None and diameter > 0:
+            angle = math.radians(rotation)
+            hole = (x, y, diameter, slot_length / 2 * math.cos(angle), -slot_length / 2 * math.sin(angle))
+            (self.holes if plated else self.unplated_holes).append(hole)
+
+    def add_keepout(self, item: int, x: float, y: float, diameter: float, slot_length: float = 0.0, rotation: float = 0.0) -> None:
+        """An unplated hole: no copper and no net, but copper on every layer must keep clear of it."""
+        angle = math.radians(rotation)
+        dx, dy = slot_length / 2 * math.cos(angle), -slot_length / 2 * math.sin(angle)
+        self.keepouts.append([x - dx, y - dy, x + dx, y + dy, diameter / 2, -1, item])
+
+    def check_drill(self, item: int, x: float, y: float, diameter: float, drill: float, layers: List[str],
+                    plated: bool = True) -> None:
+        """Records the hole and checks its size; only plated holes have a copper ring to check."""
+        self.add_hole(x, y, drill, plated=plated)
+        rules = self.rules
+        if drill and drill < rules.min_drill:
+            self._rule_violation("MIN_DRILL", item, x, y, drill, rules.min_drill, layers)
+        if plated and drill and (diameter - drill) / 2 < rules.min_annular_ring:
+            self._rule_violation("MIN_ANNULAR_RING", item, x, y, (diameter - drill) / 2, rules.min_annular_ring, layers)
+
+    def check_track_width(self, item: int, x: float, y: float, width: float, layer: str) -> None:
+        if width < self.rules.min_track_width:
+            self._rule_violation("MIN_TRACK_WIDTH", item, x, y, width, self.rules.min_track_width, [layer])
+
+    def _rule_violation(self, rule: str, item: int, x: float, y: float, actual: float, required: float, layers: List[str]) -> None:
+        self.rule_violations.append({
+            "rule": rule, "item": item, "x": x, "y": y, "actual": actual, "required": required, "layers": layers,
+        })
+
+    @property
+    def primitive_count(self) -> int:
+        return sum(len(rows) for rows in self.primitives.values())
+
+
+def _point(value: Any, what: str) -> Tuple[float, float]:
+    try:
+        return float(value[0]), float(value[1])
+    except (TypeError, ValueError, IndexError, KeyError):
+        raise BoardParseError(f"Expected an [x, y] point for {what}, got {value!r}.")
+
+
+def parse_json_board(data: Dict[str, Any], artwork: bool = False) -> Board:
+    """
+    {"rules": {"clearance", "min_track_width", "min_annular_ring", "min_drill"},
+     "layers": ["F.Cu", "In1.Cu", "B.Cu"],
+     "tracks": [{"layer", "start": [x, y], "end": [x, y], "width", "net"}],
+     "pads": [{"ref", "layers": [...], "at": [x, y], "size": [w, h], "shape", "rotation", "drill", "plated", "net"}],
+     "vias": [{"at": [x, y], "diameter", "drill", "layers": [top, bottom], "net"}],
+     "zones": [{"layer" or "layers", "net", "polygon": [[x, y], ...]}]}
+    Coordinates in mm with y pointing down and rotations in degrees counter-clockwise on screen,
+    as in KiCad. Zone polygons are the copper actually poured. A pad with "plated": false is an
+    unplated (mounting) hole: only its drill is recorded, it has no copper.
+    """
+    if not isinstance(data, dict):
+        raise BoardParseError("The board must be a JSON object.")
+    rules = DrcRules()
+    for name, value in (data.get("rules") or {}).items():
+        if hasattr(rules, name):
+            setattr(rules, name, float(value))
+    board = Board(
+        rules=rules, copper_layers=[str(layer) for layer in data.get("layers") or ["F.Cu", "B.Cu"]], artwork={} if artwork else None
+    )
+    try:
+        for i, track in enumerate(data.get("tracks") or ()):
+            (x1, y1), (x2, y2) = _point(track["start"], f"track {i}"), _point(track["end"], f"track {i}")
+            width, layer, net = float(track["width"]), str(track["layer"]), board.net(track.get("net"))
+            item = board.add_item("track", str(track.get("id", i)), net)
+            board.add_capsule(layer, x1, y1, x2, y2, width / 2, net, item)
+            board.check_track_width(item, x1, y1, width, layer)
+            if layer not in board.copper_layers:
+                board.copper_layers.append(layer)
+        for i, pad in enumerate(data.get("pads") or ()):
+            x, y = _point(pad["at"], f"pad {i}")
+            size = pad.get("size") or [pad.get("diameter"), pad.get("diameter")]
+            width, height = float(size[0]), float(size[1] if len(size) > 1 else size[0])
+            layers = board.layer_span(pad.get("layers") or ["F.Cu"])
+            if pad.get("plated", True) is False:
+                item = board.add_item("hole", str(pad.get("ref", i)), -1)
+                drill = float(pad.get("drill") or min(width, height))
+                board.add_keepout(item, x, y, drill)
+                board.check_drill(item, x, y, min(width, height), drill, layers, plated=False)
+                continue
+            net = board.net(pad.get("net"))
+            item = board.add_item("pad", str(pad.get("ref", i)), net)
+            board.add_pad(layers, x, y, width, height, float(pad.get("rotation") or 0), str(pad.get("shape", "rect")), net, item)
+            if pad.get("drill"):
+                board.check_drill(item, x, y, min(width, height), float(pad["drill"]), layers)
+        for i, via in enumerate(data.get("vias") or ()):
+            x, y = _point(via["at"], f"via {i}")
+            diameter, drill = float(via["diameter"]), float(via.get("drill") or 0)
+            layers = board.layer_span(via.get("layers") or board.copper_layers[:1] + board.copper_layers[-1:])
+            net = board.net(via.get("net"))
+            item = board.add_item("via", str(via.get("id", i)), net)
+            for layer in layers:
+                board.add_capsule(layer, x, y, x, y, diameter / 2, net, item)
+            board.check_drill(item, x, y, diameter, drill, layers)
+        for i, zone in enumerate(data.get("zones") or ()):
+            outline = np.array([_point(p, f"zone {i}") for p in zone["polygon"]], dtype=np.float64)
+            layers = zone.get("layers") or [zone["layer"]]
+            _add_zone(board, str(zone.get("id", i)), board.net(zone.get("net")), [str(layer) for layer in layers], outline)
+    except (KeyError, TypeError, ValueError) as e:
+        if isinstance(e, BoardParseError):
+            raise
+        raise BoardParseError(f"Malformed board data: {e!r}.")
+    return board
+
+
+def _add_zone(board: Board, reference: str, net: int, layers: List[str], outline: np.ndarray) -> None:
+    if len(outline) < 3:
+        return
+    item = board.add_item("zone", reference, net)
+    closed = np.vstack([outline, outline[:1]])
+    for layer in layers:
+        rows = board.primitives.setdefault(layer, [])
+        for (x1, y1), (x2, y2) in zip(closed[:-1].tolist(), closed[1:].tolist()):
+            rows.append([x1, y1, x2, y2, 0.0, net, item])
+        board.zones.setdefault(layer, []).append((item, net, outline))
+        if board.artwork is not None:
+            board.artwork.setdefault(layer, []).append(("R", outline))
+
+
+_SEXPR_TOKEN = re.compile(r'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+
+def _parse_sexpr(text: str) -> list:
+    stack: List[list] = [[]]
+    for token in _SEXPR_TOKEN.findall(text):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) == 1:
+                raise BoardParseError("Unbalanced parentheses in the board file.")
+            node = stack.pop()
+            stack[-1].append(node)
+        else:
+            stack[-1].append(token[1:-1].replace('\\"', '"') if token[0] == '"' else token)
+    if len(stack) != 1 or not stack[0]:
+        raise BoardParseError("Unbalanced parentheses in the board file.")
+    return stack[0][0]
+
+
+def _children(node: list, name: str) -> Iterable[list]:
+    return (child for child in node if isinstance(child, list) and child and child[0] == name)
+
+
+def _child(node: list, name: str) -> Optional[list]:
+    return next(_children(node, name), None)
+
+
+def _floats(node: Optional[list], count: int, default: float = 0.0) -> List[float]:
+    values = [float(v) for v in (node or [])[1:count + 1]]
+    return values + [default] * (count - len(values))
+
+
+def parse_kicad_board(text: str, artwork: bool = False) -> Board:
+    """
+    Reads the copper of a KiCad 6+ .kicad_pcb file: segments and arcs (as two chords), vias,
+    footprint pads and filled zone polygons. Unplated (np_thru_hole) pads are holes only, with no
+    copper. Design rules live in the .kicad_pro file, so the default rules apply.
+    """
+    root = _parse_sexpr(text)
+    if not root or root[0] != "kicad_pcb":
+        raise BoardParseError("Not a KiCad board file.")
+    board = Board(artwork={} if artwork else None)
+    layers = _child(root, "layers")
+    board.copper_layers = [entry[1] for entry in (layers or [])[1:] if isinstance(entry, list) and len(entry) > 1 and entry[1].endswith(".Cu")]
+    net_table = {entry[1]: entry[2] for entry in _children(root, "net") if len(entry) > 2}
+
+    def net_of(node: list) -> int:
+        entry = _child(node, "net")
+        if not entry or len(entry) < 2:
+            return -1
+        return board.net(entry[2] if len(entry) > 2 else net_table.get(entry[1], entry[1]))
+
+    try:
+        for kind in ("segment", "arc"):
+            for i, track in enumerate(_children(root, kind)):
+                start, end = _floats(_child(track, "start"), 2), _floats(_child(track, "end"), 2)
+                width = _floats(_child(track, "width"), 1)[0]
+                layer, net = _child(track, "layer")[1], net_of(track)
+                item = board.add_item("track", f"{kind} {i}", net)
+                points = [start, _floats(_child(track, "mid"), 2), end] if kind == "arc" else [start, end]
+                for (x1, y1), (x2, y2) in zip(points, points[1:]):
+                    board.add_capsule(layer, x1, y1, x2, y2, width / 2, net, item)
+                board.check_track_width(item, start[0], start[1], width, layer)
+        for i, via in enumerate(_children(root, "via")):
+            x, y = _floats(_child(via, "at"), 2)
+            diameter, drill = _floats(_child(via, "size"), 1)[0], _floats(_child(via, "drill"), 1)[0]
+            layers = board.layer_span((_child(via, "layers") or ["layers", "F.Cu", "B.Cu"])[1:])
+            net = net_of(via)
+            item = board.add_item("via", f"via {i}", net)
+            for layer in layers:
+                board.add_capsule(layer, x, y, x, y, diameter / 2, net, item)
+            board.check_drill(item, x, y, diameter, drill, layers)
+        for footprint in list(_children(root, "footprint")) + list(_children(root, "module")):
+            fx, fy, rotation = _floats(_child(footprint, "at"), 3)
+            reference = next(
+                (entry[2] for entry in footprint if isinstance(entry, list) and len(entry) > 2
+                 and entry[0] in ("property", "fp_text") and entry[1] in ("Reference", "reference")), "?"
+            )
+            cos_r, sin_r = math.cos(math.radians(rotation)), math.sin(math.radians(rotation))
+            for pad in _children(footprint, "pad"):
+                px, py, pad_rotation = _floats(_child(pad, "at"), 3)
+                # KiCad's y axis points down, so a positive (counter-clockwise on screen) rotation is
+                # clockwise in these coordinates. The pad's own angle already includes the footprint's.
+                x, y = fx + px * cos_r + py * sin_r, fy - px * sin_r + py * cos_r
+                width, height = _floats(_child(pad, "size"), 2)
+                layers = board.layer_span((_child(pad, "layers") or ["layers"])[1:])
+                plated = len(pad) < 3 or pad[2] != "np_thru_hole"
+                if not layers and plated:
+                    continue
+                name = f"{reference}.{pad[1] if len(pad) > 1 and pad[1] else '?'}"
+                drill = _child(pad, "drill")
+                if plated:
+                    net = net_of(pad)
+                    item = board.add_item("pad", name, net)
+                    board.add_pad(layers, x, y, width, height, pad_rotation, pad[3] if len(pad) > 3 else "rect", net, item)
+                else:
+                    # Mounting hole: no copper or net and no ring to check, but copper must keep clear of it
+                    item = board.add_item("hole", name, -1)
+                if drill and len(drill) > 2 and drill[1] == "oval":
+                    # Slot: (drill oval <width> [<height>]) along the pad's axes
+                    slot = [float(v) for v in drill[2:4] if not isinstance(v, list)]
+                    slot_w, slot_h = slot[0], slot[-1]
+                    slot_shape = (min(slot_w, slot_h), abs(slot_w - slot_h), pad_rotation + (0 if slot_w >= slot_h else 90))
+                    board.add_hole(x, y, *slot_shape, plated)
+                    if not plated:
+                        board.add_keepout(item, x, y, *slot_shape)
+                elif drill and len(drill) > 1:
+                    if not plated:
+                        board.add_keepout(item, x, y, float(drill[1]))
+                    board.check_drill(item, x, y, min(width, height), float(drill[1]), layers, plated)
+        for i, zone in enumerate(_children(root, "zone")):
+            net = net_of(zone)
+            for j, filled in enumerate(_children(zone, "filled_polygon")):
+                layer = _child(filled, "layer")
+                points = [[float(p[1]), float(p[2])] for p in _children(_child(filled, "pts") or [], "xy")]
+                zone_layers = [layer[1]] if layer else [entry[1] for entry in _children(zone, "layer")]
+                _add_zone(board, f"zone {i}.{j}", net, zone_layers, np.array(points, dtype=np.float64))
+    except (TypeError, ValueError, IndexError) as e:
+        raise BoardParseError(f"Malformed board file: {e!r}.")
+    return board
+
+
+def parse_board(design_data: str, file_name: str, artwork: bool = False) -> Board:
+    if file_name.lower().endswith(".kicad_pcb") or design_data.lstrip().startswith("(kicad_pcb"):
+        return parse_kicad_board(design_data, artwork)
+    try:
+        data = json.loads(design_data)
+    except json.JSONDecodeError as e:
+        raise BoardParseError(f"The board is neither a KiCad board nor JSON: {e.msg} at line {e.lineno}.")
+    return parse_json_board(data, artwork)
+
+
+# --- Geometry kernels (vectorized over arrays of candidate pairs) ---
+
+def _point_segment(p: np.ndarray, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distance from each point p to segment a-b, and the closest point on the segment."""
+    ab = b - a
+    length2 = np.einsum("ij,ij->i", ab, ab)
+    t = np.einsum("ij,ij->i", p - a, ab) / np.where(length2 > 0, length2, 1.0)
+    closest = a + np.clip(t, 0.0, 1.0)[:, None] * ab
+    diff = p - closest
+    return np.sqrt(np.einsum("ij,ij->i", diff, diff)), closest
+
+
+def segment_distances(p1: np.ndarray, p2: np.ndarray, q1: np.ndarray, q2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum distance between segments p1-p2 and q1-q2 (each (n, 2)), and the point midway between
+    the closest points, which is where a violation is reported. Zero-length segments are points.
+    """
+    d_p1, c_p1 = _point_segment(p1, q1, q2)
+    d_p2, c_p2 = _point_segment(p2, q1, q2)
+    d_q1, c_q1 = _point_segment(q1, p1, p2)
+    d_q2, c_q2 = _point_segment(q2, p1, p2)
+    distances = np.stack([d_p1, d_p2, d_q1, d_q2])
+    locations = np.stack([(p1 + c_p1) / 2, (p2 + c_p2) / 2, (q1 + c_q1) / 2, (q2 + c_q2) / 2])
+    best = np.argmin(distances, axis=0)
+    rows = np.arange(len(p1))
+    distance, location = distances[best, rows], locations[best, rows]
+
+    # Crossing segments: the endpoint distances above are not zero, the real distance is.
+    d1, d2, w = p2 - p1, q2 - q1, q1 - p1
+    denom = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    safe = np.where(denom != 0, denom, 1.0)
+    s = (w[:, 0] * d2[:, 1] - w[:, 1] * d2[:, 0]) / safe
+    t = (w[:, 0] * d1[:, 1] - w[:, 1] * d1[:, 0]) / safe
+    crossing = (denom != 0) & (s >= 0) & (s <= 1) & (t >= 0) & (t <= 1)
+    if crossing.any():
+        distance = np.where(crossing, 0.0, distance)
+        location = np.where(crossing[:, None], p1 + s[:, None] * d1, location)
+    return distance, location
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Even-odd rule, vectorized over points and edges (in chunks)."""
+    inside = np.zeros(len(points), dtype=bool)
+    ax, ay = polygon[:, 0], polygon[:, 1]
+    bx, by = np.roll(ax, -1), np.roll(ay, -1)
+    chunk = max(1, BBOX_SCAN_CHUNK // max(1, len(polygon)))
+    for start in range(0, len(points), chunk):
+        px, py = points[start:start + chunk, 0:1], points[start:start + chunk, 1:2]
+        straddles = (ay > py) != (by > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = ax + (py - ay) * (bx - ax) / (by - ay)
+        inside[start:start + chunk] = np.count_nonzero(straddles & (px < x_cross), axis=1) % 2 == 1
+    return inside
+
+
+def candidate_pairs(geometry: np.ndarray, margin: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs of primitives whose bounding boxes, grown by their radius and half the margin, overlap.
+    Primitives are hashed into every grid cell their box covers and paired within each cell. Cells
+    are small (a lower percentile of primitive size) so crowded areas make few false candidates;
+    the rare primitive spanning many cells is scanned against the others directly.
+    """
+    count = len(geometry)
+    empty = np.empty(0, dtype=np.int64)
+    if count < 2:
+        return empty, empty
+    x1, y1, x2, y2, radius = geometry[:, 0], geometry[:, 1], geometry[:, 2], geometry[:, 3], geometry[:, 4]
+    grow = radius + margin / 2
+    xmin, xmax = np.minimum(x1, x2) - grow, np.maximum(x1, x2) + grow
+    ymin, ymax = np.minimum(y1, y2) - grow, np.maximum(y1, y2) + grow
+    cell = max(float(np.percentile(np.maximum(xmax - xmin, ymax - ymin), CELL_SIZE_PERCENTILE)), 1e-6)
+    cx0, cx1 = np.floor(xmin / cell).astype(np.int64), np.floor(xmax / cell).astype(np.int64)
+    cy0, cy1 = np.floor(ymin / cell).astype(np.int64), np.floor(ymax / cell).astype(np.int64)
+    spans_x = cx1 - cx0 + 1
+    cells = spans_x * (cy1 - cy0 + 1)
+
+    firsts, seconds = [], []
+    small = np.flatnonzero(cells <= MAX_CELLS_PER_PRIMITIVE)
+    if len(small):
+        per = cells[small]
+        owner = np.repeat(small, per)
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(per) - per, per)
+        width = spans_x[owner]
+        gx, gy = cx0[owner] + offset % width, cy0[owner] + offset // width
+        keys = (gx - gx.min()) * (int(gy.max() - gy.min()) + 1) + (gy - gy.min())
+        order = np.argsort(keys, kind="stable")
+        keys, owner = keys[order], owner[order]
+        # Every pair within a run of equal keys: entry i pairs with the entries after it in its run.
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        after = np.repeat(ends, ends - starts) - np.arange(len(keys)) - 1
+        left = np.repeat(np.arange(len(keys)), after)
+        right = left + 1 + (np.arange(len(left)) - np.repeat(np.cumsum(after) - after, after))
+        firsts.append(owner[left])
+        seconds.append(owner[right])
+
+    large = np.flatnonzero(cells > MAX_CELLS_PER_PRIMITIVE)
+    chunk = max(1, BBOX_SCAN_CHUNK // count)
+    for start in range(0, len(large), chunk):
+        rows = large[start:start + chunk]
+        overlap = (
+            (xmin[rows, None] <= xmax) & (xmin <= xmax[rows, None]) &
+            (ymin[rows, None] <= ymax) & (ymin <= ymax[rows, None])
+        )
+        hit_rows, hit_cols = np.nonzero(overlap)
+        firsts.append(rows[hit_rows])
+        seconds.append(hit_cols)
+
+    if not firsts:
+        return empty, empty
+    a, b = np.concatenate(firsts), np.concatenate(seconds)
+    low, high = np.minimum(a, b), np.maximum(a, b)
+    keep = low != high
+    unique = np.unique(low[keep] * count + high[keep])
+    low, high = unique // count, unique % count
+    overlap = (xmin[low] <= xmax[high]) & (xmin[high] <= xmax[low]) & (ymin[low] <= ymax[high]) & (ymin[high] <= ymax[low])
+    return low[overlap], high[overlap]
+
+
+def check_layer(task: Tuple[str, np.ndarray, float, List[Tuple[int, int, np.ndarray]]]) -> Dict[str, Any]:
+    """
+    Checks one copper layer. Runs in a worker process, so it takes and returns plain arrays.
+    `primitives` rows are [x1, y1, x2, y2, radius, net, item]. Returns clearance violations between
+    items of different nets (or without a net), and contacts between items of the same net.
+    """
+    layer, primitives, clearance, zones = task
+    geometry = primitives[:, :5]
+    nets, items = primitives[:, 5].astype(np.int64), primitives[:, 6].astype(np.int64)
+    a, b = candidate_pairs(geometry, clearance)
+    keep = items[a] != items[b]
+    a, b = a[keep], b[keep]
+
+    distance, location = segment_distances(geometry[a, 0:2], geometry[a, 2:4], geometry[b, 0:2], geometry[b, 2:4])
+    gap = distance - geometry[a, 4] - geometry[b, 4]
+    same_net = (nets[a] == nets[b]) & (nets[a] >= 0)
+    violating = ~same_net & (gap < clearance)
+    touching = same_net & (gap <= CONTACT_TOLERANCE)
+    result = {
+        "layer": layer,
+        "violations": (items[a][violating], items[b][violating], gap[violating], location[violating]),
+        "contacts": (items[a][touching], items[b][touching]),
+    }
+
+    # Copper entirely inside a zone never comes near its outline: test one end of every primitive.
+    zone_a, zone_b, zone_gap, zone_location, contact_a, contact_b = [], [], [], [], [], []
+    for zone_item, zone_net, outline in zones:
+        low, high = outline.min(axis=0), outline.max(axis=0)
+        candidates = np.flatnonzero(
+            (items != zone_item) & (geometry[:, 0] >= low[0]) & (geometry[:, 0] <= high[0]) &
+            (geometry[:, 1] >= low[1]) & (geometry[:, 1] <= high[1])
+        )
+        if not len(candidates):
+            continue
+        inside = candidates[points_in_polygon(geometry[candidates, 0:2], outline)]
+        connected = (nets[inside] == zone_net) & (zone_net >= 0)
+        contact_a.append(np.full(np.count_nonzero(connected), zone_item))
+        contact_b.append(items[inside[connected]])
+        shorted = inside[~connected]
+        zone_a.append(np.full(len(shorted), zone_item))
+        zone_b.append(items[shorted])
+        zone_gap.append(-geometry[shorted, 4])
+        zone_location.append(geometry[shorted, 0:2])
+    if zone_a:
+        v_a, v_b, v_gap, v_location = result["violations"]
+        result["violations"] = (
+            np.concatenate([v_a] + zone_a), np.concatenate([v_b] + zone_b),
+            np.concatenate([v_gap] + zone_gap), np.concatenate([v_location] + zone_location),
+        )
+        c_a, c_b = result["contacts"]
+        result["contacts"] = (np.concatenate([c_a] + contact_a), np.concatenate([c_b] + contact_b))
+    return result
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> Executor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PCB_DRC_MAX_WORKERS)
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def layer_tasks(board: Board) -> List[Tuple[str, np.ndarray, float, List[Tuple[int, int, np.ndarray]]]]:
+    return [
+        (layer, np.asarray(rows + board.keepouts, dtype=np.float64), board.rules.clearance, board.zones.get(layer, []))
+        for layer, rows in board.primitives.items() if rows
+    ]
+
+
+def _describe(board: Board, item: int) -> str:
+    kind, reference, net = board.items[item]
+    label = f"{kind} {reference}" if kind in ("pad", "hole") else kind
+    return f"{label} ({board.net_names[net] if net >= 0 else 'no net'})"
+
+
+def collect_violations(board: Board, layer_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merges the per-layer results into located violations, worst first: one per item pair (a via
+    pair too close on four layers is one violation listing the four layers), unconnected nets,
+    and the single-item manufacturing checks.
+    """
+    pairs: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    parent = list(range(len(board.items)))
+
+    def find(n: int) -> int:
+        while parent[n] != n:
+            parent[n] = n = parent[parent[n]]
+        return n
+
+    for result in layer_results:
+        first, second, gaps, locations = result["violations"]
+        for a, b, gap, (x, y) in zip(first.tolist(), second.tolist(), gaps.tolist(), locations.tolist()):
+            key = (a, b) if a < b else (b, a)
+            entry = pairs.get(key)
+            if entry is None:
+                pairs[key] = {"gap": gap, "x": x, "y": y, "layers": [result["layer"]]}
+            else:
+                if result["layer"] not in entry["layers"]:
+                    entry["layers"].append(result["layer"])
+                if gap < entry["gap"]:
+                    entry.update(gap=gap, x=x, y=y)
+        for a, b in zip(*(side.tolist() for side in result["contacts"])):
+            a, b = find(a), find(b)
+            if a != b:
+                parent[a] = b
+
+    violations = []
+    clearance = board.rules.clearance
+    for (a, b), entry in pairs.items():
+        holes = (board.items[a][0] == "hole") + (board.items[b][0] == "hole")
+        if holes == 2:
+            continue # Two unplated holes: no copper between them to check
+        # Copper reaching into an unplated hole is a clearance failure, not a short: the hole has no net.
+        short = entry["gap"] <= 0 and not holes
+        rule = "HOLE_CLEARANCE" if holes else "SHORT" if short else "CLEARANCE"
+        violations.append({
+            "rule": rule,
+            "severity": "error",
+            "layers": entry["layers"],
+            "items": [_describe(board, a), _describe(board, b)],
+            "location": {"x": round(entry["x"], 4), "y": round(entry["y"], 4)},
+            "actual": round(max(entry["gap"], 0.0), 4),
+            "required": clearance,
+            "message": (
+                f"{'Short' if short else 'Hole clearance violation' if holes else 'Clearance violation'} on "
+                f"{', '.join(entry['layers'])} between {_describe(board, a)} and {_describe(board, b)}"
+                + ("" if short else f": {max(entry['gap'], 0.0):.3f} mm < {clearance:.3f} mm")
+                + f" at ({entry['x']:.3f}, {entry['y']:.3f})"
+            ),
+        })
+
+    islands: Dict[int, Dict[int, List[int]]] = {}
+    for item, (_, _, net) in enumerate(board.items):
+        if net >= 0:
+            islands.setdefault(net, {}).setdefault(find(item), []).append(item)
+    split = {net: groups for net, groups in islands.items() if len(groups) > 1}
+    origins: Dict[int, Tuple[float, float]] = {}
+    if split:
+        for rows in board.primitives.values():
+            for row in rows:
+                origins.setdefault(int(row[6]), (row[0], row[1]))
+    for net, groups in split.items():
+        # Point at the smallest island: usually the stray pad or track that needs a connection.
+        stray = min(groups.values(), key=len)
+        x, y = origins.get(stray[0], (0.0, 0.0))
+        violations.append({
+            "rule": "UNCONNECTED_NET",
+            "severity": "error",
+            "layers": [],
+            "items": [_describe(board, item) for item in stray[:10]],
+            "location": {"x": round(x, 4), "y": round(y, 4)},
+            "actual": len(groups),
+            "required": 1,
+            "message": f"Net '{board.net_names[net]}' is split into {len(groups)} unconnected parts; one is at ({x:.3f}, {y:.3f})",
+        })
+
+    names = {"MIN_TRACK_WIDTH": "Track width", "MIN_DRILL": "Drill", "MIN_ANNULAR_RING": "Annular ring"}
+    for check in board.rule_violations:
+        violations.append({
+            "rule": check["rule"],
+            "severity": "warning",
+            "layers": check["layers"],
+            "items": [_describe(board, check["item"])],
+            "location": {"x": round(check["x"], 4), "y": round(check["y"], 4)},
+            "actual": round(check["actual"], 4),
+            "required": check["required"],
+            "message": (
+                f"{names[check['rule']]} {check['actual']:.3f} mm below the {check['required']:.3f} mm minimum: "
+                f"{_describe(board, check['item'])} at ({check['x']:.3f}, {check['y']:.3f})"
+            ),
+        })
+
+    severity_order = {"error": 0, "warning": 1}
+    violations.sort(key=lambda v: (severity_order[v["severity"]], v["rule"] == "UNCONNECTED_NET", v["actual"]))
+    return violations
+
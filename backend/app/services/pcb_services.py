@@ -1,105 +1,210 @@
 # rtl-editor-backend/app/services/pcb_service.py
 import os
-import base64
+import asyncio
+import shutil
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
 from app.utils.command_executor import run_command
 from app.utils.file_manager import create_temp_dir, cleanup_temp_dir
 from app.models.pcb_models import PcbValidationResult, GerberGenerationResult
 from app.models.common import ToolResponse
+from app.services import gerber_writer, pcb_drc
+from app.services.uploads import upload_fileobj_chunked
+from app.core.config import settings
 
 async def run_drc(design_data: str, file_name: str) -> PcbValidationResult:
     """
-    Simulates running a Design Rule Check (DRC) on PCB design data.
+    Runs a geometric Design Rule Check on a board (KiCad .kicad_pcb or JSON, see services/pcb_drc):
+    copper clearance and shorts between nets, unconnected nets, track width, drill and annular ring.
+    Large multi-layer boards are checked one layer per worker process.
     """
-    temp_dir = create_temp_dir()
-    design_file_path = os.path.join(temp_dir, file_name)
-
+    loop = asyncio.get_event_loop()
+    started = time.perf_counter()
     try:
-        with open(design_file_path, "w") as f:
-            f.write(design_data)
-
-        log_output = ""
-        errors = []
-        warnings = []
-        success = True
-
-        # --- SIMULATED DRC LOGIC (REPLACE WITH REAL TOOL CALL) ---
-        # Example: if "unconnected_net" in design_data:
-        #   run_command(["kicad-cli", "drc", design_file_path])
-        #   parse output
-        if "unconnected_net" in design_data:
-            errors.append("Unconnected net detected: Net 'VCC' has no connection.")
-            log_output += "DRC Error: Unconnected net detected.\n"
-            success = False
-        if "track_spacing_violation" in design_data:
-            warnings.append("Track spacing violation: Between R1 and C2.")
-            log_output += "DRC Warning: Track spacing violation.\n"
-
-        if not errors and not warnings:
-            log_output += "DRC successful: No errors or warnings found.\n"
-            message = "DRC completed: Design is clean."
-        elif errors:
-            message = "DRC completed with errors. Check log."
-        else:
-            message = "DRC completed with warnings. Check log."
-
+        board = await loop.run_in_executor(None, pcb_drc.parse_board, design_data, file_name)
+    except pcb_drc.BoardParseError as e:
         return PcbValidationResult(
-            success=success,
-            log=log_output,
-            message=message,
-            errors=errors,
-            warnings=warnings
+            success=False,
+            log=f"DRC Error: {e}\n",
+            message="DRC failed: the board could not be read.",
+            errors=[str(e)]
         )
-    finally:
-        cleanup_temp_dir(temp_dir)
-
-async def generate_gerber(design_data: str, file_name: str) -> GerberGenerationResult:
+    tasks = await loop.run_in_executor(None, pcb_drc.layer_tasks, board)
+    parsed = time.perf_counter()
+
+    parallel = (
+        len(tasks) > 1 and settings.PCB_DRC_MAX_WORKERS > 1
+        and board.primitive_count >= settings.PCB_DRC_PARALLEL_MIN_PRIMITIVES
+    )
+    if parallel:
+        pool = pcb_drc.get_process_pool()
+        layer_results = await asyncio.gather(*(loop.run_in_executor(pool, pcb_drc.check_layer, task) for task in tasks))
+    else:
+        layer_results = await loop.run_in_executor(None, lambda: [pcb_drc.check_layer(task) for task in tasks])
+    violations = await loop.run_in_executor(None, pcb_drc.collect_violations, board, layer_results)
+    checked = time.perf_counter()
+
+    errors = [v["message"] for v in violations if v["severity"] == "error"]
+    warnings = [v["message"] for v in violations if v["severity"] == "warning"]
+    limit = settings.PCB_DRC_MAX_VIOLATIONS
+    log_output = f"DRC checked {len(board.items)} items ({board.primitive_count} copper primitives) on {len(tasks)} layers.\n"
+    log_output += "".join(f"DRC Error: {message}\n" for message in errors[:limit])
+    log_output += "".join(f"DRC Warning: {message}\n" for message in warnings[:limit])
+    if len(violations) > limit:
+        log_output += f"... {len(violations) - limit} more violations not listed.\n"
+
+    if not errors and not warnings:
+        log_output += "DRC successful: No errors or warnings found.\n"
+        message = "DRC completed: Design is clean."
+    elif errors:
+        message = f"DRC completed with {len(errors)} errors and {len(warnings)} warnings. Check log."
+    else:
+        message = f"DRC completed with {len(warnings)} warnings. Check log."
+
+    return PcbValidationResult(
+        success=not errors,
+        log=log_output,
+        message=message,
+        errors=errors[:limit],
+        warnings=warnings[:limit],
+        violations=violations[:limit],
+        stats={
+            "items": len(board.items),
+            "primitives": board.primitive_count,
+            "layers": len(tasks),
+            "nets": len(board.net_names),
+            "errorCount": len(errors),
+            "warningCount": len(warnings),
+            "parallel": parallel,
+            "parseSeconds": round(parsed - started, 3),
+            "checkSeconds": round(checked - parsed, 3),
+        }
+    )
+
+async def generate_gerber(
+    design_data: str,
+    file_name: str,
+    storage_bucket: Optional[Any] = None,
+    storage_path: Optional[str] = None,
+    owner_id: Optional[str] = None
+) -> GerberGenerationResult:
     """
-    Simulates generating Gerber files from PCB design data.
+    Generates RS-274X Gerber files for every copper layer and an Excellon drill file, streamed
+    primitive by primitive into one zip archive. With a storage bucket the archive is uploaded to
+    `storage_path`; otherwise it is kept under PCB_ARTIFACT_DIR for `owner_id` and referenced by an
+    artifactId that GET /pcb/artifacts/{artifact_id} serves. The result references the archive and
+    lists its files instead of inlining them.
     """
-    temp_dir = create_temp_dir()
-    design_file_path = os.path.join(temp_dir, file_name)
-    gerber_output_dir = os.path.join(temp_dir, "gerbers")
-    os.makedirs(gerber_output_dir, exist_ok=True)
-
+    loop = asyncio.get_event_loop()
+    started = time.perf_counter()
     try:
-        with open(design_file_path, "w") as f:
-            f.write(design_data)
-
-        # --- SIMULATED GERBER GENERATION (REPLACE WITH REAL TOOL CALL) ---
-        # Example: run_command(["kicad-cli", "export", "gerber", design_file_path, "-o", gerber_output_dir])
-        dummy_gerber_contents = {
-            "F_Cu.gbr": "M02*\n%FSLAX36Y36*%\n%MOIN*%\n%ADD10C,0.005000*%\n... (simulated top copper layer)",
-            "B_Cu.gbr": "M02*\n%FSLAX36Y36*%\n%MOIN*%\n%ADD10C,0.005000*%\n... (simulated bottom copper layer)",
-            "F_Mask.gbr": "M02*\n... (simulated top solder mask)",
-            "B_Mask.gbr": "M02*\n... (simulated bottom solder mask)",
-            "F_SilkS.gbr": "M02*\n... (simulated top silkscreen)",
-            "B_SilkS.gbr": "M02*\n... (simulated bottom silkscreen)",
-            "Edge_Cuts.gbr": "M02*\n... (simulated board outline)",
-            "drill.drl": "M48\n... (simulated drill file)"
-        }
-
-        generated_gerbers = {}
-        log_output = "Simulating Gerber file generation...\n"
-        for layer_name, content in dummy_gerber_contents.items():
-            gerber_path = os.path.join(gerber_output_dir, layer_name)
-            with open(gerber_path, "w") as f:
-                f.write(content)
-            log_output += f"Generated {layer_name}\n"
-            with open(gerber_path, "rb") as f:
-                generated_gerbers[layer_name] = base64.b64encode(f.read()).decode('utf-8')
-
-        log_output += "Gerber generation successful!"
-        message = "Gerber files generated successfully!"
-        success = True
-
+        board = await loop.run_in_executor(None, lambda: pcb_drc.parse_board(design_data, file_name, artwork=True))
+    except pcb_drc.BoardParseError as e:
         return GerberGenerationResult(
-            success=success,
-            log=log_output,
-            message=message,
-            gerberFiles=generated_gerbers
+            success=False,
+            log=f"Gerber Error: {e}\n",
+            message="Gerber generation failed: the board could not be read."
         )
+    apertures = await loop.run_in_executor(None, gerber_writer.build_aperture_table, board)
+    created = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    layers = [layer for layer in board.copper_layers if board.artwork.get(layer)]
+    layers += [layer for layer in board.artwork if layer not in layers]
+    functions = {layer: gerber_writer.file_function(layer, layers) for layer in layers}
+
+    temp_dir = create_temp_dir()
+    try:
+        archive_path = os.path.join(temp_dir, "gerbers.zip")
+        parallel = len(layers) > 1 and board.primitive_count >= settings.GERBER_PARALLEL_MIN_PRIMITIVES
+        if parallel:
+            # Layers are generated side by side in worker processes, then copied into the archive in order.
+            pool = pcb_drc.get_process_pool()
+            paths = await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool, gerber_writer.write_layer_file, os.path.join(temp_dir, gerber_writer.layer_file_name(layer)),
+                    board.artwork[layer], functions[layer], apertures, created
+                )
+                for layer in layers
+            ))
+            layer_chunks = [gerber_writer.read_layer_file(path) for path in paths]
+        else:
+            # Small boards: each layer is written straight into its archive entry.
+            layer_chunks = [
+                gerber_writer.iter_gerber(board.artwork[layer], functions[layer], apertures, created) for layer in layers
+            ]
+        members = [
+            (gerber_writer.layer_file_name(layer), {"layer": layer, "function": functions[layer]}, chunks)
+            for layer, chunks in zip(layers, layer_chunks)
+        ]
+        for name, holes, function in (
+            ("drill.drl", board.holes, f"Plated,1,{len(layers)},PTH"),
+            ("NPTH.drl", board.unplated_holes, f"NonPlated,1,{len(layers)},NPTH"),
+        ):
+            if holes:
+                members.append((name, {"function": function}, gerber_writer.iter_excellon(holes, function, created)))
+        artifacts = await loop.run_in_executor(None, gerber_writer.write_archive, archive_path, members)
+        archive = await _store_archive(archive_path, storage_bucket, storage_path, owner_id)
     finally:
         cleanup_temp_dir(temp_dir)
+    elapsed = time.perf_counter() - started
+
+    log_output = "".join(
+        f"Generated {artifact['name']} ({artifact['size']} bytes, {artifact['compressedSize']} compressed)\n" for artifact in artifacts
+    )
+    log_output += (
+        f"{len(apertures)} apertures shared across {len(layers)} layers; "
+        f"{len(board.holes)} plated and {len(board.unplated_holes)} unplated holes.\n"
+    )
+    log_output += "Gerber generation successful!"
+    return GerberGenerationResult(
+        success=True,
+        log=log_output,
+        message="Gerber files generated successfully!",
+        archive=archive,
+        artifacts=artifacts,
+        stats={
+            "layers": len(layers),
+            "primitives": board.primitive_count,
+            "apertures": len(apertures),
+            "holes": len(board.holes),
+            "unplatedHoles": len(board.unplated_holes),
+            "parallel": parallel,
+            "seconds": round(elapsed, 3),
+        }
+    )
+
+def _artifact_path(owner_id: str, artifact_id: str) -> str:
+    return os.path.join(settings.PCB_ARTIFACT_DIR, owner_id, f"{artifact_id}.zip")
+
+def resolve_artifact(owner_id: str, artifact_id: str) -> Optional[str]:
+    """The local archive `artifact_id` of `owner_id`, or None. IDs are UUIDs, so they cannot name other paths."""
+    try:
+        artifact_id = str(uuid.UUID(artifact_id))
+    except ValueError:
+        return None
+    path = _artifact_path(owner_id, artifact_id)
+    return path if os.path.isfile(path) else None
+
+async def _store_archive(
+    archive_path: str, storage_bucket: Optional[Any], storage_path: Optional[str], owner_id: Optional[str]
+) -> Dict[str, Any]:
+    """Uploads the archive to Storage, or moves it into PCB_ARTIFACT_DIR. Returns its reference."""
+    loop = asyncio.get_event_loop()
+    if storage_bucket is not None and storage_path:
+        blob = storage_bucket.blob(storage_path)
+        def upload():
+            with open(archive_path, "rb") as f:
+                return upload_fileobj_chunked(blob, f, "application/zip", settings.UPLOAD_CHUNK_SIZE)
+        size, checksum = await loop.run_in_executor(None, upload)
+        # checksum is the chunked sha256 recorded for uploaded project files (services/uploads)
+        return {"storagePath": storage_path, "size": size, "checksum": checksum, "contentType": "application/zip"}
+
+    artifact_id = str(uuid.uuid4())
+    local_path = _artifact_path(owner_id or "shared", artifact_id)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    await loop.run_in_executor(None, shutil.move, archive_path, local_path)
+    return {"artifactId": artifact_id, "size": os.path.getsize(local_path), "contentType": "application/zip"}
 
 async def validate_netlist(netlist_data: str, file_name: str) -> ToolResponse:
     """
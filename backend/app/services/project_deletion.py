@@ -0,0 +1,204 @@
+# eda-backend/app/services/project_deletion.py
+# Service for cascade-deleting a project: tombstone first, then remove blobs and
+# dependent Firestore documents in the background with bounded parallelism.
+
+import asyncio
+import os
+import shutil
+from typing import Any, Iterable, List, Optional, Set
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+from pymongo.database import Database as MongoDatabase
+from app.core.config import settings
+from app.services import project_files
+from app.services.rtl_index import rtl_index_registry
+from app.services.signed_urls import invalidate_download_url
+from app.services.user_cache import user_profile_cache
+
+FIRESTORE_BATCH_LIMIT = 500
+
+# Firestore collections holding per-project documents, keyed by their 'projectId' field.
+PROJECT_SCOPED_COLLECTIONS = ("jobs", "toolLogs", "uploadSessions")
+
+# Storage prefixes owned by a project: uploaded files and tool outputs.
+PROJECT_STORAGE_PREFIXES = ("project-files/{project_id}/", "project-outputs/{project_id}/")
+
+
+def deletion_job_id(project_data: dict) -> Optional[str]:
+    """
+    The deletion job of a tombstoned project, or None for a live one. The tombstone lives in
+    server-only fields ('deletionJobId', 'deletedAt') that ProjectUpdate cannot set, and leaves
+    the project's own 'status' untouched.
+    """
+    return (project_data or {}).get("deletionJobId")
+
+
+def is_live_project(project_doc: Any) -> bool:
+    """False for missing projects and for projects tombstoned by a pending deletion."""
+    return project_doc.exists and not deletion_job_id(project_doc.to_dict())
+
+
+async def tombstone_project(firestore_db: firestore.Client, project_id: str, user_id: str) -> str:
+    """
+    Marks a project as being deleted and creates the deletion job that tracks its cleanup.
+    Returns the job ID. From this point the project is hidden from every project endpoint.
+    """
+    job_ref = firestore_db.collection("deletionJobs").document()
+    batch = firestore_db.batch()
+    batch.update(firestore_db.collection("projects").document(project_id), {
+        "deletionJobId": job_ref.id,
+        "deletedAt": firestore.SERVER_TIMESTAMP,
+    })
+    batch.set(job_ref, {
+        "projectId": project_id,
+        "userId": user_id,
+        "status": "pending",
+        "blobsTotal": 0,
+        "blobsDeleted": 0,
+        "documentsDeleted": 0,
+        "failedPaths": [],
+        "attempts": 0,
+        "createdAt": firestore.SERVER_TIMESTAMP,
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    })
+    await batch.commit()
+    return job_ref.id
+
+
+async def _list_project_blob_paths(firestore_db: firestore.Client, firebase_storage_bucket: Any, project_id: str) -> Set[str]:
+    """Every blob the project owns: paths recorded in file metadata plus anything under its storage prefixes."""
+    paths = {f.filePath for f in await project_files.list_all_files(firestore_db, project_id) if f.filePath}
+    loop = asyncio.get_event_loop()
+    for prefix in PROJECT_STORAGE_PREFIXES:
+        prefix = prefix.format(project_id=project_id)
+        names = await loop.run_in_executor(
+            None, lambda: [blob.name for blob in firebase_storage_bucket.list_blobs(prefix=prefix)]
+        )
+        paths.update(names)
+    return paths
+
+
+async def _delete_blob_with_retry(firebase_storage_bucket: Any, path: str) -> bool:
+    """Deletes one blob, retrying transient failures with exponential backoff. A missing blob counts as deleted."""
+    loop = asyncio.get_event_loop()
+    blob = firebase_storage_bucket.blob(path)
+    for attempt in range(settings.DELETE_MAX_RETRIES + 1):
+        try:
+            await loop.run_in_executor(None, lambda: blob.delete())
+            invalidate_download_url(path)
+            return True
+        except NotFound:
+            invalidate_download_url(path)
+            return True
+        except Exception as e:
+            if attempt == settings.DELETE_MAX_RETRIES:
+                print(f"Failed to delete blob {path} after {attempt + 1} attempts: {e}")
+                return False
+            await asyncio.sleep(0.5 * (2 ** attempt))
+    return False
+
+
+async def _delete_blobs(job_ref: Any, firebase_storage_bucket: Any, paths: Iterable[str]) -> List[str]:
+    """Deletes blobs concurrently, at most DELETE_CONCURRENCY at a time. Returns the paths that could not be deleted."""
+    semaphore = asyncio.Semaphore(settings.DELETE_CONCURRENCY)
+    failed_paths: List[str] = []
+    deleted = 0
+
+    async def _delete(path: str) -> None:
+        nonlocal deleted
+        async with semaphore:
+            if not await _delete_blob_with_retry(firebase_storage_bucket, path):
+                failed_paths.append(path)
+                return
+        deleted += 1
+        if deleted % settings.DELETE_PROGRESS_INTERVAL == 0:
+            await job_ref.update({"blobsDeleted": deleted, "updatedAt": firestore.SERVER_TIMESTAMP})
+
+    await asyncio.gather(*(_delete(path) for path in paths))
+    await job_ref.update({"blobsDeleted": deleted, "updatedAt": firestore.SERVER_TIMESTAMP})
+    return failed_paths
+
+
+async def _delete_query_in_batches(firestore_db: firestore.Client, query: Any) -> int:
+    """Deletes every document matched by `query` using batched writes. Returns the number deleted."""
+    deleted = 0
+    while True:
+        snapshot = await query.select([]).limit(FIRESTORE_BATCH_LIMIT).get()
+        docs = list(snapshot)
+        if not docs:
+            return deleted
+        batch = firestore_db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        await batch.commit()
+        deleted += len(docs)
+
+
+async def run_cascade_delete(
+    job_id: str,
+    project_id: str,
+    user_id: str,
+    firestore_db: firestore.Client,
+    firebase_storage_bucket: Any,
+    mongo_db: MongoDatabase
+) -> None:
+    """
+    Removes everything a tombstoned project owns, then the project document itself.
+    Progress is written to 'deletionJobs/{job_id}'. If some blobs cannot be deleted the job ends
+    as 'failed' with their paths, the project stays tombstoned, and the job can be retried.
+    """
+    job_ref = firestore_db.collection("deletionJobs").document(job_id)
+    project_ref = firestore_db.collection("projects").document(project_id)
+    await job_ref.update({"status": "running", "attempts": firestore.Increment(1), "updatedAt": firestore.SERVER_TIMESTAMP})
+
+    try:
+        project_doc = await project_ref.get()
+        freed_bytes = (project_doc.to_dict() or {}).get("totalFileBytes", 0) if project_doc.exists else 0
+
+        blob_paths = await _list_project_blob_paths(firestore_db, firebase_storage_bucket, project_id)
+        await job_ref.update({"blobsTotal": len(blob_paths), "blobsDeleted": 0})
+        failed_paths = await _delete_blobs(job_ref, firebase_storage_bucket, sorted(blob_paths))
+
+        documents_deleted = await _delete_query_in_batches(
+            firestore_db, project_files.files_collection(firestore_db, project_id)
+        )
+        for collection_name in PROJECT_SCOPED_COLLECTIONS:
+            documents_deleted += await _delete_query_in_batches(
+                firestore_db, firestore_db.collection(collection_name).where("projectId", "==", project_id)
+            )
+        # Live editor state written by the RTL editor (see app/main.py).
+        await firestore_db.collection("artifacts").document(settings.FIREBASE_PROJECT_ID)\
+                          .collection("users").document(user_id)\
+                          .collection("live_projects").document(project_id).delete()
+        local_project_dir = os.path.join(settings.UPLOAD_DIR, user_id, project_id)
+        await asyncio.get_event_loop().run_in_executor(
+            None, lambda: shutil.rmtree(local_project_dir, ignore_errors=True)
+        )
+        rtl_index_registry.drop(project_id)
+
+        if failed_paths:
+            await job_ref.update({
+                "status": "failed",
+                "failedPaths": failed_paths,
+                "documentsDeleted": firestore.Increment(documents_deleted),
+                "updatedAt": firestore.SERVER_TIMESTAMP,
+            })
+            print(f"Deletion job {job_id} for project {project_id} left {len(failed_paths)} blobs behind.")
+            return
+
+        if project_doc.exists:
+            await project_ref.delete()
+            if freed_bytes:
+                await mongo_db.users.update_one({"firebaseUid": user_id}, {"$inc": {"storageBytesUsed": -freed_bytes}})
+                user_profile_cache.invalidate(user_id)
+        await job_ref.update({
+            "status": "completed",
+            "failedPaths": [],
+            "documentsDeleted": firestore.Increment(documents_deleted),
+            "completedAt": firestore.SERVER_TIMESTAMP,
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+        })
+        print(f"Deletion job {job_id} for project {project_id} completed.")
+    except Exception as e:
+        print(f"Deletion job {job_id} for project {project_id} failed: {e}")
+        await job_ref.update({"status": "failed", "error": str(e), "updatedAt": firestore.SERVER_TIMESTAMP})
@@ -0,0 +1,83 @@
+# eda-backend/app/services/project_files.py
+# Service for project file metadata stored in the 'projects/{projectId}/files' subcollection.
+
+import hashlib
+from typing import Any, List, Optional, Tuple
+from firebase_admin import firestore
+from app.schemas.project import FileMetadata
+
+FILES_SUBCOLLECTION = "files"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def file_doc_id(file_name: str) -> str:
+    """
+    Document ID for a file's metadata. Derived from the file name so lookup by name is a single
+    document get, and safe for names containing '/' or other characters Firestore IDs reject.
+    """
+    return hashlib.sha256(file_name.encode("utf-8")).hexdigest()
+
+def files_collection(firestore_db: firestore.Client, project_id: str) -> Any:
+    return firestore_db.collection("projects").document(project_id).collection(FILES_SUBCOLLECTION)
+
+async def get_file(firestore_db: firestore.Client, project_id: str, file_name: str) -> Optional[FileMetadata]:
+    """Looks up one file's metadata by name."""
+    file_doc = await files_collection(firestore_db, project_id).document(file_doc_id(file_name)).get()
+    if not file_doc.exists:
+        return None
+    return FileMetadata(**file_doc.to_dict())
+
+async def add_file(firestore_db: firestore.Client, project_id: str, file_metadata: FileMetadata) -> Optional[FileMetadata]:
+    """
+    Records a file on a project and updates the project's summary counters.
+    A file with the same name replaces the previous entry; the replaced metadata is returned
+    so the caller can remove the superseded blob.
+    """
+    project_ref = firestore_db.collection("projects").document(project_id)
+    file_ref = files_collection(firestore_db, project_id).document(file_doc_id(file_metadata.fileName))
+
+    previous_doc = await file_ref.get()
+    previous = FileMetadata(**previous_doc.to_dict()) if previous_doc.exists else None
+
+    batch = firestore_db.batch()
+    batch.set(file_ref, file_metadata.model_dump())
+    batch.update(project_ref, {
+        "fileCount": firestore.Increment(0 if previous else 1),
+        "totalFileBytes": firestore.Increment((file_metadata.size or 0) - ((previous.size or 0) if previous else 0)),
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    })
+    await batch.commit()
+    return previous
+
+async def list_files(
+    firestore_db: firestore.Client,
+    project_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> Tuple[List[FileMetadata], Optional[str]]:
+    """
+    Returns one page of a project's files ordered by name, plus the cursor for the next page
+    (None on the last page). The cursor is the last file name of the page, so paging needs no extra reads.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = files_collection(firestore_db, project_id).order_by("fileName")
+    if cursor:
+        query = query.start_after({"fileName": cursor})
+    snapshot = await query.limit(limit + 1).get()
+
+    files = [FileMetadata(**doc.to_dict()) for doc in snapshot]
+    next_cursor = None
+    if len(files) > limit:
+        files = files[:limit]
+        next_cursor = files[-1].fileName
+    return files, next_cursor
+
+async def list_all_files(firestore_db: firestore.Client, project_id: str) -> List[FileMetadata]:
+    """Reads every file of a project, page by page. Use only where the full list is really needed."""
+    all_files: List[FileMetadata] = []
+    cursor = None
+    while True:
+        page, cursor = await list_files(firestore_db, project_id, MAX_PAGE_SIZE, cursor)
+        all_files.extend(page)
+        if not cursor:
+            return all_files
@@ -0,0 +1,294 @@
+# eda-backend/app/services/rtl_index.py
+# Per-project BM25 retrieval over HDL sources, used to ground AI chat answers in the user's own code.
+
+import asyncio
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from firebase_admin import firestore
+from app.core.config import settings
+from app.services import project_files
+from app.utils.cache import TTLCache
+
+HDL_EXTENSIONS = (".v", ".sv", ".vh", ".svh", ".vhd", ".vhdl")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field weights: a hit on a module/entity name says more than a hit on a port, which says more than the body.
+MODULE_WEIGHT = 3.0
+PORT_WEIGHT = 2.0
+TEXT_WEIGHT = 1.0
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_MODULE_DECL = re.compile(r"^\s*(?:module|macromodule|interface|package|entity)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+_MODULE_END = re.compile(r"^\s*(?:endmodule|endinterface|endpackage|end\s+(?:entity|architecture)\b)", re.IGNORECASE)
+_VERILOG_PORT = re.compile(r"\b(?:input|output|inout)\b", re.IGNORECASE)
+_VHDL_PORT = re.compile(r"^\s*([\w\s,]+?)\s*:\s*(?:in|out|inout|buffer)\b", re.IGNORECASE)
+
+# HDL keywords and types carry no meaning for retrieval; neither do the commonest English words in questions.
+STOPWORDS = frozenset("""
+module endmodule input output inout wire reg logic bit integer real parameter localparam assign always
+always_ff always_comb always_latch initial begin end if else case casez casex endcase default for while
+posedge negedge or and not generate endgenerate genvar function endfunction task endtask signed unsigned
+interface endinterface package endpackage import typedef struct enum entity architecture is of signal port
+map in out std_logic std_logic_vector downto to process then elsif when others library use all others
+the a an is are was be to of in on for with what how why does do can this that it my me i you and or
+please explain write show give use using code
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Identifiers and words, lowercased, plus their snake_case and camelCase parts ('tx_fifo' -> tx_fifo, tx, fifo)."""
+    tokens: List[str] = []
+    for identifier in _IDENTIFIER.findall(text):
+        parts = [p for p in _CAMEL_BOUNDARY.sub("_", identifier).split("_") if p]
+        candidates = {identifier.lower(), *(p.lower() for p in parts)} if len(parts) > 1 else {identifier.lower()}
+        tokens.extend(t for t in candidates if len(t) > 1 and t not in STOPWORDS)
+    return tokens
+
+
+def _port_names(line: str) -> List[str]:
+    vhdl = _VHDL_PORT.match(line)
+    if vhdl:
+        return _IDENTIFIER.findall(vhdl.group(1))
+    if _VERILOG_PORT.search(line):
+        return _IDENTIFIER.findall(re.sub(r"\[[^\]]*\]", " ", line))
+    return []
+
+
+@dataclass(frozen=True)
+class RtlSnippet:
+    source: str # Display name of the file
+    start_line: int # 1-based, inclusive
+    end_line: int
+    text: str
+
+
+def _line_terms(line: str) -> Counter:
+    terms: Counter = Counter()
+    ports = set(_port_names(line))
+    for identifier in _IDENTIFIER.findall(line):
+        weight = PORT_WEIGHT if identifier in ports else TEXT_WEIGHT
+        for token in tokenize(identifier):
+            terms[token] += weight
+    return terms
+
+
+def chunk_hdl(source: str, text: str, max_lines: int) -> List[Tuple[RtlSnippet, Counter]]:
+    """
+    Splits a file into snippets of at most `max_lines`, breaking at module boundaries (a module's
+    leading comment block stays with it), and returns each snippet with its weighted term
+    frequencies. Every snippet of a module also carries the module's name, so a question about
+    'uart_tx' finds all of it.
+    """
+    lines = text.splitlines()
+    # (start line, module name) for every snippet, in order
+    boundaries: List[Tuple[int, Optional[str]]] = [(0, None)]
+    module_name: Optional[str] = None
+    for i, line in enumerate(lines):
+        declaration = _MODULE_DECL.match(line)
+        if declaration:
+            start = i
+            while start > boundaries[-1][0] and lines[start - 1].strip().startswith(("//", "/*", "*", "--")):
+                start -= 1
+            module_name = declaration.group(1)
+            boundaries.append((start, module_name))
+        elif i - boundaries[-1][0] >= max_lines:
+            boundaries.append((i, module_name))
+        if _MODULE_END.match(line):
+            module_name = None
+            boundaries.append((i + 1, None))
+
+    chunks: List[Tuple[RtlSnippet, Counter]] = []
+    ends = [start for start, _ in boundaries[1:]] + [len(lines)]
+    for (start, name), end in zip(boundaries, ends):
+        if end <= start or not any(line.strip() for line in lines[start:end]):
+            continue
+        terms: Counter = Counter()
+        for line in lines[start:end]:
+            terms.update(_line_terms(line))
+        for token in tokenize(name or ""):
+            terms[token] += MODULE_WEIGHT
+        chunks.append((RtlSnippet(source, start + 1, end, "\n".join(lines[start:end])), terms))
+    return chunks
+
+
+class ProjectRtlIndex:
+    """
+    BM25 index over one project's HDL sources. Sources are (re)indexed one at a time: updating a
+    file only touches the postings of its own snippets, never the rest of the project.
+    """
+    def __init__(self):
+        self.snippets: Dict[int, RtlSnippet] = {}
+        self.lengths: Dict[int, float] = {}
+        self.snippet_terms: Dict[int, List[str]] = {}
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.source_snippets: Dict[str, List[int]] = {}
+        self.versions: Dict[str, str] = {}
+        self.total_length = 0.0
+        self.last_remote_sync = 0.0
+        self._next_id = 0
+        self.lock = asyncio.Lock()
+
+    def remove_source(self, key: str) -> None:
+        for snippet_id in self.source_snippets.pop(key, []):
+            self.snippets.pop(snippet_id)
+            self.total_length -= self.lengths.pop(snippet_id)
+            for term in self.snippet_terms.pop(snippet_id):
+                docs = self.postings[term]
+                del docs[snippet_id]
+                if not docs:
+                    del self.postings[term]
+        self.versions.pop(key, None)
+
+    def update_source(self, key: str, display_name: str, text: str, version: str) -> None:
+        if key in self.source_snippets:
+            self.remove_source(key)
+        ids: List[int] = []
+        for snippet, terms in chunk_hdl(display_name, text, settings.RTL_CHUNK_LINES):
+            snippet_id = self._next_id
+            self._next_id += 1
+            self.snippets[snippet_id] = snippet
+            length = sum(terms.values())
+            self.lengths[snippet_id] = length
+            self.total_length += length
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[snippet_id] = tf
+            self.snippet_terms[snippet_id] = list(terms)
+            ids.append(snippet_id)
+        self.source_snippets[key] = ids
+        self.versions[key] = version
+
+    def search(self, query: str, top_k: int) -> List[Tuple[float, RtlSnippet]]:
+        if not self.snippets:
+            return []
+        n = len(self.snippets)
+        avg_length = self.total_length / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for snippet_id, tf in docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[snippet_id] / avg_length)
+                scores[snippet_id] = scores.get(snippet_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, self.snippets[snippet_id]) for snippet_id, score in best]
+
+
+def _is_hdl(file_name: str) -> bool:
+    return file_name.lower().endswith(HDL_EXTENSIONS)
+
+
+def editor_dir(user_id: str, project_id: str) -> str:
+    """Where the RTL editor saves a project's files (see app/main.py)."""
+    return os.path.join(settings.UPLOAD_DIR, user_id, project_id)
+
+
+class RtlIndexRegistry:
+    """
+    Keeps the indexes of recently used projects in memory (per worker) and keeps each one in step
+    with its sources: files saved by the RTL editor and HDL files uploaded to the project.
+    An index is built on the first question about a project; after that, only files whose
+    version (mtime/size, or upload time/size) changed are re-read and re-indexed.
+    """
+    def __init__(self, max_projects: int, idle_seconds: float):
+        self._indexes = TTLCache(max_entries=max_projects, ttl_seconds=idle_seconds)
+
+    def _index_for(self, project_id: str) -> ProjectRtlIndex:
+        index = self._indexes.get(project_id)
+        if index is None:
+            index = ProjectRtlIndex()
+        self._indexes.set(project_id, index) # Refreshes the idle timeout
+        return index
+
+    async def _sync_editor_files(self, index: ProjectRtlIndex, user_id: str, project_id: str) -> None:
+        directory = editor_dir(user_id, project_id)
+        loop = asyncio.get_event_loop()
+
+        def _scan() -> Dict[str, Tuple[str, str]]:
+            if not os.path.isdir(directory):
+                return {}
+            return {
+                f"editor:{entry.name}": (entry.path, f"{entry.stat().st_mtime_ns}:{entry.stat().st_size}")
+                for entry in os.scandir(directory)
+                if entry.is_file() and _is_hdl(entry.name) and entry.stat().st_size <= settings.RTL_INDEX_MAX_FILE_BYTES
+            }
+
+        current = await loop.run_in_executor(None, _scan)
+        for key in [k for k in index.versions if k.startswith("editor:") and k not in current]:
+            index.remove_source(key)
+        for key, (path, version) in current.items():
+            if index.versions.get(key) == version:
+                continue
+            text = await loop.run_in_executor(None, lambda: open(path, encoding="utf-8", errors="replace").read())
+            index.update_source(key, os.path.basename(path), text, version)
+
+    async def _sync_uploaded_files(self, index: ProjectRtlIndex, firestore_db: firestore.Client, bucket: Any, project_id: str) -> None:
+        # Listing uploads costs a Firestore query, so it runs at most every RTL_INDEX_REMOTE_SYNC_SECONDS.
+        loop = asyncio.get_event_loop()
+        if loop.time() - index.last_remote_sync < settings.RTL_INDEX_REMOTE_SYNC_SECONDS:
+            return
+        index.last_remote_sync = loop.time()
+
+        current = {
+            f"storage:{f.filePath}": f
+            for f in await project_files.list_all_files(firestore_db, project_id)
+            if _is_hdl(f.fileName) and (f.size or 0) <= settings.RTL_INDEX_MAX_FILE_BYTES
+        }
+        for key in [k for k in index.versions if k.startswith("storage:") and k not in current]:
+            index.remove_source(key)
+        for key, file_meta in current.items():
+            version = f"{file_meta.uploadedAt.isoformat()}:{file_meta.size}"
+            if index.versions.get(key) == version:
+                continue
+            blob = bucket.blob(file_meta.filePath)
+            try:
+                text = await loop.run_in_executor(None, lambda: blob.download_as_bytes().decode("utf-8", errors="replace"))
+            except Exception as e:
+                print(f"Failed to index {file_meta.filePath} for project {project_id}: {e}")
+                continue
+            index.update_source(key, file_meta.fileName, text, version)
+
+    async def get(self, firestore_db: firestore.Client, bucket: Any, user_id: str, project_id: str) -> ProjectRtlIndex:
+        index = self._index_for(project_id)
+        async with index.lock:
+            await self._sync_editor_files(index, user_id, project_id)
+            if bucket is not None:
+                await self._sync_uploaded_files(index, firestore_db, bucket, project_id)
+        return index
+
+    def note_saved(self, project_id: str, file_name: str, code: str, version: str) -> None:
+        """Re-indexes a file the RTL editor just saved, if the project's index is loaded."""
+        index = self._indexes.get(project_id)
+        if index is not None and _is_hdl(file_name):
+            index.update_source(f"editor:{file_name}", file_name, code, version)
+
+    def drop(self, project_id: str) -> None:
+        self._indexes.pop(project_id)
+
+
+def select_snippets(index: ProjectRtlIndex, query: str, top_k: int, token_budget: int) -> List[RtlSnippet]:
+    """The best-scoring snippets for `query`, at most `top_k`, whose combined size fits `token_budget`."""
+    selected: List[RtlSnippet] = []
+    used = 0
+    for _, snippet in index.search(query, top_k * 2):
+        cost = len(snippet.text) // 4 + 1
+        if used + cost > token_budget:
+            continue
+        selected.append(snippet)
+        used += cost
+        if len(selected) == top_k:
+            break
+    return selected
+
+
+rtl_index_registry = RtlIndexRegistry(
+    max_projects=settings.RTL_INDEX_MAX_PROJECTS,
+    idle_seconds=settings.RTL_INDEX_IDLE_SECONDS
+)
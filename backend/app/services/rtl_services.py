@@ -4,6 +4,7 @@ from app.utils.command_executor import run_command
 from app.utils.file_manager import create_temp_dir, cleanup_temp_dir
 from app.utils.vcd_parser import parse_vcd_to_json
 from app.models.common import ToolResponse
+from app.services.log_triage import triage_log
 
 async def run_lint(rtl_code: str, file_name: str) -> ToolResponse:
     """
@@ -26,7 +27,7 @@ async def run_lint(rtl_code: str, file_name: str) -> ToolResponse:
         if "Warning" in result["stderr"]:
             message = "Linting completed with warnings."
 
-        return ToolResponse(success=success, log=full_log, message=message)
+        return ToolResponse(success=success, log=full_log, message=message, triage=triage_log(full_log.splitlines()))
     finally:
         cleanup_temp_dir(temp_dir)
 
@@ -57,13 +58,14 @@ async def run_synthesize(rtl_code: str, file_name: str) -> ToolResponse:
         full_log = result["stdout"] + "\n" + result["stderr"]
         success = result["returncode"] == 0 and os.path.exists(output_netlist_path)
         message = "Synthesis successful!" if success else "Synthesis failed. Check log."
+        triage = triage_log(full_log.splitlines()) # Before the netlist is appended to the log
 
         if success:
             with open(output_netlist_path, "r") as f:
                 netlist_content = f.read()
             full_log += f"\n\n--- Synthesized Netlist ({os.path.basename(output_netlist_path)}) ---\n{netlist_content}"
 
-        return ToolResponse(success=success, log=full_log, message=message)
+        return ToolResponse(success=success, log=full_log, message=message, triage=triage)
     finally:
         cleanup_temp_dir(temp_dir)
 
@@ -135,19 +137,20 @@ async def run_simulate(rtl_code: str, file_name: str) -> ToolResponse:
         compile_cmd = ["iverilog", "-o", os.path.basename(simulation_executable), file_name, os.path.basename(testbench_file_path)]
         compile_result = await run_command(compile_cmd, cwd=temp_dir)
 
+        compile_log = compile_result["stdout"] + "\n" + compile_result["stderr"]
         if compile_result["returncode"] != 0:
             return ToolResponse(
                 success=False,
-                log=compile_result["stdout"] + "\n" + compile_result["stderr"],
-                message="Simulation compilation failed. Check log."
+                log=compile_log,
+                message="Simulation compilation failed. Check log.",
+                triage=triage_log(compile_log.splitlines())
             )
 
         # 2. Run Simulation using vvp
         sim_cmd = ["vvp", os.path.basename(simulation_executable)]
         sim_result = await run_command(sim_cmd, cwd=temp_dir)
 
-        full_log = compile_result["stdout"] + "\n" + compile_result["stderr"] + "\n" + \
-                   sim_result["stdout"] + "\n" + sim_result["stderr"]
+        full_log = compile_log + "\n" + sim_result["stdout"] + "\n" + sim_result["stderr"]
 
         success = sim_result["returncode"] == 0
         message = "Simulation completed!" if success else "Simulation failed. Check log."
@@ -164,6 +167,8 @@ async def run_simulate(rtl_code: str, file_name: str) -> ToolResponse:
         else:
             full_log += "\nNo VCD file generated or simulation failed."
 
-        return ToolResponse(success=success, log=full_log, message=message, waveformData=waveforms)
+        return ToolResponse(
+            success=success, log=full_log, message=message, waveformData=waveforms, triage=triage_log(full_log.splitlines())
+        )
     finally:
         cleanup_temp_dir(temp_dir)
\ No newline at end of file
@@ -0,0 +1,286 @@
+# eda-backend/app/services/schematic_documents.py
+# Versioned schematic documents: the editor sends small JSON-patch style deltas against a base
+# revision instead of the whole schematic. Each worker keeps recently edited documents in memory,
+# the delta log is the source of truth between snapshots, and snapshots are written periodically.
+
+import asyncio
+import copy
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from pymongo.database import Database as MongoDatabase
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+SCHEMATICS_COLLECTION = "schematics"
+DELTAS_COLLECTION = "schematicDeltas"
+COLLECTIONS = ("components", "wires")
+
+
+class PatchError(ValueError):
+    """A delta op that cannot be applied to the document. The message is safe to show to the user."""
+
+
+class SchematicState:
+    """A document held in memory: elements keyed by ID (in insertion order) at a revision."""
+    def __init__(self, revision: int, snapshot_revision: int, content: Dict[str, List[Dict[str, Any]]]):
+        self.revision = revision
+        self.snapshot_revision = snapshot_revision
+        self.elements: Dict[str, Dict[str, Dict[str, Any]]] = {
+            name: {str(element.get("id")): element for element in content.get(name) or ()} for name in COLLECTIONS
+        }
+        self.lock = asyncio.Lock() # Serializes patches to this document within the worker
+
+    def content(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {name: list(self.elements[name].values()) for name in COLLECTIONS}
+
+
+_documents = TTLCache(max_entries=settings.SCHEMATIC_CACHE_MAX_DOCUMENTS, ttl_seconds=settings.SCHEMATIC_CACHE_IDLE_SECONDS)
+
+
+def _object_id(schematic_id: str) -> ObjectId:
+    try:
+        return ObjectId(schematic_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schematic not found.")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _apply_op(state: SchematicState, op: Dict[str, Any]) -> None:
+    """
+    Applies one op in place. Paths address elements by ID rather than array position:
+    '/components' (the whole list), '/wires/<id>' (one element) or '/components/<id>/x',
+    '/components/<id>/pins/0/label' (a field; '-' appends to a list). Ops: add, replace, remove.
+    """
+    kind, path = op.get("op"), op.get("path")
+    if kind not in ("add", "replace", "remove") or not isinstance(path, str) or not path.startswith("/"):
+        raise PatchError(f"Unsupported op {kind!r} on path {path!r}.")
+    tokens = [_unescape(token) for token in path[1:].split("/")]
+    if tokens[0] not in COLLECTIONS:
+        raise PatchError(f"Unknown collection in path {path!r}.")
+    elements = state.elements[tokens[0]]
+    value = copy.deepcopy(op.get("value")) # The op itself is logged as sent; later ops must not change it
+
+    if len(tokens) == 1:
+        if kind != "replace" or not isinstance(value, list):
+            raise PatchError(f"'{path}' can only be replaced with a list.")
+        state.elements[tokens[0]] = {str(element.get("id")): element for element in value}
+        return
+
+    element_id = tokens[1]
+    if len(tokens) == 2:
+        if kind == "remove":
+            if elements.pop(element_id, None) is None:
+                raise PatchError(f"No element '{element_id}' in {tokens[0]}.")
+            return
+        if not isinstance(value, dict) or str(value.setdefault("id", element_id)) != element_id:
+            raise PatchError(f"The value for '{path}' must be an object with id '{element_id}'.")
+        if kind == "replace" and element_id not in elements:
+            raise PatchError(f"No element '{element_id}' in {tokens[0]}.")
+        elements[element_id] = value
+        return
+
+    target: Any = elements.get(element_id)
+    if target is None:
+        raise PatchError(f"No element '{element_id}' in {tokens[0]}.")
+    try:
+        for token in tokens[2:-1]:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        last = tokens[-1]
+        if isinstance(target, list):
+            if kind == "add":
+                target.insert(len(target) if last == "-" else int(last), value)
+            elif kind == "replace":
+                target[int(last)] = value
+            else:
+                target.pop(int(last))
+        elif isinstance(target, dict):
+            if kind == "remove" or kind == "replace":
+                if last not in target:
+                    raise PatchError(f"No field at '{path}'.")
+            if kind == "remove":
+                del target[last]
+            else:
+                target[last] = value
+        else:
+            raise PatchError(f"'{path}' does not point into an object or list.")
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise PatchError(f"No field at '{path}'.")
+
+
+async def create_document(
+    mongo_db: MongoDatabase, firebase_uid: str, name: str, project_id: Optional[str], content: Dict[str, List[Any]]
+) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    snapshot = {name: list(content.get(name) or []) for name in COLLECTIONS}
+    result = await mongo_db[SCHEMATICS_COLLECTION].insert_one({
+        "userId": firebase_uid,
+        "projectId": project_id,
+        "name": name,
+        "revision": 0,
+        "snapshot": snapshot,
+        "snapshotRevision": 0,
+        "createdAt": now,
+        "updatedAt": now,
+    })
+    schematic_id = str(result.inserted_id)
+    _documents.set(schematic_id, SchematicState(0, 0, snapshot))
+    return {"id": schematic_id, "revision": 0}
+
+
+async def _owned_header(mongo_db: MongoDatabase, firebase_uid: str, schematic_id: str) -> Dict[str, Any]:
+    """The document's metadata without its snapshot. 404 if missing or not owned."""
+    header = await mongo_db[SCHEMATICS_COLLECTION].find_one(
+        {"_id": _object_id(schematic_id), "userId": firebase_uid}, projection={"snapshot": False}
+    )
+    if not header:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schematic not found.")
+    return header
+
+
+async def _committed_revision(mongo_db: MongoDatabase, header: Dict[str, Any]) -> int:
+    """
+    The latest revision in the delta log. The delta insert is the commit point and the header's
+    revision is only moved after it, so a header left behind (a failed update, a worker that died
+    in between) is brought forward here instead of blocking every later patch.
+    """
+    latest = await mongo_db[DELTAS_COLLECTION].find_one(
+        {"schematicId": header["_id"]}, projection={"revision": True}, sort=[("revision", -1)]
+    )
+    if latest and latest["revision"] > header["revision"]:
+        await mongo_db[SCHEMATICS_COLLECTION].update_one({"_id": header["_id"]}, {"$max": {"revision": latest["revision"]}})
+        header["revision"] = latest["revision"]
+    return header["revision"]
+
+
+async def _load_state(mongo_db: MongoDatabase, schematic_id: str) -> SchematicState:
+    """Rebuilds a document from its snapshot and the deltas after it."""
+    document = await mongo_db[SCHEMATICS_COLLECTION].find_one({"_id": ObjectId(schematic_id)})
+    state = SchematicState(document["snapshotRevision"], document["snapshotRevision"], document.get("snapshot") or {})
+    cursor = mongo_db[DELTAS_COLLECTION].find(
+        {"schematicId": document["_id"], "revision": {"$gt": document["snapshotRevision"]}}
+    ).sort("revision", 1)
+    async for delta in cursor:
+        for op in delta["ops"]:
+            _apply_op(state, op)
+        state.revision = delta["revision"]
+    return state
+
+
+async def _current_state(mongo_db: MongoDatabase, schematic_id: str, revision: int) -> SchematicState:
+    """The cached document, reloaded if this worker's copy is missing or behind `revision`."""
+    state: Optional[SchematicState] = _documents.get(schematic_id)
+    if state is None or state.revision < revision:
+        state = await _load_state(mongo_db, schematic_id)
+    _documents.set(schematic_id, state) # Refreshes the idle timeout
+    return state
+
+
+async def get_document(mongo_db: MongoDatabase, firebase_uid: str, schematic_id: str) -> Dict[str, Any]:
+    header = await _owned_header(mongo_db, firebase_uid, schematic_id)
+    state = await _current_state(mongo_db, schematic_id, await _committed_revision(mongo_db, header))
+    return {
+        "id": schematic_id,
+        "name": header.get("name"),
+        "projectId": header.get("projectId"),
+        "revision": state.revision,
+        **state.content(),
+    }
+
+
+async def apply_delta(
+    mongo_db: MongoDatabase, firebase_uid: str, schematic_id: str, base_revision: int, ops: List[Dict[str, Any]]
+) -> int:
+    """
+    Applies `ops` on top of `base_revision` and returns the new revision. A base that is not the
+    latest revision is a conflict (409): the client fetches the deltas it missed, rebases its
+    pending edits on them and retries. Work done here scales with the size of the delta; the whole
+    document is only written every SCHEMATIC_SNAPSHOT_INTERVAL revisions.
+    """
+    header = await _owned_header(mongo_db, firebase_uid, schematic_id)
+    current = await _committed_revision(mongo_db, header)
+    if base_revision != current:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "The schematic has changed since this edit's base revision.", "currentRevision": current}
+        )
+
+    state = await _current_state(mongo_db, schematic_id, base_revision)
+    async with state.lock:
+        if state.revision != base_revision:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "The schematic has changed since this edit's base revision.", "currentRevision": state.revision}
+            )
+        try:
+            for op in ops:
+                _apply_op(state, op)
+        except PatchError as e:
+            _documents.pop(schematic_id) # Partly applied; reload from the log next time
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        revision = base_revision + 1
+        now = datetime.utcnow()
+        try:
+            # The unique (schematicId, revision) index makes this insert the commit point, also
+            # across workers: only one delta can ever claim a revision.
+            await mongo_db[DELTAS_COLLECTION].insert_one({
+                "schematicId": ObjectId(schematic_id), "revision": revision, "ops": ops, "createdAt": now,
+            })
+        except DuplicateKeyError:
+            _documents.pop(schematic_id)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "message": "The schematic has changed since this edit's base revision.",
+                    "currentRevision": await _committed_revision(mongo_db, header),
+                }
+            )
+        except BaseException:
+            _documents.pop(schematic_id)
+            raise
+        state.revision = revision
+
+        # $max: the header may already have been moved past this revision by _committed_revision
+        update: Dict[str, Any] = {"$max": {"revision": revision, "updatedAt": now}}
+        query: Dict[str, Any] = {"_id": ObjectId(schematic_id)}
+        compact = revision - state.snapshot_revision >= settings.SCHEMATIC_SNAPSHOT_INTERVAL
+        if compact:
+            update["$set"] = {"snapshot": state.content(), "snapshotRevision": revision}
+            query["snapshotRevision"] = {"$lt": revision}
+        await mongo_db[SCHEMATICS_COLLECTION].update_one(query, update)
+        if compact:
+            # Deltas up to the previous snapshot are dropped; the ones since stay so clients a little
+            # behind can still catch up without reloading the whole document.
+            await mongo_db[DELTAS_COLLECTION].delete_many(
+                {"schematicId": ObjectId(schematic_id), "revision": {"$lte": state.snapshot_revision}}
+            )
+            state.snapshot_revision = revision
+    return revision
+
+
+async def deltas_since(mongo_db: MongoDatabase, firebase_uid: str, schematic_id: str, since: int) -> List[Dict[str, Any]]:
+    """The deltas after revision `since`, oldest first. 410 if they were compacted away: reload the document."""
+    header = await _owned_header(mongo_db, firebase_uid, schematic_id)
+    current = await _committed_revision(mongo_db, header)
+    cursor = mongo_db[DELTAS_COLLECTION].find(
+        {"schematicId": header["_id"], "revision": {"$gt": since}}, projection={"_id": False, "revision": True, "ops": True}
+    ).sort("revision", 1)
+    deltas = await cursor.to_list(length=None)
+    if since < current and len(deltas) != current - since:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Those revisions were compacted; reload the schematic.")
+    return deltas
+
+
+async def delete_document(mongo_db: MongoDatabase, firebase_uid: str, schematic_id: str) -> None:
+    result = await mongo_db[SCHEMATICS_COLLECTION].delete_one({"_id": _object_id(schematic_id), "userId": firebase_uid})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schematic not found.")
+    await mongo_db[DELTAS_COLLECTION].delete_many({"schematicId": ObjectId(schematic_id)})
+    _documents.pop(schematic_id)
@@ -0,0 +1,386 @@
+# eda-backend/app/services/schematic_drc.py
+# Schematic design rule check over a uniform-grid spatial index. A full check visits every element;
+# an incremental check re-checks only the neighbourhood of the elements an edit changed.
+
+import math
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from app.core.config import settings
+
+Box = Tuple[float, float, float, float] # (x0, y0, x1, y1)
+PinKey = Tuple[str, int]
+
+OVERLAP = "COMPONENT_OVERLAP"
+DANGLING_WIRE = "DANGLING_WIRE"
+UNCONNECTED_PIN = "UNCONNECTED_PIN"
+SHORTED_NET = "SHORTED_NET"
+WIRE_OVER_PIN = "WIRE_OVER_PIN"
+
+
+class SchematicDataError(ValueError):
+    """A coordinate or size the check cannot work with. The message is safe to show to the user."""
+
+
+class UniformGrid:
+    """
+    Buckets items by grid cell. Boxes (components, pins) cover every cell of their box; segments
+    (wires) only the cells along them, so a long diagonal wire costs its length in cells, not its area.
+    """
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List[Any]] = defaultdict(list)
+
+    def _cells(self, box: Box) -> Iterable[Tuple[int, int]]:
+        size = self.cell_size
+        for cx in range(math.floor(box[0] / size), math.floor(box[2] / size) + 1):
+            for cy in range(math.floor(box[1] / size), math.floor(box[3] / size) + 1):
+                yield cx, cy
+
+    def _segment_cells(self, x0: float, y0: float, x1: float, y1: float, margin: float) -> Iterable[Tuple[int, int]]:
+        """The cells within `margin` of the segment: column by column, the rows its slice of the segment spans."""
+        size = self.cell_size
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        slope = (y1 - y0) / (x1 - x0) if x1 > x0 else 0.0
+        for cx in range(math.floor((x0 - margin) / size), math.floor((x1 + margin) / size) + 1):
+            lo = min(max(cx * size - margin, x0), x1)
+            hi = min(max((cx + 1) * size + margin, x0), x1)
+            ya, yb = (y0 + (lo - x0) * slope, y0 + (hi - x0) * slope) if x1 > x0 else (y0, y1)
+            for cy in range(math.floor((min(ya, yb) - margin) / size), math.floor((max(ya, yb) + margin) / size) + 1):
+                yield cx, cy
+
+    def insert(self, item: Any, box: Box) -> None:
+        for cell in self._cells(box):
+            self.cells[cell].append(item)
+
+    def insert_segment(self, item: Any, x0: float, y0: float, x1: float, y1: float) -> None:
+        for cell in self._segment_cells(x0, y0, x1, y1, 0.0):
+            self.cells[cell].append(item)
+
+    def query(self, box: Box) -> Set[Any]:
+        return self._collect(self._cells(box))
+
+    def query_segment(self, x0: float, y0: float, x1: float, y1: float, margin: float) -> Set[Any]:
+        return self._collect(self._segment_cells(x0, y0, x1, y1, margin))
+
+    def _collect(self, cells: Iterable[Tuple[int, int]]) -> Set[Any]:
+        found: Set[Any] = set()
+        for cell in cells:
+            found.update(self.cells.get(cell, ()))
+        return found
+
+
+def _num(value: Any) -> float:
+    """A coordinate; missing or non-numeric values count as 0, non-finite or off-canvas ones are rejected."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if not math.isfinite(number) or abs(number) > settings.SCHEMATIC_DRC_MAX_COORDINATE:
+        raise SchematicDataError(
+            f"Coordinate {value!r} must be a finite number within +/-{settings.SCHEMATIC_DRC_MAX_COORDINATE:g}."
+        )
+    return number
+
+
+def _grow(box: Box, margin: float) -> Box:
+    return (box[0] - margin, box[1] - margin, box[2] + margin, box[3] + margin)
+
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _point_segment_distance(px: float, py: float, x0: float, y0: float, x1: float, y1: float) -> float:
+    dx, dy = x1 - x0, y1 - y0
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((px - x0) * dx + (py - y0) * dy) / length_sq))
+    return math.hypot(px - (x0 + t * dx), py - (y0 + t * dy))
+
+
+def component_box(comp: Dict[str, Any]) -> Box:
+    x, y = _num(comp.get("x")), _num(comp.get("y"))
+    width, height = _num(comp.get("width", 60)), _num(comp.get("height", 50))
+    if not (0 <= width <= settings.SCHEMATIC_DRC_MAX_COMPONENT_SIZE and 0 <= height <= settings.SCHEMATIC_DRC_MAX_COMPONENT_SIZE):
+        raise SchematicDataError(
+            f"Component {comp.get('id')!r} is {width:g}x{height:g}; sizes must be between 0 and {settings.SCHEMATIC_DRC_MAX_COMPONENT_SIZE:g}."
+        )
+    return (x, y, x + width, y + height)
+
+
+def wire_ends(wire: Dict[str, Any]) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    return (_num(wire.get("startX")), _num(wire.get("startY"))), (_num(wire.get("endX")), _num(wire.get("endY")))
+
+
+def _is_wire(element: Dict[str, Any]) -> bool:
+    # Wires are told apart from components by their start/end fields
+    return "startX" in element or "startComp" in element
+
+
+def query_near(grid: UniformGrid, element: Dict[str, Any], margin: float) -> Set[Any]:
+    """Items within `margin` of a component's box, or of a wire along its length."""
+    if _is_wire(element):
+        (x0, y0), (x1, y1) = wire_ends(element)
+        return grid.query_segment(x0, y0, x1, y1, margin)
+    return grid.query(_grow(component_box(element), margin))
+
+
+def _violation(
+    rule: str, severity: str, message: str, elements: List[str], location: Tuple[float, float], pin: Optional[int] = None
+) -> Dict[str, Any]:
+    suffix = f":{pin}" if pin is not None else ""
+    return {
+        "id": f"{rule}:{'|'.join(sorted(elements))}{suffix}",
+        "rule": rule,
+        "type": severity,
+        "message": message,
+        "elements": elements,
+        "pin": pin,
+        "location": {"x": location[0], "y": location[1]},
+    }
+
+
+class SchematicIndex:
+    """Grids over component boxes, pin positions and wire segments, plus the wire-to-pin connectivity."""
+    def __init__(self, components: List[Dict[str, Any]], wires: List[Dict[str, Any]]):
+        self.tolerance = settings.SCHEMATIC_DRC_TOLERANCE
+        cell = settings.SCHEMATIC_DRC_GRID_CELL_SIZE
+        self.components = {str(c.get("id")): c for c in components}
+        self.wires = {str(w.get("id")): w for w in wires}
+        self.component_grid = UniformGrid(cell)
+        self.pin_grid = UniformGrid(cell)
+        self.wire_grid = UniformGrid(cell)
+        self.pin_positions: Dict[PinKey, Tuple[float, float]] = {}
+        self.pin_types: Dict[PinKey, str] = {}
+
+        for comp_id, comp in self.components.items():
+            self.component_grid.insert(comp_id, component_box(comp))
+            x, y = _num(comp.get("x")), _num(comp.get("y"))
+            for p, pin in enumerate(comp.get("pins") or ()):
+                position = (x + _num(pin.get("x")), y + _num(pin.get("y")))
+                self.pin_positions[(comp_id, p)] = position
+                self.pin_types[(comp_id, p)] = pin.get("type", "")
+                self.pin_grid.insert((comp_id, p), position * 2)
+
+        # Each wire end resolves to a pin (by reference, or by landing on one) or to a free point.
+        self.wire_nodes: Dict[str, Tuple[Any, Any]] = {}
+        self.node_wires: Dict[Any, List[str]] = defaultdict(list)
+        for wire_id, wire in self.wires.items():
+            start, end = wire_ends(wire)
+            self.wire_grid.insert_segment(wire_id, *start, *end)
+            nodes = (
+                self._resolve_end(wire.get("startComp"), wire.get("startPin"), start),
+                self._resolve_end(wire.get("endComp"), wire.get("endPin"), end),
+            )
+            self.wire_nodes[wire_id] = nodes
+            for node in set(nodes):
+                self.node_wires[node].append(wire_id)
+
+    def pins_near(self, position: Tuple[float, float]) -> List[PinKey]:
+        box = _grow(position * 2, self.tolerance)
+        return [
+            key for key in self.pin_grid.query(box)
+            if math.hypot(self.pin_positions[key][0] - position[0], self.pin_positions[key][1] - position[1]) <= self.tolerance
+        ]
+
+    def _resolve_end(self, comp_id: Any, pin: Any, position: Tuple[float, float]) -> Any:
+        key = (str(comp_id), pin)
+        if comp_id is not None and key in self.pin_positions:
+            return key
+        near = self.pins_near(position)
+        if near:
+            return min(near)
+        # Free end: snapped so ends within tolerance of each other meet at the same junction.
+        step = self.tolerance or 1.0
+        return ("point", round(position[0] / step), round(position[1] / step))
+
+    def net_of(self, start: Any) -> Set[Any]:
+        """All pins and junction points connected to `start` through wires."""
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for wire_id in self.node_wires.get(node, ()):
+                for other in self.wire_nodes[wire_id]:
+                    if other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+        return seen
+
+
+def _component_label(comp: Dict[str, Any]) -> str:
+    return f"{comp.get('type', 'component')} ({comp.get('id')})"
+
+
+def _check_overlaps(index: SchematicIndex, comp_ids: Set[str]) -> List[Dict[str, Any]]:
+    violations = []
+    for comp_id in comp_ids:
+        box = component_box(index.components[comp_id])
+        for other_id in index.component_grid.query(box):
+            if other_id == comp_id or (other_id in comp_ids and other_id < comp_id): # Each pair once
+                continue
+            other_box = component_box(index.components[other_id])
+            if _intersects(box, other_box):
+                violations.append(_violation(
+                    OVERLAP, "warning",
+                    f"{_component_label(index.components[comp_id])} overlaps {_component_label(index.components[other_id])}.",
+                    [comp_id, other_id], (max(box[0], other_box[0]), max(box[1], other_box[1]))
+                ))
+    return violations
+
+
+def _check_wires(index: SchematicIndex, wire_ids: Set[str]) -> List[Dict[str, Any]]:
+    violations = []
+    for wire_id in wire_ids:
+        wire = index.wires[wire_id]
+        ends = wire_ends(wire)
+        nodes = index.wire_nodes[wire_id]
+        if nodes[0] == nodes[1] and nodes[0][0] != "point":
+            violations.append(_violation(
+                SHORTED_NET, "error", f"Wire {wire_id} starts and ends on the same pin.", [wire_id], ends[0]
+            ))
+        for node, position in zip(nodes, ends):
+            # A free end is fine at a junction with another wire; alone it is dangling.
+            if node[0] == "point" and len(index.node_wires[node]) < 2:
+                violations.append(_violation(
+                    DANGLING_WIRE, "warning", f"Wire {wire_id} has an end connected to nothing.", [wire_id], position
+                ))
+                break
+
+        (x0, y0), (x1, y1) = ends
+        for key in index.pin_grid.query_segment(x0, y0, x1, y1, index.tolerance):
+            if key in nodes:
+                continue
+            px, py = index.pin_positions[key]
+            if _point_segment_distance(px, py, x0, y0, x1, y1) <= index.tolerance:
+                violations.append(_violation(
+                    WIRE_OVER_PIN, "warning",
+                    f"Wire {wire_id} passes over pin {key[1]} of {_component_label(index.components[key[0]])} without connecting to it.",
+                    [wire_id, key[0]], (px, py), pin=key[1]
+                ))
+    return violations
+
+
+def _check_pins(index: SchematicIndex, comp_ids: Set[str]) -> List[Dict[str, Any]]:
+    violations = []
+    for comp_id in comp_ids:
+        comp = index.components[comp_id]
+        for p, pin in enumerate(comp.get("pins") or ()):
+            if index.node_wires.get((comp_id, p)):
+                continue
+            is_input = pin.get("type") != "output"
+            name = pin.get("label") or f"pin {p}"
+            violations.append(_violation(
+                UNCONNECTED_PIN, "error" if is_input else "warning",
+                f"{'Floating input' if is_input else 'Unconnected output'} {name} on {_component_label(comp)}.",
+                [comp_id], index.pin_positions[(comp_id, p)], pin=p
+            ))
+    return violations
+
+
+def _check_shorts(index: SchematicIndex, comp_ids: Set[str]) -> List[Dict[str, Any]]:
+    """Nets (reached from the given components' pins) driven by more than one output."""
+    violations = []
+    visited: Set[Any] = set()
+    for comp_id in comp_ids:
+        for p in range(len(index.components[comp_id].get("pins") or ())):
+            if (comp_id, p) in visited or not index.node_wires.get((comp_id, p)):
+                continue
+            net = index.net_of((comp_id, p))
+            visited |= net
+            drivers = sorted(node for node in net if node[0] != "point" and index.pin_types.get(node) == "output")
+            if len(drivers) > 1:
+                names = ", ".join(f"{_component_label(index.components[c])} pin {pin}" for c, pin in drivers)
+                violations.append(_violation(
+                    SHORTED_NET, "error", f"Net driven by more than one output: {names}.",
+                    sorted({c for c, _ in drivers}), index.pin_positions[drivers[0]]
+                ))
+    return violations
+
+
+def _affected(
+    index: SchematicIndex, changed_ids: Iterable[str], before: Iterable[Dict[str, Any]]
+) -> Tuple[Set[str], Set[str]]:
+    """
+    Components and wires whose violations may have changed: the changed elements, anything within
+    tolerance of where they are or used to be, elements they are wired to, and everything on the
+    nets they touch (for shorts).
+    """
+    margin = index.tolerance
+    regions: List[Dict[str, Any]] = list(before)
+    comps: Set[str] = set()
+    wires: Set[str] = set()
+    for element_id in map(str, changed_ids):
+        if element_id in index.components:
+            comps.add(element_id)
+            regions.append(index.components[element_id])
+        elif element_id in index.wires:
+            wires.add(element_id)
+            regions.append(index.wires[element_id])
+    for element in before:
+        for key in ("startComp", "endComp"):
+            if element.get(key) is not None:
+                comps.add(str(element[key]))
+
+    for region in regions:
+        comps |= query_near(index.component_grid, region, margin)
+        wires |= query_near(index.wire_grid, region, margin)
+        comps |= {comp_id for comp_id, _ in query_near(index.pin_grid, region, margin)}
+
+    # Wires attached to affected components, the components at the ends of affected wires,
+    # and (for shorted-net checks) every pin on a net touching either.
+    seeds: Set[Any] = {node for wire_id in wires for node in index.wire_nodes[wire_id]}
+    seeds |= {(comp_id, p) for comp_id in comps if comp_id in index.components
+              for p in range(len(index.components[comp_id].get("pins") or ()))}
+    reached: Set[Any] = set()
+    for seed in seeds:
+        if seed not in reached:
+            reached |= index.net_of(seed)
+    for node in reached:
+        wires.update(index.node_wires.get(node, ()))
+        if node[0] != "point":
+            comps.add(node[0])
+    # Wires running over the affected components' pins.
+    for comp_id in comps & index.components.keys():
+        wires |= index.wire_grid.query(_grow(component_box(index.components[comp_id]), margin))
+    return {c for c in comps if c in index.components}, {w for w in wires if w in index.wires}
+
+
+def run_drc(
+    components: List[Dict[str, Any]],
+    wires: List[Dict[str, Any]],
+    previous: Optional[List[Dict[str, Any]]] = None,
+    changed_ids: Optional[List[str]] = None,
+    before: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Checks component overlaps, dangling wires, unconnected pins, nets shorted by several drivers and
+    wires crossing pins they do not connect to.
+
+    With `previous` (the violations of the last result) and `changed_ids` (elements added, modified or
+    removed since; `before` holds the previous versions of modified and removed elements), only the
+    affected neighbourhood is re-checked: previous violations elsewhere are kept as they are.
+    """
+    index = SchematicIndex(components, wires)
+    incremental = previous is not None and changed_ids is not None
+    if incremental:
+        comp_ids, wire_ids = _affected(index, changed_ids, before or [])
+        touched = comp_ids | wire_ids | set(map(str, changed_ids))
+        kept = [v for v in previous if not touched.intersection(map(str, v.get("elements") or ()))]
+    else:
+        comp_ids, wire_ids = set(index.components), set(index.wires)
+        kept = []
+
+    fresh = (
+        _check_overlaps(index, comp_ids) + _check_wires(index, wire_ids)
+        + _check_pins(index, comp_ids) + _check_shorts(index, comp_ids)
+    )
+    violations = {v["id"]: v for v in kept}
+    violations.update((v["id"], v) for v in fresh)
+    ordered = sorted(violations.values(), key=lambda v: (v["type"] != "error", v["rule"], v["id"]))
+    return {
+        "violations": ordered,
+        "incremental": incremental,
+        "checkedComponents": len(comp_ids),
+        "checkedWires": len(wire_ids),
+    }
@@ -0,0 +1,87 @@
+# eda-backend/app/services/tool_jobs.py
+# Service for tool job records: one 'jobs/{jobId}' document per run holds the current state,
+# while 'toolLogs' receives an append-only entry for every state change.
+
+from typing import Any, Dict, Optional
+from fastapi import HTTPException, status
+from firebase_admin import firestore
+from app.schemas.project import ToolLogEntry
+
+JOBS_COLLECTION = "jobs"
+
+
+def _log_entry(job_id: str, user_id: str, tool_name: str, project_id: str, job_status: str, details: Dict[str, Any], cost: Optional[float] = None) -> dict:
+    return ToolLogEntry(
+        userId=user_id,
+        toolName=tool_name,
+        projectId=project_id,
+        details={"status": job_status, "jobId": job_id, **details},
+        cost=cost
+    ).model_dump(exclude={"id"})
+
+
+async def create_job(
+    firestore_db: firestore.Client,
+    job_id: str,
+    user_id: str,
+    tool_name: str,
+    project_id: str,
+    parameters: Dict[str, Any]
+) -> None:
+    """Writes the job record and its 'initiated' log entry in one batch."""
+    batch = firestore_db.batch()
+    batch.set(firestore_db.collection(JOBS_COLLECTION).document(job_id), {
+        "userId": user_id,
+        "toolName": tool_name,
+        "projectId": project_id,
+        "status": "initiated",
+        "parameters": parameters,
+        "createdAt": firestore.SERVER_TIMESTAMP,
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    })
+    batch.set(
+        firestore_db.collection("toolLogs").document(),
+        _log_entry(job_id, user_id, tool_name, project_id, "initiated", parameters)
+    )
+    await batch.commit()
+
+
+async def finish_job(
+    firestore_db: firestore.Client,
+    job_id: str,
+    user_id: str,
+    tool_name: str,
+    project_id: str,
+    job_status: str,
+    details: Dict[str, Any],
+    cost: Optional[float] = None
+) -> None:
+    """
+    Moves the job to its final status ('completed' or 'failed') with `details` merged into the record,
+    and appends the matching log entry. Existing log entries are never modified.
+    """
+    batch = firestore_db.batch()
+    batch.update(firestore_db.collection(JOBS_COLLECTION).document(job_id), {
+        **details,
+        "status": job_status,
+        "cost": cost,
+        "completedAt": firestore.SERVER_TIMESTAMP,
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    })
+    batch.set(
+        firestore_db.collection("toolLogs").document(),
+        _log_entry(job_id, user_id, tool_name, project_id, job_status, details, cost)
+    )
+    await batch.commit()
+
+
+async def get_owned_job(firestore_db: firestore.Client, job_id: str, user_id: str, tool_name: str) -> dict:
+    """
+    Fetches a job by ID with a single document read. Jobs of other users or other tools are
+    reported as not found, so job IDs cannot be probed.
+    """
+    job_doc = await firestore_db.collection(JOBS_COLLECTION).document(job_id).get()
+    job_data = job_doc.to_dict() if job_doc.exists else None
+    if not job_data or job_data.get("userId") != user_id or job_data.get("toolName") != tool_name:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or not authorized.")
+    return job_data
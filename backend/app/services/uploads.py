@@ -0,0 +1,162 @@
+# eda-backend/app/services/uploads.py
+# Service for streaming project file uploads into Firebase Storage in fixed-size chunks.
+
+import asyncio
+import hashlib
+import re
+from typing import Any, AsyncIterator, BinaryIO, List, Optional, Tuple
+import httpx
+
+# Cloud Storage answers an accepted, not yet complete resumable chunk with "308 Resume Incomplete".
+RESUME_INCOMPLETE = 308
+RANGE_HEADER_RE = re.compile(r"bytes=0-(\d+)")
+
+
+class UploadError(Exception):
+    """Raised when Cloud Storage rejects or loses part of a resumable upload."""
+
+
+class ChunkedDigest:
+    """
+    Incremental sha256 over fixed-size chunks.
+    The state is the list of per-chunk hex digests, so it can be persisted with the
+    upload session and resumed by any worker. The final checksum is the sha256 of
+    the concatenated chunk digests.
+    """
+    def __init__(self, chunk_digests: Optional[List[str]] = None):
+        self.chunk_digests: List[str] = list(chunk_digests or [])
+
+    def update(self, chunk: bytes) -> None:
+        self.chunk_digests.append(hashlib.sha256(chunk).hexdigest())
+
+    def hexdigest(self) -> str:
+        return hashlib.sha256("".join(self.chunk_digests).encode("ascii")).hexdigest()
+
+
+async def rechunk(stream: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Regroups an arbitrary byte stream (e.g. a request body) into chunks of exactly
+    `chunk_size` bytes. Only the final chunk may be shorter.
+    """
+    buffer = bytearray()
+    async for piece in stream:
+        buffer.extend(piece)
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def create_resumable_session(blob: Any, content_type: str, size: int) -> str:
+    """
+    Opens a resumable upload session for `blob` and returns its session URL.
+    The session URL itself authorizes the upload, so chunks can be sent without credentials.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        None, lambda: blob.create_resumable_upload_session(content_type=content_type, size=size)
+    )
+
+
+def _committed_bytes(response: httpx.Response, total_size: int) -> int:
+    """Number of bytes Cloud Storage has persisted, according to a session response."""
+    if response.status_code in (200, 201):
+        return total_size
+    if response.status_code == RESUME_INCOMPLETE:
+        match = RANGE_HEADER_RE.match(response.headers.get("Range", ""))
+        return int(match.group(1)) + 1 if match else 0
+    raise UploadError(f"Storage rejected the upload (HTTP {response.status_code}): {response.text[:200]}")
+
+
+async def query_committed_bytes(client: httpx.AsyncClient, session_url: str, total_size: int) -> int:
+    """Asks Cloud Storage how much of a resumable upload it has already persisted."""
+    response = await client.put(session_url, headers={"Content-Range": f"bytes */{total_size}"})
+    return _committed_bytes(response, total_size)
+
+
+async def put_chunk(
+    client: httpx.AsyncClient,
+    session_url: str,
+    chunk: bytes,
+    offset: int,
+    total_size: int,
+    max_attempts: int = 3
+) -> int:
+    """
+    Sends one chunk of a resumable upload starting at `offset` and returns the new
+    committed offset. Storage may persist only part of a chunk; the remainder is resent.
+    """
+    end_offset = offset + len(chunk)
+    committed = offset
+    for _ in range(max_attempts):
+        remaining = chunk[committed - offset:]
+        headers = {"Content-Range": f"bytes {committed}-{end_offset - 1}/{total_size}"}
+        try:
+            response = await client.put(session_url, content=remaining, headers=headers)
+            committed = _committed_bytes(response, total_size)
+        except httpx.TransportError as e:
+            print(f"Chunk upload interrupted at offset {committed}: {e}. Re-querying session.")
+            committed = await query_committed_bytes(client, session_url, total_size)
+        if committed >= end_offset:
+            return committed
+        if committed < offset:
+            raise UploadError(f"Storage lost committed bytes (expected >= {offset}, got {committed}).")
+    raise UploadError(f"Chunk at offset {offset} was not fully committed after {max_attempts} attempts.")
+
+
+async def stream_to_session(
+    session_url: str,
+    body: AsyncIterator[bytes],
+    offset: int,
+    total_size: int,
+    chunk_size: int,
+    digest: ChunkedDigest,
+    on_chunk_committed: Any = None
+) -> int:
+    """
+    Pipes `body` into a resumable session starting at `offset`, one fixed-size chunk at a time,
+    hashing each chunk as it goes. Memory use is bounded by `chunk_size` regardless of file size.
+    `on_chunk_committed(committed_bytes, digest)` is awaited after every committed chunk so callers
+    can persist progress. Returns the committed offset when the body ends.
+    """
+    async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)) as client:
+        async for chunk in rechunk(body, chunk_size):
+            if offset + len(chunk) > total_size:
+                raise UploadError("Upload body exceeds the declared file size.")
+            if len(chunk) < chunk_size and offset + len(chunk) != total_size:
+                # A short chunk is only valid as the last one; keep it out of the session
+                # so the client can resend it on resume.
+                break
+            offset = await put_chunk(client, session_url, chunk, offset, total_size)
+            digest.update(chunk)
+            if on_chunk_committed:
+                await on_chunk_committed(offset, digest)
+    return offset
+
+
+def upload_fileobj_chunked(
+    blob: Any,
+    fileobj: BinaryIO,
+    content_type: str,
+    chunk_size: int,
+    max_size: Optional[int] = None
+) -> Tuple[int, str]:
+    """
+    Synchronous helper that streams a file object into `blob` through a chunked writer,
+    hashing as it goes. Run it in an executor. Returns (size, checksum).
+    Raises UploadError as soon as more than `max_size` bytes have been read.
+    """
+    digest = ChunkedDigest()
+    size = 0
+    with blob.open("wb", content_type=content_type, chunk_size=chunk_size) as writer:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            if max_size is not None and size + len(chunk) > max_size:
+                raise UploadError(f"File is larger than the {max_size} bytes allowed.")
+            digest.update(chunk)
+            writer.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
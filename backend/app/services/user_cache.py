@@ -0,0 +1,89 @@
+# eda-backend/app/services/user_cache.py
+# Short-lived in-process cache of MongoDB user profiles used by get_current_user.
+
+import asyncio
+from typing import Dict, Optional
+from pymongo.database import Database as MongoDatabase
+from app.core.config import settings
+from app.utils.cache import TTLCache, _MISSING
+from app.utils.metrics import metrics
+
+STALENESS_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+cache_hits = metrics.counter("user_cache_hits_total", "User profile lookups served from the cache.")
+cache_misses = metrics.counter("user_cache_misses_total", "User profile lookups that queried MongoDB.")
+cache_coalesced = metrics.counter(
+    "user_cache_coalesced_total", "User profile misses that waited on another request's query instead of their own."
+)
+cache_invalidations = metrics.counter("user_cache_invalidations_total", "User profile cache entries invalidated by writes.")
+cache_staleness = metrics.histogram(
+    "user_cache_staleness_seconds", "Age of cached user profiles when served.", STALENESS_BUCKETS
+)
+
+
+class UserProfileCache:
+    """
+    LRU cache of user documents keyed by Firebase UID with a short TTL.
+    Concurrent misses for the same UID share one MongoDB query (single flight). Writers call
+    `invalidate` after changing a profile; a query already in flight when that happens does not
+    repopulate the cache with the pre-write document.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._generation = 0 # Bumped by every invalidation
+
+    async def get(self, mongo_db: MongoDatabase, firebase_uid: str) -> Optional[dict]:
+        user_data, age = self._cache.get_with_age(firebase_uid)
+        if user_data is not _MISSING:
+            cache_hits.inc()
+            cache_staleness.observe(age)
+            return user_data
+
+        task = self._in_flight.get(firebase_uid)
+        if task is None:
+            cache_misses.inc()
+            task = asyncio.ensure_future(self._load(mongo_db, firebase_uid))
+            self._in_flight[firebase_uid] = task
+        else:
+            cache_coalesced.inc()
+        # Shielded so a cancelled request does not cancel the query other requests are waiting on.
+        return await asyncio.shield(task)
+
+    async def _load(self, mongo_db: MongoDatabase, firebase_uid: str) -> Optional[dict]:
+        generation = self._generation
+        try:
+            user_data = await mongo_db.users.find_one({"firebaseUid": firebase_uid})
+        finally:
+            if self._in_flight.get(firebase_uid) is asyncio.current_task():
+                del self._in_flight[firebase_uid]
+        # Unknown users are not cached, so a profile created right after is seen immediately.
+        if user_data is not None and self._generation == generation:
+            self._cache.set(firebase_uid, user_data)
+        return user_data
+
+    def invalidate(self, firebase_uid: str) -> None:
+        """Drops a cached profile. Call after every write to the user's MongoDB document."""
+        self._cache.pop(firebase_uid)
+        self._in_flight.pop(firebase_uid, None) # Later requests must not join a query that predates the write
+        self._generation += 1
+        cache_invalidations.inc()
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._generation += 1
+
+    def hit_ratio(self) -> float:
+        total = cache_hits.value() + cache_misses.value() + cache_coalesced.value()
+        return (cache_hits.value() + cache_coalesced.value()) / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+user_profile_cache = UserProfileCache(
+    max_entries=settings.USER_CACHE_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS
+)
+metrics.gauge("user_cache_hit_ratio", "Share of user profile lookups that avoided a MongoDB query.", user_profile_cache.hit_ratio)
+metrics.gauge("user_cache_entries", "User profiles currently cached.", lambda: len(user_profile_cache))
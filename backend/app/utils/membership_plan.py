@@ -1,7 +1,7 @@
 # eda-backend/app/utils/membership_plans.py
 # Logic for membership plans.
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 MEMBERSHIP_PLANS: Dict[str, Dict[str, Any]] = {
   "free": {
@@ -23,6 +23,11 @@ MEMBERSHIP_PLANS: Dict[str, Dict[str, Any]] = {
       "chipSynthesisTool": 0,
       "platformSimulationTool": 0,
     },
+    "storageQuotaBytes": 100 * 1024 * 1024, # 100MB
+    "rateLimits": { # Token buckets: burst size and sustained requests per minute, per route
+      "chat": {"capacity": 5, "refillPerMinute": 10},
+      "tools": {"capacity": 3, "refillPerMinute": 5},
+    },
   },
   "basic": {
     "name": "Basic Plan",
@@ -44,6 +49,11 @@ MEMBERSHIP_PLANS: Dict[str, Dict[str, Any]] = {
       "chipSynthesisTool": 0,
       "platformSimulationTool": 0,
     },
+    "storageQuotaBytes": 1024 * 1024 * 1024, # 1GB
+    "rateLimits": {
+      "chat": {"capacity": 10, "refillPerMinute": 30},
+      "tools": {"capacity": 5, "refillPerMinute": 20},
+    },
   },
   "premium": {
     "name": "Premium Plan",
@@ -66,6 +76,11 @@ MEMBERSHIP_PLANS: Dict[str, Dict[str, Any]] = {
       "chipSynthesisTool": -1,
       "platformSimulationTool": -1,
     },
+    "storageQuotaBytes": -1, # Unlimited
+    "rateLimits": {
+      "chat": {"capacity": 30, "refillPerMinute": 120},
+      "tools": {"capacity": 15, "refillPerMinute": 60},
+    },
   },
 }
 
@@ -107,3 +122,28 @@ def get_tool_usage_limit(plan_type: str, tool_name: str) -> int:
         return 0
     return plan["usageLimits"].get(tool_name, 0)
 
+
+def get_storage_quota_bytes(plan_type: str) -> int:
+    """
+    Retrieves the project storage quota for a given plan.
+    Args:
+        plan_type (str): The user's membership plan.
+    Returns:
+        int: The quota in bytes (-1 for unlimited). Unknown plans get the free tier quota.
+    """
+    plan = get_membership_plan_details(plan_type) or MEMBERSHIP_PLANS["free"]
+    return plan.get("storageQuotaBytes", MEMBERSHIP_PLANS["free"]["storageQuotaBytes"])
+
+
+def get_rate_limit(plan_type: str, limit_group: str) -> Tuple[int, int]:
+    """
+    Retrieves the token-bucket rate for a group of routes under a given plan.
+    Args:
+        plan_type (str): The user's membership plan.
+        limit_group (str): The route group ('chat', 'tools').
+    Returns:
+        tuple: (burst capacity, requests per minute). Unknown plans or groups get the free tier rate.
+    """
+    plan = get_membership_plan_details(plan_type) or MEMBERSHIP_PLANS["free"]
+    rate = plan.get("rateLimits", {}).get(limit_group) or MEMBERSHIP_PLANS["free"]["rateLimits"][limit_group]
+    return rate["capacity"], rate["refillPerMinute"]
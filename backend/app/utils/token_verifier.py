@@ -0,0 +1,129 @@
+# eda-backend/app/utils/token_verifier.py
+# Local verification of Firebase ID tokens with a verified-token cache.
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import httpx
+from firebase_admin import auth
+from google.auth import jwt as google_jwt
+
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+# Public x509 certificates used to sign Firebase ID tokens.
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+CERTS_REFRESH_MARGIN_SECONDS = 300 # Refresh in the background this long before the certificates expire
+DEFAULT_CERTS_MAX_AGE_SECONDS = 3600
+CLOCK_SKEW_SECONDS = 10
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class TokenExpiredError(ValueError):
+    """Raised when an ID token is well-formed and signed but past its 'exp'."""
+
+
+class InvalidTokenError(ValueError):
+    """Raised when an ID token fails signature, issuer, audience or subject checks."""
+
+
+class TokenVerifier:
+    """
+    Verifies Firebase ID tokens without a network round trip per request.
+    Decoded claims are cached by token hash until the token's 'exp', so repeat requests in a
+    session skip the RSA check. Signing certificates are fetched once and refreshed in the
+    background before they expire. Cache misses are verified in a dedicated thread pool.
+    """
+    def __init__(self, project_id: str, max_workers: int, cache_size: int):
+        self.project_id = project_id
+        self.issuer = f"https://securetoken.google.com/{project_id}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="auth-verify")
+        self._claims_cache = TTLCache(max_entries=cache_size)
+        self._certs: Dict[str, str] = {}
+        self._certs_expires_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def refresh_certs(self) -> None:
+        """Downloads the current signing certificates. Honors the endpoint's Cache-Control max-age."""
+        async with self._refresh_lock:
+            if self._certs and time.time() < self._certs_expires_at - CERTS_REFRESH_MARGIN_SECONDS:
+                return # Refreshed by a concurrent caller
+            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
+                response = await client.get(FIREBASE_CERTS_URL)
+                response.raise_for_status()
+            match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+            max_age = int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE_SECONDS
+            self._certs = response.json()
+            self._certs_expires_at = time.time() + max_age
+            print(f"🔑 Refreshed {len(self._certs)} Firebase signing certificates (valid for {max_age}s).")
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh_certs()
+        except Exception as e:
+            # Keep serving with the current certificates; the next request retries.
+            print(f"🔥 ERROR refreshing Firebase signing certificates: {repr(e)}")
+
+    async def _get_certs(self) -> Dict[str, str]:
+        now = time.time()
+        if not self._certs or now >= self._certs_expires_at:
+            await self.refresh_certs()
+        elif now >= self._certs_expires_at - CERTS_REFRESH_MARGIN_SECONDS:
+            self._schedule_refresh()
+        return self._certs
+
+    def _decode(self, token: str, certs: Dict[str, str]) -> dict:
+        """Signature and claim checks, matching firebase_admin.auth.verify_id_token. Runs in the verify pool."""
+        header = google_jwt.decode_header(token)
+        if header.get("alg") != "RS256" or header.get("kid") not in certs:
+            raise InvalidTokenError("ID token has an unexpected algorithm or unknown key ID.")
+        try:
+            claims = google_jwt.decode(
+                token, certs=certs, audience=self.project_id, clock_skew_in_seconds=CLOCK_SKEW_SECONDS
+            )
+        except ValueError as e:
+            if "expired" in str(e).lower():
+                raise TokenExpiredError(str(e))
+            raise InvalidTokenError(str(e))
+        if claims.get("iss") != self.issuer:
+            raise InvalidTokenError("ID token has an incorrect issuer.")
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise InvalidTokenError("ID token has an invalid subject.")
+        claims["uid"] = subject
+        return claims
+
+    async def verify(self, token: str) -> dict:
+        """Returns the decoded claims of a valid ID token, from cache when possible."""
+        cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        claims = self._claims_cache.get(cache_key)
+        if claims is not None:
+            return claims
+
+        loop = asyncio.get_event_loop()
+        if os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+            # Emulator tokens are unsigned; let the SDK handle them.
+            claims = await loop.run_in_executor(self._executor, lambda: auth.verify_id_token(token))
+        else:
+            certs = await self._get_certs()
+            claims = await loop.run_in_executor(self._executor, lambda: self._decode(token, certs))
+
+        self._claims_cache.set(cache_key, claims, ttl_seconds=claims.get("exp", 0) - time.time())
+        return claims
+
+
+token_verifier = TokenVerifier(
+    project_id=settings.FIREBASE_PROJECT_ID,
+    max_workers=settings.AUTH_VERIFY_WORKERS,
+    cache_size=settings.AUTH_TOKEN_CACHE_SIZE
+)
@@ -0,0 +1,85 @@
+# eda-backend/scripts/bench_netlist.py
+# Benchmark: builds a random gate-level schematic in the editor's JSON shape and times the
+# netlister (union-find net merge, then the streaming Verilog writer).
+#
+# Usage: python -m scripts.bench_netlist [--components 100000] [--primary-inputs 1000] [--seed 1] [--out netlist.v]
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Tuple
+from app.services.netlister import build_netlist, iter_verilog
+
+GATE_PINS = {
+    "AND": [{"x": 0, "y": 15, "type": "input"}, {"x": 0, "y": 35, "type": "input"}, {"x": 60, "y": 25, "type": "output"}],
+    "XOR": [{"x": 0, "y": 15, "type": "input"}, {"x": 0, "y": 35, "type": "input"}, {"x": 60, "y": 25, "type": "output"}],
+    "NOT": [{"x": 0, "y": 25, "type": "input"}, {"x": 60, "y": 25, "type": "output"}],
+    "FLIPFLOP": [
+        {"x": 0, "y": 10, "type": "input", "label": "D"},
+        {"x": 0, "y": 25, "type": "input", "label": "CLK"},
+        {"x": 0, "y": 40, "type": "input", "label": "RST"},
+        {"x": 60, "y": 15, "type": "output", "label": "Q"},
+        {"x": 60, "y": 35, "type": "output", "label": "Q̅"},
+    ],
+}
+
+
+def make_schematic(count: int, primary_inputs: int, seed: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    `count` components on a grid. Every input pin is driven by one output pin of a nearby earlier
+    component, except the inputs of the first `primary_inputs` components, which become ports.
+    """
+    rng = random.Random(seed)
+    types = list(GATE_PINS)
+    components = []
+    drivers: List[Tuple[str, int]] = []
+    wires = []
+    for i in range(count):
+        comp_type = rng.choice(types)
+        comp = {
+            "id": f"comp_{i}", "type": comp_type, "x": (i % 1000) * 80, "y": (i // 1000) * 70,
+            "width": 60, "height": 50, "rotation": 0, "pins": [dict(pin) for pin in GATE_PINS[comp_type]],
+        }
+        components.append(comp)
+        for p, pin in enumerate(comp["pins"]):
+            if pin["type"] == "output":
+                continue
+            if i >= primary_inputs:
+                start_comp, start_pin = drivers[rng.randrange(max(0, len(drivers) - 5000), len(drivers))]
+                wires.append({
+                    "id": f"wire_{len(wires)}", "startComp": start_comp, "startPin": start_pin,
+                    "endComp": comp["id"], "endPin": p,
+                })
+        drivers.extend((comp["id"], p) for p, pin in enumerate(comp["pins"]) if pin["type"] == "output")
+    return components, wires
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the schematic netlister on a large random schematic.")
+    parser.add_argument("--components", type=int, default=100000)
+    parser.add_argument("--primary-inputs", type=int, default=1000, help="Components whose inputs are left unconnected")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="Also write the netlist to this file")
+    args = parser.parse_args()
+
+    components, wires = make_schematic(args.components, args.primary_inputs, args.seed)
+    print(f"Schematic: {len(components)} components, {len(wires)} wires")
+
+    started = time.perf_counter()
+    netlist = build_netlist(components, wires, [])
+    built = time.perf_counter()
+    size = 0
+    if args.out:
+        with open(args.out, "w") as f:
+            for chunk in iter_verilog(netlist):
+                f.write(chunk)
+                size += len(chunk)
+    else:
+        for chunk in iter_verilog(netlist):
+            size += len(chunk)
+    written = time.perf_counter()
+
+    print(f"Nets: {netlist.stats}")
+    print(f"build_netlist: {(built - started) * 1000:.0f} ms")
+    print(f"iter_verilog:  {(written - built) * 1000:.0f} ms ({size / 1e6:.1f} MB)")
+    print(f"total:         {(written - started) * 1000:.0f} ms")
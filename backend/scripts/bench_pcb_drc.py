@@ -0,0 +1,79 @@
+# eda-backend/scripts/bench_pcb_drc.py
+# Benchmark: builds a random routed board (parallel track channels per layer, alternating
+# direction, with some tracks nudged into their neighbours) and times the geometric PCB DRC.
+#
+# Usage: python -m scripts.bench_pcb_drc [--segments 100000] [--layers 4] [--violations 50] [--seed 1] [--out board.json]
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict
+from app.services import pcb_drc
+from app.services.pcb_services import run_drc
+
+PITCH = 0.5 # mm between channel centres; 0.2 mm tracks leave a 0.3 mm gap
+WIDTH = 0.2
+
+
+def make_board(segments: int, layers: int, violations: int, seed: int) -> Dict[str, Any]:
+    """
+    `segments` tracks split evenly over `layers` copper layers. Each channel is one net routed as
+    a chain of 1-5 mm segments ending on a pad on both ends; `violations` segments are pushed
+    towards the next channel so they break clearance.
+    """
+    rng = random.Random(seed)
+    names = ["F.Cu"] + [f"In{i}.Cu" for i in range(1, layers - 1)] + ["B.Cu"][:max(0, layers - 1)]
+    per_layer = segments // len(names)
+    channels = max(1, int(per_layer ** 0.5))
+    tracks, pads = [], []
+    for l, layer in enumerate(names):
+        horizontal = l % 2 == 0
+        for channel in range(channels):
+            net = f"{layer}_n{channel}"
+            offset = channel * PITCH
+            position = 0.0
+            for _ in range(per_layer // channels):
+                length = rng.uniform(1, 5)
+                a, b = (position, offset), (position + length, offset)
+                if not horizontal:
+                    a, b = (offset, a[0]), (offset, b[0])
+                tracks.append({"layer": layer, "start": list(a), "end": list(b), "width": WIDTH, "net": net})
+                position += length
+            end = (position, offset) if horizontal else (offset, position)
+            start = (0.0, offset) if horizontal else (offset, 0.0)
+            for at in (start, end):
+                pads.append({"ref": f"J{len(pads)}", "layers": [layer], "at": list(at), "size": [0.3, 0.3], "shape": "circle", "net": net})
+    for track in rng.sample(tracks, min(violations, len(tracks))):
+        axis = 1 if track["start"][1] == track["end"][1] else 0
+        track["start"][axis] += PITCH * 0.5
+        track["end"][axis] += PITCH * 0.5
+    return {"layers": names, "tracks": tracks, "pads": pads}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the geometric PCB DRC on a large random board.")
+    parser.add_argument("--segments", type=int, default=100000)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--violations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="Also write the board JSON to this file")
+    args = parser.parse_args()
+
+    design_data = json.dumps(make_board(args.segments, args.layers, args.violations, args.seed))
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(design_data)
+    print(f"Board: {len(design_data) / 1e6:.1f} MB of JSON")
+
+    started = time.perf_counter()
+    result = asyncio.run(run_drc(design_data, "board.json"))
+    elapsed = time.perf_counter() - started
+    pcb_drc.shutdown_process_pool()
+
+    print(f"Stats: {result.stats}")
+    print(f"Errors: {result.stats['errorCount']}, warnings: {result.stats['warningCount']}")
+    for message in result.errors[:5]:
+        print(f"  {message}")
+    print(f"run_drc: {elapsed * 1000:.0f} ms")
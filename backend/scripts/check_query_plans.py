@@ -0,0 +1,82 @@
+# eda-backend/scripts/check_query_plans.py
+# Diagnostics: runs explain() on the backend's hot MongoDB queries and flags collection scans.
+#
+# Usage: python -m scripts.check_query_plans [--apply-indexes]
+
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import MongoClient
+from app.core.config import settings
+from app.db.indexes import INDEXES
+
+SAMPLE_UID = "query-plan-check-uid"
+SAMPLE_EMAIL = "query-plan-check@example.com"
+SAMPLE_OBJECT_ID = ObjectId("000000000000000000000000")
+
+# (description, collection, filter, sort)
+HOT_QUERIES: List[Tuple[str, str, Dict[str, Any], Optional[List[Tuple[str, int]]]]] = [
+    ("get_current_user / login_user / payments", "users", {"firebaseUid": SAMPLE_UID}, None),
+    ("AI chat quota reservation", "users", {"firebaseUid": SAMPLE_UID, "aiUsesLeft": {"$gt": 0}}, None),
+    ("register_user duplicate check", "users", {"$or": [{"firebaseUid": SAMPLE_UID}, {"email": SAMPLE_EMAIL}]}, None),
+    ("admin search by email", "users", {"email": SAMPLE_EMAIL}, None),
+    ("admin listing by membership", "users", {"membership": "premium"}, [("_id", -1)]),
+    ("admin listing by creation date", "users", {"createdAt": {"$gte": datetime(2025, 1, 1)}}, [("_id", -1)]),
+    ("tool usage counters for a user", "usageCounters", {"userId": SAMPLE_UID, "period": "2025-01"}, None),
+    ("recent usage events for a user", "usageEvents", {"userId": SAMPLE_UID}, [("createdAt", -1)]),
+    ("AI chat conversation list", "conversations", {"userId": SAMPLE_UID}, [("updatedAt", -1)]),
+    ("schematic delta replay / catch-up", "schematicDeltas", {"schematicId": SAMPLE_OBJECT_ID, "revision": {"$gt": 0}}, [("revision", 1)]),
+    ("schematic latest committed revision", "schematicDeltas", {"schematicId": SAMPLE_OBJECT_ID}, [("revision", -1)]),
+]
+
+def _stages(plan: Dict[str, Any]) -> List[str]:
+    """Flattens a winning plan into its stage names (inputStage / inputStages, e.g. for $or)."""
+    stages = [plan.get("stage", "?")]
+    if "inputStage" in plan:
+        stages += _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _stages(child)
+    # Slot-based engine plans nest the classic tree under 'queryPlan'.
+    if "queryPlan" in plan:
+        stages += _stages(plan["queryPlan"])
+    return stages
+
+def check_query_plans(apply_indexes: bool = False) -> bool:
+    """
+    Explains every hot query and prints its plan. Returns False if any of them scans a whole collection.
+    """
+    client = MongoClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+
+    if apply_indexes:
+        for collection_name, index_models in INDEXES.items():
+            created = db[collection_name].create_indexes(index_models)
+            print(f"Indexes ensured on '{collection_name}': {', '.join(created)}")
+
+    all_indexed = True
+    for description, collection_name, query, sort in HOT_QUERIES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = cursor.explain()
+        stages = _stages(explanation["queryPlanner"]["winningPlan"])
+        scans = "COLLSCAN" in stages
+        all_indexed = all_indexed and not scans
+        marker = "❌ COLLSCAN" if scans else "✅"
+        print(f"{marker} {collection_name}: {description}\n    plan: {' <- '.join(stages)}")
+
+    client.close()
+    if all_indexed:
+        print("All hot queries use an index.")
+    else:
+        print("Some hot queries scan whole collections. Run with --apply-indexes or start the app to create the indexes.")
+    return all_indexed
+
+if __name__ == "__main__":
+    # Ensure the .env file is loaded for settings
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    ok = check_query_plans(apply_indexes="--apply-indexes" in sys.argv)
+    sys.exit(0 if ok else 1)
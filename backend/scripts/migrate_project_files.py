@@ -0,0 +1,58 @@
+# eda-backend/scripts/migrate_project_files.py
+# A one-time script to move the legacy embedded 'files' array of every project
+# into the 'projects/{projectId}/files' subcollection and fill in the summary counters.
+
+from firebase_admin import firestore
+from app.db.firebase_connection import get_firestore_db
+from app.services.project_files import file_doc_id, files_collection
+
+BATCH_SIZE = 400 # Firestore allows at most 500 writes per batch
+
+def migrate_project_files():
+    """
+    Copies each project's 'files' array into its files subcollection, then removes the array.
+    Safe to re-run: projects without a 'files' array are skipped.
+    """
+    print("Starting project files migration...")
+    db = get_firestore_db()
+    migrated_projects = 0
+
+    for project_doc in db.collection("projects").stream():
+        legacy_files = (project_doc.to_dict() or {}).get("files")
+        if legacy_files is None:
+            continue
+
+        # The first entry wins for duplicate names, matching what downloads used to resolve (the first match).
+        files_by_name = {}
+        for f in legacy_files:
+            if f.get("fileName"):
+                files_by_name.setdefault(f["fileName"], f)
+        files_ref = files_collection(db, project_doc.id)
+
+        batch = db.batch()
+        pending_writes = 0
+        for file_name, file_meta in files_by_name.items():
+            batch.set(files_ref.document(file_doc_id(file_name)), file_meta)
+            pending_writes += 1
+            if pending_writes >= BATCH_SIZE:
+                batch.commit()
+                batch = db.batch()
+                pending_writes = 0
+
+        batch.update(project_doc.reference, {
+            "files": firestore.DELETE_FIELD,
+            "fileCount": len(files_by_name),
+            "totalFileBytes": sum(f.get("size") or 0 for f in files_by_name.values()),
+        })
+        batch.commit()
+        migrated_projects += 1
+        print(f"Migrated {len(files_by_name)} files for project '{project_doc.id}'.")
+
+    print(f"Project files migration completed. {migrated_projects} projects migrated.")
+
+if __name__ == "__main__":
+    # Ensure the .env file is loaded for settings
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    migrate_project_files()
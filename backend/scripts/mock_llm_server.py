@@ -0,0 +1,65 @@
+# eda-backend/scripts/mock_llm_server.py
+# Local stand-in for the Gemini API so AI chat (including streaming) can be developed and tested offline.
+#
+# Usage: python -m scripts.mock_llm_server [--port 8001] [--delay 0.05]
+# Then start the backend with LLM_API_BASE_URL=http://127.0.0.1:8001/v1beta
+
+import argparse
+import asyncio
+import json
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import uvicorn
+
+app = FastAPI(title="Mock LLM Server")
+TOKEN_DELAY_SECONDS = 0.05 # Pause between streamed chunks, to make time-to-first-token visible
+
+
+def _mock_reply(payload: dict) -> str:
+    """Echoes the last user message back in a canned, multi-sentence answer."""
+    contents = payload.get("contents") or [{}]
+    last_text = "".join(part.get("text", "") for part in contents[-1].get("parts", []))
+    return (
+        f"This is a mock response to: \"{last_text.strip()[:200]}\". "
+        "In a real session the model would explain the design question, "
+        "suggest Verilog for the circuit and point out timing or layout issues."
+    )
+
+
+def _chunk(text: str, finish: bool = False) -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate]}
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate(model_action: str, request: Request):
+    """Serves both ':generateContent' and ':streamGenerateContent?alt=sse' for any model name."""
+    model, _, action = model_action.partition(":")
+    payload = await request.json()
+    reply = _mock_reply(payload)
+
+    if action == "generateContent":
+        return _chunk(reply, finish=True)
+    if action != "streamGenerateContent":
+        raise HTTPException(status_code=404, detail=f"Unknown action '{action}' for model '{model}'.")
+
+    async def _events():
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(TOKEN_DELAY_SECONDS)
+            text = word if i == len(words) - 1 else word + " "
+            yield f"data: {json.dumps(_chunk(text, finish=i == len(words) - 1))}\r\n\r\n"
+
+    return StreamingResponse(_events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Gemini API for offline AI chat development.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=TOKEN_DELAY_SECONDS, help="Seconds between streamed chunks")
+    args = parser.parse_args()
+    TOKEN_DELAY_SECONDS = args.delay
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -1,10 +1,21 @@
 // src/hooks/useAiChat.js
 
 import { useState, useCallback } from 'react';
-import axios from 'axios';
 import { useAuth } from '../context/AuthContext';
 
-const CHAT_API_URL = 'http://localhost:8000/api/v1/platform/chat';
+// Streaming endpoint: the reply arrives as server-sent events while the model is generating it.
+const CHAT_STREAM_API_URL = 'http://localhost:8000/api/v1/platform/chat/stream';
+
+// Parses one SSE block ("event: ...\ndata: ...") into { event, data }.
+const parseSseEvent = (block) => {
+  let event = 'message';
+  let data = '';
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('data:')) data += line.slice(5).trim();
+  }
+  return { event, data: data ? JSON.parse(data) : {} };
+};
 
 export const useAiChat = () => {
   const { user, userProfile } = useAuth();
@@ -12,6 +23,8 @@ export const useAiChat = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
   const [aiUsesLeft, setAiUsesLeft] = useState(userProfile?.aiUsesLeft || 0);
+  // The backend stores the conversation; only its ID and the new message are sent each turn.
+  const [conversationId, setConversationId] = useState(null);
 
   const sendMessage = useCallback(async (message) => {
     if (!message.trim() || isLoading) return;
@@ -34,40 +47,75 @@ export const useAiChat = () => {
         throw new Error("User not authenticated.");
       }
 
-      const response = await axios.post(CHAT_API_URL, {
-        message: message,
-        chat_history: newHistory,
-      }, {
+      const response = await fetch(CHAT_STREAM_API_URL, {
+        method: 'POST',
         headers: {
           Authorization: `Bearer ${idToken}`,
           'Content-Type': 'application/json',
         },
+        body: JSON.stringify({
+          message: message,
+          conversation_id: conversationId,
+        }),
       });
 
-      const aiResponse = response.data.response;
-      const newAiUsesLeft = response.data.ai_uses_left;
-      
-      const newAiMessage = {
+      if (!response.ok) {
+        const errorBody = await response.json().catch(() => ({}));
+        throw new Error(errorBody.detail || `Chat request failed with status ${response.status}`);
+      }
+
+      // Add an empty model message and grow it as tokens arrive.
+      setChatHistory(prevHistory => [...prevHistory, {
         role: 'model',
-        content: aiResponse,
+        content: '',
         timestamp: new Date().toISOString(),
-      };
+      }]);
+      const appendToReply = (text) => setChatHistory(prevHistory => {
+        const last = prevHistory[prevHistory.length - 1];
+        return [...prevHistory.slice(0, -1), { ...last, content: last.content + text }];
+      });
 
-      setChatHistory(prevHistory => [...prevHistory, newAiMessage]);
-      setAiUsesLeft(newAiUsesLeft);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop();
+        for (const block of blocks) {
+          if (!block.trim()) continue;
+          const { event, data } = parseSseEvent(block);
+          if (event === 'error') throw new Error(data.detail);
+          if (event === 'done') {
+            setAiUsesLeft(data.ai_uses_left);
+            if (data.conversation_id) setConversationId(data.conversation_id);
+          }
+          else if (data.token) appendToReply(data.token);
+        }
+      }
     } catch (err) {
       console.error("Error communicating with AI backend:", err);
-      setError(err?.response?.data?.detail || err.message || "Failed to get a response from the AI assistant.");
+      setError(err.message || "Failed to get a response from the AI assistant.");
     } finally {
       setIsLoading(false);
     }
-  }, [chatHistory, isLoading, user]);
+  }, [chatHistory, conversationId, isLoading, user]);
+
+  const startNewConversation = useCallback(() => {
+    setConversationId(null);
+    setChatHistory([]);
+    setError(null);
+  }, []);
 
   return {
     chatHistory,
     isLoading,
     error,
     aiUsesLeft,
+    conversationId,
     sendMessage,
+    startNewConversation,
   };
 };
\ No newline at end of file
@@ -7,6 +7,7 @@ import {
   FaBell, FaQuestionCircle, FaShareAlt, FaHistory, FaCloudUploadAlt,
   FaMousePointer, FaPen, FaTrash, FaUndo, FaRedo, FaSlidersH, FaEye
 } from 'react-icons/fa';
+import { createSchematic, createSchematicSync } from '../../../services/schematicService';
 
 const ProfessionalSchematicEditor = () => {
   const canvasRef = useRef(null);
@@ -29,6 +30,8 @@ const ProfessionalSchematicEditor = () => {
   const [gridSize, setGridSize] = useState(10);
   const [snapToGrid, setSnapToGrid] = useState(true);
   const [showGrid, setShowGrid] = useState(true);
+  const [saveStatus, setSaveStatus] = useState(null); // null | 'saving' | 'saved' | 'error'
+  const syncRef = useRef(null); // Server document sync, set up by the first save
 
   // Component library
   const componentLibrary = [
@@ -63,13 +66,11 @@ const ProfessionalSchematicEditor = () => {
     ]},
   ];
 
-  // Save current state to history
+  // Save current state to history. State is only ever replaced, never mutated, so the
+  // snapshots can share the arrays instead of deep-copying the whole schematic each edit.
   const saveToHistory = () => {
     const newHistory = history.slice(0, historyIndex + 1);
-    newHistory.push({
-      components: JSON.parse(JSON.stringify(components)),
-      wires: JSON.parse(JSON.stringify(wires))
-    });
+    newHistory.push({ components, wires });
     setHistory(newHistory);
     setHistoryIndex(newHistory.length - 1);
   };
@@ -79,8 +80,8 @@ const ProfessionalSchematicEditor = () => {
     if (historyIndex > 0) {
       const newIndex = historyIndex - 1;
       setHistoryIndex(newIndex);
-      setComponents(JSON.parse(JSON.stringify(history[newIndex].components)));
-      setWires(JSON.parse(JSON.stringify(history[newIndex].wires)));
+      setComponents(history[newIndex].components);
+      setWires(history[newIndex].wires);
     }
   };
 
@@ -89,8 +90,8 @@ const ProfessionalSchematicEditor = () => {
     if (historyIndex < history.length - 1) {
       const newIndex = historyIndex + 1;
       setHistoryIndex(newIndex);
-      setComponents(JSON.parse(JSON.stringify(history[newIndex].components)));
-      setWires(JSON.parse(JSON.stringify(history[newIndex].wires)));
+      setComponents(history[newIndex].components);
+      setWires(history[newIndex].wires);
     }
   };
 
@@ -408,6 +409,45 @@ const ProfessionalSchematicEditor = () => {
     reader.readAsText(file);
   };
 
+  // Save to the server. The first save stores the whole schematic; after that only the
+  // changes are sent, automatically, as the schematic is edited.
+  const saveSchematic = async () => {
+    setSaveStatus('saving');
+    try {
+      if (syncRef.current) {
+        await syncRef.current.flush();
+      } else {
+        const { id, revision } = await createSchematic('Untitled schematic', null, components, wires);
+        syncRef.current = createSchematicSync(
+          { id, revision, components, wires },
+          (merged) => {
+            setComponents(merged.components);
+            setWires(merged.wires);
+          },
+          () => setSaveStatus('error')
+        );
+      }
+      setSaveStatus('saved');
+    } catch (error) {
+      console.error('Error saving schematic:', error.response?.data || error.message);
+      setSaveStatus('error');
+    }
+  };
+
+  // Send edits to the saved document
+  useEffect(() => {
+    if (syncRef.current) {
+      syncRef.current.update(components, wires);
+    }
+  }, [components, wires]);
+
+  useEffect(() => () => {
+    if (syncRef.current) {
+      syncRef.current.flush();
+      syncRef.current.dispose();
+    }
+  }, []);
+
   // Initialize canvas
   useEffect(() => {
     const canvas = canvasRef.current;
@@ -626,7 +666,12 @@ const ProfessionalSchematicEditor = () => {
               style={{ display: 'none' }}
             />
           </label>
-          <button className="toolbar-btn" title="Save">
+          <button
+            className="toolbar-btn"
+            onClick={saveSchematic}
+            disabled={saveStatus === 'saving'}
+            title={saveStatus === 'error' ? 'Save failed - click to retry' : saveStatus === 'saved' ? 'Saved' : 'Save'}
+          >
             <FaSave />
           </button>
           <button className="toolbar-btn" title="Settings">
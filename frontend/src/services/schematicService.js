@@ -0,0 +1,231 @@
+// frontend/src/services/schematicService.js
+// Versioned schematic documents. After the first save the editor only sends what changed
+// (JSON-patch style ops against the revision it last synced), never the whole schematic.
+
+import axios from 'axios';
+import { API_BASE_URL } from '../config';
+import { auth } from '../firebaseconfig';
+
+const documentsUrl = `${API_BASE_URL}/chip/schematic/documents`;
+const COLLECTIONS = ['components', 'wires'];
+const SYNC_DELAY_MS = 800; // Edits within this window are sent as one patch
+const MAX_REBASE_ATTEMPTS = 5;
+
+const getAuthHeaders = async () => {
+    const firebaseUser = auth.currentUser;
+    if (!firebaseUser) {
+        throw new Error("No Firebase user logged in. Authentication required.");
+    }
+    const idToken = await firebaseUser.getIdToken();
+    return {
+        Authorization: `Bearer ${idToken}`,
+        'Content-Type': 'application/json'
+    };
+};
+
+export const createSchematic = async (name, projectId, components, wires) => {
+    const headers = await getAuthHeaders();
+    const response = await axios.post(documentsUrl, {
+        name,
+        project_id: projectId || null,
+        components,
+        wires
+    }, { headers });
+    return response.data; // { id, revision }
+};
+
+export const loadSchematic = async (schematicId) => {
+    const headers = await getAuthHeaders();
+    const response = await axios.get(`${documentsUrl}/${schematicId}`, { headers });
+    return response.data; // { id, name, projectId, revision, components, wires }
+};
+
+export const patchSchematic = async (schematicId, baseRevision, ops) => {
+    const headers = await getAuthHeaders();
+    const response = await axios.patch(`${documentsUrl}/${schematicId}`, {
+        base_revision: baseRevision,
+        ops
+    }, { headers });
+    return response.data; // { id, revision }
+};
+
+export const getSchematicDeltas = async (schematicId, since) => {
+    const headers = await getAuthHeaders();
+    const response = await axios.get(`${documentsUrl}/${schematicId}/deltas`, { headers, params: { since } });
+    return response.data.deltas; // [{ revision, ops }], oldest first
+};
+
+const escapeToken = (token) => String(token).replace(/~/g, '~0').replace(/\//g, '~1');
+const unescapeToken = (token) => token.replace(/~1/g, '/').replace(/~0/g, '~');
+
+/**
+ * Ops that turn `prev` into `next` ({ components, wires }). The editor updates state immutably,
+ * so an element whose reference did not change is skipped without looking inside it, and a
+ * changed element only sends the top-level fields that differ (a drag is one or two small ops).
+ */
+export const diffSchematic = (prev, next) => {
+    const ops = [];
+    COLLECTIONS.forEach((collection) => {
+        const before = prev[collection] || [];
+        const after = next[collection] || [];
+        if (before === after) return;
+        const beforeById = new Map(before.map((element) => [element.id, element]));
+        const afterIds = new Set();
+        after.forEach((element) => {
+            afterIds.add(element.id);
+            const old = beforeById.get(element.id);
+            const path = `/${collection}/${escapeToken(element.id)}`;
+            if (old === element) return;
+            if (!old) {
+                ops.push({ op: 'add', path, value: element });
+                return;
+            }
+            Object.keys(element).forEach((key) => {
+                if (old[key] === element[key]) return;
+                ops.push({ op: key in old ? 'replace' : 'add', path: `${path}/${escapeToken(key)}`, value: element[key] });
+            });
+            Object.keys(old).forEach((key) => {
+                if (!(key in element)) ops.push({ op: 'remove', path: `${path}/${escapeToken(key)}` });
+            });
+        });
+        before.forEach((element) => {
+            if (!afterIds.has(element.id)) ops.push({ op: 'remove', path: `/${collection}/${escapeToken(element.id)}` });
+        });
+    });
+    return ops;
+};
+
+// Immutable version of the server's op semantics, for applying remote deltas and rebasing.
+const applyAt = (target, tokens, op) => {
+    const [token, ...rest] = tokens;
+    if (Array.isArray(target)) {
+        const copy = [...target];
+        const index = token === '-' ? copy.length : parseInt(token, 10);
+        if (rest.length) {
+            if (copy[index] === undefined) throw new Error(`No field at ${op.path}`);
+            copy[index] = applyAt(copy[index], rest, op);
+        } else if (op.op === 'add') copy.splice(index, 0, op.value);
+        else if (op.op === 'replace') copy[index] = op.value;
+        else copy.splice(index, 1);
+        return copy;
+    }
+    if (target === null || typeof target !== 'object') throw new Error(`No field at ${op.path}`);
+    const copy = { ...target };
+    if (rest.length) {
+        if (!(token in copy)) throw new Error(`No field at ${op.path}`);
+        copy[token] = applyAt(copy[token], rest, op);
+    } else if (op.op === 'remove') delete copy[token];
+    else copy[token] = op.value;
+    return copy;
+};
+
+export const applyOps = (state, ops) => {
+    let result = { components: state.components, wires: state.wires };
+    ops.forEach((op) => {
+        const [collection, id, ...fields] = op.path.slice(1).split('/').map(unescapeToken);
+        const elements = result[collection];
+        if (!elements) throw new Error(`Unknown collection in ${op.path}`);
+        if (id === undefined) {
+            result = { ...result, [collection]: op.value };
+            return;
+        }
+        const index = elements.findIndex((element) => String(element.id) === id);
+        let updated;
+        if (!fields.length) {
+            if (op.op === 'remove') updated = elements.filter((_, i) => i !== index);
+            else if (index === -1) updated = [...elements, op.value];
+            else updated = elements.map((element, i) => (i === index ? op.value : element));
+        } else {
+            if (index === -1) throw new Error(`No element ${id} in ${collection}`);
+            updated = elements.map((element, i) => (i === index ? applyAt(element, fields, op) : element));
+        }
+        result = { ...result, [collection]: updated };
+    });
+    return result;
+};
+
+// Replays local ops on a newer base, dropping those that no longer apply (e.g. a field of an
+// element someone else deleted).
+const rebase = (base, ops) => ops.reduce((state, op) => {
+    try {
+        return applyOps(state, [op]);
+    } catch (error) {
+        return state;
+    }
+}, base);
+
+/**
+ * Keeps a server document in step with the editor. Call `update(components, wires)` after each
+ * change; edits are debounced into one patch. When another session saved first (409) the missed
+ * deltas are fetched, the pending edits are rebased onto them and `onRemoteChange(state)` is
+ * called with the merged schematic so the editor can show it, then the patch is retried.
+ */
+export const createSchematicSync = ({ id, revision, components, wires }, onRemoteChange, onError) => {
+    let synced = { components, wires }; // What the server has at `revision`
+    let local = synced;
+    let timer = null;
+    let inFlight = null;
+
+    const catchUp = async () => {
+        try {
+            const deltas = await getSchematicDeltas(id, revision);
+            deltas.forEach((delta) => {
+                synced = applyOps(synced, delta.ops);
+                revision = delta.revision;
+            });
+        } catch (error) {
+            if (error.response?.status !== 410) throw error;
+            const latest = await loadSchematic(id); // Deltas were compacted: take the full document
+            synced = { components: latest.components, wires: latest.wires };
+            revision = latest.revision;
+        }
+    };
+
+    const flush = async () => {
+        clearTimeout(timer);
+        timer = null;
+        if (inFlight) return inFlight;
+        inFlight = (async () => {
+            for (let attempt = 0; attempt < MAX_REBASE_ATTEMPTS; attempt += 1) {
+                const target = local;
+                const ops = diffSchematic(synced, target);
+                if (!ops.length) return;
+                try {
+                    const result = await patchSchematic(id, revision, ops);
+                    synced = target;
+                    revision = result.revision;
+                    if (local === target) return;
+                } catch (error) {
+                    if (error.response?.status !== 409) throw error;
+                    const base = synced;
+                    await catchUp();
+                    local = rebase(synced, diffSchematic(base, local)); // Includes edits made while waiting
+                    onRemoteChange?.(local);
+                }
+            }
+        })().catch((error) => {
+            console.error("Error saving schematic:", error.response?.data || error.message);
+            onError?.(error);
+        }).finally(() => {
+            inFlight = null;
+            if (local !== synced && !timer) timer = setTimeout(flush, SYNC_DELAY_MS);
+        });
+        return inFlight;
+    };
+
+    return {
+        get id() { return id; },
+        get revision() { return revision; },
+        update(nextComponents, nextWires) {
+            if (nextComponents === local.components && nextWires === local.wires) return;
+            local = { components: nextComponents, wires: nextWires };
+            clearTimeout(timer);
+            timer = setTimeout(flush, SYNC_DELAY_MS);
+        },
+        flush,
+        dispose() {
+            clearTimeout(timer);
+            timer = null;
+        }
+    };
+};